@@ -3,10 +3,11 @@ import subprocess
 import multiprocessing
 import threading
 import time
-from mecheye_trigger import robot, TriggerWithExternalDeviceAndFixedRate
+from mecheye_trigger import get_robot, TriggerWithExternalDeviceAndFixedRate
 from mecheye.profiler import Profiler
 
 # Global değişkenler
+robot = get_robot()
 scan_process = None  
 profiler = Profiler()
 
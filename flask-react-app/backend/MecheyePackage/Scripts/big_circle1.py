@@ -1,37 +1,51 @@
 import cv2
 import numpy as np
 import open3d as o3d
-import matplotlib.pyplot as plt
-from scipy.optimize import leastsq
 from scipy.stats import circstd
-from Scripts import edges
+from Scripts import edges, circle_fit
+from Scripts.plot_artifact import PlotArtifact
+from point_cloud_view import PointCloudView
 import datetime
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 
 class CircleFitter:
-    def __init__(self, point):
+    def __init__(self, point, fit_mode="least_squares", min_inlier_ratio=0.0):
         """
         CircleFitter sınıfı, verilen nokta bulutu (pcd) üzerinde çember fitting işlemleri yapar.
+
+        fit_mode "robust" ise çemberler RANSAC + Tukey ağırlıklandırma ile fit edilir
+        (circle_fit.fit_circle_robust); her fit'in inlier oranı circle_fits içinde raporlanır.
+        Inlier oranı min_inlier_ratio'nun altında kalan fit'ler aynı kenar noktalarından
+        onarılır (circle_fit.repair_circle_fit), görünüm yeniden taranmaz.
+
+        point bir PointCloudView olabilir; medyan/min/max istatistikleri ve pencere sorguları
+        onun önbelleğinden ve sıralı indekslerinden okunur. Dizi verilirse indekssiz bir görünüme sarılır.
         """
-        self.pcd = point
+        self.view = PointCloudView.of(point)
+        self.pcd = self.view.points
+        self.fit_mode = fit_mode
+        self.min_inlier_ratio = min_inlier_ratio
         self.commonp = None
+        self.circle_fits = []
         self.datum = self.get_datum()
 
     def get_B(self, strip_width=20):
-        points = self.pcd
-        medianx = np.median(points[:, 0])
-        mediany = np.median(points[:, 1])  # Y eksenindeki orta nokta
-        strip_points = points[(np.abs(points[:, 1] - mediany) < strip_width / 2) & 
-                              (np.abs(points[:, 0] - medianx) < strip_width / 2)]
+        medianx = self.view.median(0)
+        mediany = self.view.median(1)  # Y eksenindeki orta nokta
+        strip_points = self.view.query(x=(medianx - strip_width / 2, medianx + strip_width / 2),
+                                       y=(mediany - strip_width / 2, mediany + strip_width / 2))
         if len(strip_points) == 0:
             raise ValueError("Şerit içinde nokta bulunamadı.")
         return np.max(strip_points[:, 2])
     
     def get_datum(self):
         strip_width = 1
-        x_center = np.median(self.pcd[:, 0])
-        strip_points = self.pcd[np.abs(self.pcd[:, 0] - x_center) < strip_width / 2]
+        x_center = self.view.median(0)
+        strip_points = self.view.query(x=(x_center - strip_width / 2, x_center + strip_width / 2))
         self.datum = np.min(strip_points[:, 1])
         return self.datum
 
@@ -113,15 +127,16 @@ class CircleFitter:
 
         print(f"Hata metrikleri {filename} dosyasına kaydedildi.")
 
-    def get_distance(self, second_crc=True, z_distance_to_datum=102.1, reel_datum=None):
+    def get_distance(self, second_crc=True, z_distance_to_datum=102.1, reel_datum=None, artifacts=None):
         """
-        Çember merkezinin doğru noktaya öklid mesafesini hesaplar ve görselleştirir.
-        Orijinal pcd üzerindeki noktalar ve hesaplanan merkezleri çizer.
+        Çember merkezinin doğru noktaya öklid mesafesini hesaplar.
 
         Args:
             second_crc (bool): İkinci çemberin merkezini kullanıp kullanmayacağınızı belirtir.
             z_distance_to_datum (float): Datum'a göre z mesafesi.
             reel_datum (float, optional): Gerçek datum değeri. Varsayılan olarak self.datum kullanılır.
+            artifacts (list, optional): Verilirse orijinal noktalar, referans nokta ve çember merkezi
+                bir PlotArtifact olarak eklenir; çizim yalnızca render() çağrılınca yapılır.
 
         Returns:
             distance (float): Çember merkezinin uzaklığı.
@@ -131,10 +146,10 @@ class CircleFitter:
 
         # Çember merkezlerini seç
         if second_crc:
-            median = np.median(self.pcd[:, 0])
+            median = self.view.median(0)
             xc_outer, zc_outer = self.xc_outer_2, self.zc_outer_2
         else:
-            median = np.median(self.pcd[:, 0])
+            median = self.view.median(0)
             xc_outer, zc_outer = self.xc_outer, self.zc_outer
 
         # Median ve z_center hesaplamaları
@@ -146,75 +161,77 @@ class CircleFitter:
         # Mesafenin doğruluk kontrolü
         ok = distance < 3
 
-        # Görselleştirme
-        plt.figure(figsize=(8, 8))
-        plt.scatter(self.pcd[:, 0], self.pcd[:, 1], s=1, color='blue', label='Orijinal Noktalar')
-        plt.scatter(median, z_center, color='orange', label='z_center (Referans Nokta)')
-        plt.scatter(xc_outer, zc_outer, color='red', label='Çember Merkezi')
-        plt.title("Çember Merkezi ve Referans Nokta")
-        plt.xlabel("X")
-        plt.ylabel("Z")
-        plt.axis('equal')
-        plt.legend()
+        # Görselleştirme kaydı
+        if artifacts is not None:
+            artifacts.append(
+                PlotArtifact("Çember Merkezi ve Referans Nokta", "X", "Z")
+                .scatter(self.pcd[:, 0], self.pcd[:, 1], s=1, color='blue', label='Orijinal Noktalar')
+                .scatter(median, z_center, color='orange', label='z_center (Referans Nokta)')
+                .scatter(xc_outer, zc_outer, color='red', label='Çember Merkezi')
+            )
 
         return distance, ok
 
     def fit_circle(self, x, y):
         """
         Verilen X ve Y noktalarına çember fitting yapar.
-        """
-        def calc_radius(xc, yc, x, y):
-            return np.sqrt((x - xc)**2 + (y - yc)**2)
-
-        def cost_function(params, x, y):
-            xc, yc, r = params
-            return calc_radius(xc, yc, x, y) - r
 
-        def initial_guess(x, y):
-            xc = np.mean(x)
-            yc = np.mean(y)
-            r = np.mean(np.sqrt((x - xc)**2 + (y - yc)**2))
-            return [xc, yc, r]
-
-        guess = initial_guess(x, y)
-        result, _ = leastsq(cost_function, guess, args=(x, y))
-        return result  # xc, yc, r
+        Taubin cebirsel çözümünden başlayıp analitik Jacobian'lı Levenberg-Marquardt ile
+        geometrik en küçük kareler çemberine iner. Raporu (iterasyon, RMS, koşul sayısı,
+        robust modda inlier oranı) self.circle_fits listesine eklenir.
+        """
+        if self.fit_mode == "robust":
+            fit = circle_fit.repair_circle_fit(x, y, circle_fit.fit_circle_robust(x, y), self.min_inlier_ratio)
+        else:
+            fit = circle_fit.fit_circle(x, y)
+        self.circle_fits.append(fit)
+        logger.debug(f"Circle fit: r={fit.r:.4f} rms={fit.rms:.4f} iterations={fit.iterations} cond={fit.cond:.3g} "
+                     f"inliers={fit.inlier_ratio} repaired_from={fit.repaired_from}")
+        return np.array([fit.xc, fit.yc, fit.r])  # xc, yc, r
 
-    def fit_circles_and_plot(self, name, find_second_circle=True, val_x=0.18, val_z=0.796, delta_z=14, clc_metrics=False):
+    def fit_circles_and_plot(self, name, find_second_circle=True, val_x=0.18, val_z=0.796, delta_z=14, clc_metrics=False,
+                             edge_engine="raster", scale=None, coarse_scale=2, artifacts=None):
 
         """
-        Nokta bulutunun X-Z düzleminde çember fitting işlemlerini gerçekleştirir ve görselleştirir.
+        Nokta bulutunun X-Z düzleminde çember fitting işlemlerini gerçekleştirir.
         
         Args:
             find_second_circle (bool): İkinci çemberi bulup bulmama seçeneği.
             val_x (float): Dinamik filtreleme için X eksenindeki oran.
             val_z (float): Dinamik filtreleme için Z eksenindeki oran.
             delta_z (float): Filtreleme bölgesinin Z eksenindeki genişliği.
+            edge_engine (str): Kenar çıkarma yöntemi, "raster" veya "envelope" (bkz. edges.process_and_visualize).
+            scale (float, optional): Fitting pencerelerinin çözünürlüğü (piksel/mm), varsayılan edges.get_scale().
+            coarse_scale (float): Tüm projeksiyonun görselleştirme için çıkarılan kenarlarının çözünürlüğü.
+            artifacts (list, optional): Verilirse kenarlar, filtreleme bölgesi ve çemberler bir PlotArtifact
+                olarak eklenir. Verilmezse tüm projeksiyonun kenarları hiç çıkarılmaz ve figür oluşturulmaz.
         """
         try:
             self.find_second_circle = find_second_circle
-            
-            # X-Z düzlemine projekte edilen noktalar
-            projected_points_2d = self.pcd[:, [0, 1]]
 
-            # Kenar koordinatlarını al
-            edge_coords = edges.process_and_visualize(projected_points_2d)
+            # Fitting pencereleri yüksek çözünürlükte, yalnızca pencere içi rasterize edilir
+            scale = edges.get_scale() if scale is None else scale
 
-            # Kenarları ölçekle
-            scale = edges.get_scale()
-            x2d, z2d = edge_coords[:, 1] / scale, edge_coords[:, 0] / scale
+            def window_edges(x_lo, x_hi, z_lo, z_hi):
+                # Pencere + pay görünümden sorgulanır, tüm bulut maskelenmez
+                pad = 10 / scale
+                window_points = self.view.query(x=(x_lo - pad, x_hi + pad), y=(z_lo - pad, z_hi + pad))
+                coords = edges.process_and_visualize(window_points[:, [0, 1]], engine=edge_engine, scale=scale,
+                                                     window=(x_lo, x_hi, z_lo, z_hi), pad=pad)
+                return coords[:, 1] / scale, coords[:, 0] / scale
 
             # Dinamik filtreleme parametreleri
-            min_x, max_x = np.min(projected_points_2d[:, 0]), np.max(projected_points_2d[:, 0])
-            min_z, max_z = np.min(projected_points_2d[:, 1]), np.max(projected_points_2d[:, 1])
+            min_x, max_x = self.view.min(0), self.view.max(0)
+            min_z, max_z = self.view.min(1), self.view.max(1)
             x_min = min_x + val_x * (max_x - min_x)
             x_max = x_min + 26
             z_min = min_z + val_z * (max_z - min_z)
             z_max = z_min + delta_z
 
             # İlk çember fitting
-            mask_1 = (x2d > x_min) & (x2d < x_max) & (z2d > z_min) & (z2d < z_max)
-            x_2d_1, z_2d_1 = x2d[mask_1], z2d[mask_1]
+            x_w, z_w = window_edges(x_min, x_max, z_min, z_max)
+            mask_1 = (x_w > x_min) & (x_w < x_max) & (z_w > z_min) & (z_w < z_max)
+            x_2d_1, z_2d_1 = x_w[mask_1], z_w[mask_1]
             xc_outer, zc_outer, r_outer = self.fit_circle(x_2d_1, z_2d_1)
             self.xc_outer, self.zc_outer = xc_outer, zc_outer
 
@@ -222,45 +239,32 @@ class CircleFitter:
             if clc_metrics:
                 self.calculate_error_metrics(x_2d_1, z_2d_1, xc_outer, zc_outer, r_outer, name)
 
-            # Çemberlerin çizimi
-            theta = np.linspace(0, 2 * np.pi, 100)
-            x_outer_circle = xc_outer + r_outer * np.cos(theta)
-            z_outer_circle = zc_outer + r_outer * np.sin(theta)
-
-            # Görselleştirme
-            plt.figure(figsize=(8, 8))
-            plt.scatter(x2d, z2d, s=1, color='blue', label='Noktalar')
-            plt.plot(x_outer_circle, z_outer_circle, color='red', label=f'Çember 1 (R = {r_outer:.2f})')
-
-            # Filtreleme alanını kare şeklinde çiz
-            plt.gca().add_patch(
-                plt.Rectangle(
-                    (x_min, z_min),  # Dikdörtgenin sol alt köşesi
-                    x_max - x_min,   # Genişlik
-                    z_max - z_min,   # Yükseklik
-                    edgecolor='red', facecolor='none', linewidth=2, label='Filtreleme Bölgesi'
+            # Görselleştirme kaydı: tüm projeksiyonun kenarları kaba çözünürlükte, yalnızca istenirse
+            if artifacts is not None:
+                edge_coords = edges.process_and_visualize(self.pcd[:, [0, 1]], engine=edge_engine, scale=coarse_scale)
+                artifact = (
+                    PlotArtifact("X-Z Düzleminde Nokta Bulutu, Çember Fitting ve Filtreleme Alanı", "X", "Z")
+                    .scatter(edge_coords[:, 1] / coarse_scale, edge_coords[:, 0] / coarse_scale, s=1, color='blue',
+                             label='Noktalar')
+                    .circle(xc_outer, zc_outer, r_outer, color='red', label=f'Çember 1 (R = {r_outer:.2f})')
+                    .rectangle(x_min, z_min, x_max - x_min, z_max - z_min,
+                               edgecolor='red', facecolor='none', linewidth=2, label='Filtreleme Bölgesi')
                 )
-            )
+                artifacts.append(artifact)
 
             if find_second_circle:
                 # İkinci çember fitting
                 zc_min_2 = zc_outer  # İlk çemberin merkezinin alt sınırı
                 zc_max_2 = zc_outer + 5  # İlk çemberin üst sınırı
-                mask_2 = (x2d > x_min) & (x2d < x_max) & (z2d > zc_min_2) & (z2d < zc_max_2)
-                x_2d_2, z_2d_2 = x2d[mask_2], z2d[mask_2]
+                x_w, z_w = window_edges(x_min, x_max, zc_min_2, zc_max_2)
+                mask_2 = (x_w > x_min) & (x_w < x_max) & (z_w > zc_min_2) & (z_w < zc_max_2)
+                x_2d_2, z_2d_2 = x_w[mask_2], z_w[mask_2]
                 xc_outer_2, zc_outer_2, r_outer_2 = self.fit_circle(x_2d_2, z_2d_2)
                 self.xc_outer_2, self.zc_outer_2 = xc_outer_2, zc_outer_2
 
-                # İkinci çember çizimi
-                x_outer_circle_2 = xc_outer_2 + r_outer_2 * np.cos(theta)
-                z_outer_circle_2 = zc_outer_2 + r_outer_2 * np.sin(theta)
-                plt.plot(x_outer_circle_2, z_outer_circle_2, color='green', label=f'Çember 2 (R = {r_outer_2:.2f})')
-
-            plt.title("X-Z Düzleminde Nokta Bulutu, Çember Fitting ve Filtreleme Alanı")
-            plt.xlabel("X")
-            plt.ylabel("Z")
-            plt.axis('equal')
-            plt.legend()
+                if artifacts is not None:
+                    artifact.circle(xc_outer_2, zc_outer_2, r_outer_2, color='green',
+                                    label=f'Çember 2 (R = {r_outer_2:.2f})')
 
             if find_second_circle:
                 return (xc_outer, zc_outer, r_outer*2),(xc_outer_2, zc_outer_2, r_outer_2*2)
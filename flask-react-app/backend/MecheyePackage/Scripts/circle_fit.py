@@ -0,0 +1,310 @@
+import numpy as np
+from collections import namedtuple
+
+# Fields are floats for fit_circle() and (B,) arrays for fit_circles().
+# iterations: Levenberg-Marquardt iterations (0 without refinement), rms: geometric residual RMS,
+# cond: condition number of the Gauss-Newton matrix J^T J at the returned circle,
+# inlier_ratio: share of points within the inlier threshold (robust fits only),
+# repaired_from: inlier_ratio of the fit that repair_circle_fit() replaced.
+CircleFit = namedtuple("CircleFit", ["xc", "yc", "r", "rms", "iterations", "cond", "inlier_ratio", "repaired_from"],
+                       defaults=(None, None))
+
+ALGEBRAIC_METHODS = ("kasa", "pratt", "taubin")
+ROBUST_LOSSES = ("huber", "tukey")
+# Tuning constants for 95 % efficiency under Gaussian noise, in units of the residual scale
+HUBER_K = 1.345
+TUKEY_C = 4.685
+
+
+def _as_batch(x, y, mask):
+    """Stacks the inputs to (B, n) float64 arrays plus (B, n) weights; ragged lists are zero-padded."""
+    # mask may also carry float weights (robust reweighting)
+    if isinstance(x, (list, tuple)):
+        length = max((len(v) for v in x), default=0)
+        weights = np.zeros((len(x), length))
+        xs, ys = np.zeros((len(x), length)), np.zeros((len(x), length))
+        for i, (xi, yi) in enumerate(zip(x, y)):
+            xs[i, :len(xi)], ys[i, :len(yi)], weights[i, :len(xi)] = xi, yi, 1
+        return xs, ys, weights
+    x = np.atleast_2d(np.asarray(x, dtype=np.float64))
+    y = np.atleast_2d(np.asarray(y, dtype=np.float64))
+    weights = np.ones(x.shape) if mask is None else np.atleast_2d(mask).astype(np.float64)
+    return x, y, weights
+
+
+def _moments(x, y, w):
+    """Weighted centroid and central moments (Chernov's notation) of every batch row."""
+    count = w.sum(axis=-1)
+
+    def mean(values):
+        return (w * values).sum(axis=-1) / count
+
+    xm, ym = mean(x), mean(y)
+    X, Y = x - xm[:, None], y - ym[:, None]
+    Z = X * X + Y * Y
+    return xm, ym, mean(X * X), mean(Y * Y), mean(X * Y), mean(X * Z), mean(Y * Z), mean(Z * Z)
+
+
+def _newton_root(poly, dpoly, batch, max_iter=50, eps=1e-12):
+    """Vectorized Newton iteration from 0 for the smallest root of the characteristic polynomial."""
+    root = np.zeros(batch)
+    value = np.full(batch, np.inf)
+    active = np.ones(batch, dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for _ in range(max_iter):
+            new_value = poly(root)
+            diverged = active & (np.abs(new_value) > np.abs(value))
+            root = np.where(diverged, 0.0, root)
+            active &= ~diverged
+            value = np.where(active, new_value, value)
+            new_root = root - new_value / dpoly(root)
+            negative = active & ~(new_root >= 0)
+            converged = np.abs(new_root - root) <= eps * np.abs(new_root)
+            root = np.where(active, np.where(negative, 0.0, new_root), root)
+            active &= ~negative & ~converged
+            if not active.any():
+                break
+    return root
+
+
+def _algebraic(x, y, w, method):
+    xm, ym, Mxx, Myy, Mxy, Mxz, Myz, Mzz = _moments(x, y, w)
+    Mz = Mxx + Myy
+    cov_xy = Mxx * Myy - Mxy * Mxy
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if method == "kasa":
+            # Centered Kasa: 2 [Mxx Mxy; Mxy Myy] [a b]^T = [Mxz Myz]^T, r^2 = a^2 + b^2 + Mz
+            a = (Mxz * Myy - Myz * Mxy) / cov_xy / 2
+            b = (Myz * Mxx - Mxz * Mxy) / cov_xy / 2
+            return xm + a, ym + b, np.sqrt(a * a + b * b + Mz)
+
+        var_z = Mzz - Mz * Mz
+        A1 = var_z * Mz + 4 * cov_xy * Mz - Mxz * Mxz - Myz * Myz
+        A0 = Mxz * (Mxz * Myy - Myz * Mxy) + Myz * (Myz * Mxx - Mxz * Mxy) - var_z * cov_xy
+        if method == "taubin":
+            A3, A2 = 4 * Mz, -3 * Mz * Mz - Mzz
+            root = _newton_root(lambda t: A0 + t * (A1 + t * (A2 + t * A3)),
+                                lambda t: A1 + t * (2 * A2 + 3 * t * A3), len(xm))
+        elif method == "pratt":
+            A2 = 4 * cov_xy - 3 * Mz * Mz - Mzz
+            root = _newton_root(lambda t: A0 + t * (A1 + t * (A2 + 4 * t * t)),
+                                lambda t: A1 + t * (2 * A2 + 16 * t * t), len(xm))
+        else:
+            raise ValueError(f"Unknown circle fit method: {method}")
+
+        det = root * root - root * Mz + cov_xy
+        a = (Mxz * (Myy - root) - Myz * Mxy) / det / 2
+        b = (Myz * (Mxx - root) - Mxz * Mxy) / det / 2
+        r2 = a * a + b * b + Mz + (2 * root if method == "pratt" else 0)
+        return xm + a, ym + b, np.sqrt(r2)
+
+
+def _geometry(x, y, w, xc, yc, r):
+    """
+    Residuals d_i - r and their weighted cost, plus the analytic Jacobian rows
+    d(d_i - r)/d(xc, yc, r) = (u_i, v_i, -1) with u_i = -(x_i - xc)/d_i, v_i = -(y_i - yc)/d_i.
+    """
+    dx, dy = x - xc[:, None], y - yc[:, None]
+    distance = np.hypot(dx, dy)
+    residuals = distance - r[:, None]
+    safe = np.where(distance > 0, distance, 1.0)
+    return residuals, (w * residuals * residuals).sum(axis=-1), -dx / safe, -dy / safe
+
+
+def _normal_equations(w, residuals, u, v):
+    """J^T W J and J^T W r from weighted sums, without forming the (B, n, 3) Jacobian."""
+    wu, wv = w * u, w * v
+    Suu, Suv, Svv = (wu * u).sum(-1), (wu * v).sum(-1), (wv * v).sum(-1)
+    Su, Sv, Sw = -wu.sum(-1), -wv.sum(-1), w.sum(-1)
+    JTJ = np.stack((np.stack((Suu, Suv, Su), -1),
+                    np.stack((Suv, Svv, Sv), -1),
+                    np.stack((Su, Sv, Sw), -1)), -2)
+    gradient = np.stack(((wu * residuals).sum(-1), (wv * residuals).sum(-1), -(w * residuals).sum(-1)), -1)
+    return JTJ, gradient
+
+
+def _levenberg_marquardt(x, y, w, xc, yc, r, max_iter, tol):
+    """Damped Gauss-Newton on the geometric residuals; only unconverged rows are evaluated."""
+    params = np.stack((xc, yc, r), axis=-1)
+    damping = np.full(len(xc), 1e-3)
+    iterations = np.zeros(len(xc), dtype=np.int64)
+    residuals, cost, u, v = _geometry(x, y, w, *params.T)
+    JTJ, gradient = _normal_equations(w, residuals, u, v)
+    active = np.flatnonzero(np.all(np.isfinite(params), axis=-1))
+    eye = np.eye(3)
+    for _ in range(max_iter):
+        if len(active) == 0:
+            break
+        system = JTJ[active] + damping[active, None, None] * (JTJ[active] * eye) + 1e-12 * eye
+        step = -np.linalg.solve(system, gradient[active][..., None])[..., 0]
+        candidate = params[active] + step
+        xa, ya, wa = x[active], y[active], w[active]
+        new_residuals, new_cost, new_u, new_v = _geometry(xa, ya, wa, *candidate.T)
+
+        improvement = cost[active] - new_cost
+        better = improvement > 0
+        rows = active[better]
+        params[rows], cost[rows] = candidate[better], new_cost[better]
+        JTJ[rows], gradient[rows] = _normal_equations(wa[better], new_residuals[better], new_u[better], new_v[better])
+        damping[active] = np.where(better, damping[active] / 10, damping[active] * 10)
+        iterations[active] += 1
+
+        small_step = np.linalg.norm(step, axis=-1) <= tol * (np.linalg.norm(candidate, axis=-1) + tol)
+        converged = better & (small_step | (improvement <= tol * new_cost))
+        active = active[~converged & (damping[active] < 1e10)]
+    return params, cost, iterations
+
+
+def fit_circles(x, y, mask=None, method="taubin", refine=True, max_iter=50, tol=1e-10) -> CircleFit:
+    """
+    Fits one circle per batch row in a single vectorized call.
+
+    Args:
+        x, y: (B, n) arrays, or lists of B 1D arrays of varying length (edge subsets).
+        mask (np.ndarray, optional): (B, n) bool, points taking part in each fit, or float weights.
+        method (str): Algebraic estimate, "kasa", "pratt" or "taubin".
+        refine (bool): Refines the algebraic estimate to the geometric (orthogonal distance)
+            least-squares circle with Levenberg-Marquardt and the analytic Jacobian.
+
+    Returns:
+        CircleFit: (B,) arrays xc, yc, r, rms, iterations, cond.
+    """
+    x, y, w = _as_batch(x, y, mask)
+    xc, yc, r = _algebraic(x, y, w, method)
+    iterations = np.zeros(len(xc), dtype=np.int64)
+    if refine:
+        params, _, iterations = _levenberg_marquardt(x, y, w, xc, yc, r, max_iter, tol)
+        xc, yc, r = params.T
+
+    residuals, cost, u, v = _geometry(x, y, w, xc, yc, r)
+    JTJ, _ = _normal_equations(w, residuals, u, v)
+    finite = np.all(np.isfinite(JTJ), axis=(-2, -1))
+    cond = np.full(len(xc), np.inf)
+    if finite.any():
+        cond[finite] = np.linalg.cond(JTJ[finite])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rms = np.sqrt(cost / w.sum(axis=-1))
+    return CircleFit(xc, yc, r, rms, iterations, cond)
+
+
+def fit_circle(x, y, method="taubin", refine=True, max_iter=50, tol=1e-10) -> CircleFit:
+    """Fits a single circle; see fit_circles(). Fields are plain floats."""
+    fit = fit_circles(np.asarray(x)[None], np.asarray(y)[None], method=method, refine=refine,
+                      max_iter=max_iter, tol=tol)
+    return CircleFit(*(field[0].item() for field in fit[:6]))
+
+
+def bootstrap_circles(x, y, resamples=200, method="taubin", refine=True, seed=None) -> CircleFit:
+    """Fits resamples (with replacement) of one point set in one batch, e.g. for the spread of r."""
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    index = np.random.default_rng(seed).integers(0, len(x), (resamples, len(x)))
+    return fit_circles(x[index], y[index], method=method, refine=refine)
+
+
+def _circumcircles(x, y, samples):
+    """Circles through the point triples samples (H, 3); degenerate triples give NaN."""
+    (ax, bx, cx), (ay, by, cy) = x[samples].T, y[samples].T
+    a2, b2, c2 = ax * ax + ay * ay, bx * bx + by * by, cx * cx + cy * cy
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d = 2 * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+        xc = (a2 * (by - cy) + b2 * (cy - ay) + c2 * (ay - by)) / d
+        yc = (a2 * (cx - bx) + b2 * (ax - cx) + c2 * (bx - ax)) / d
+    return xc, yc, np.hypot(ax - xc, ay - yc)
+
+
+def _ransac(x, y, threshold, hypotheses, rng, max_cells=4_000_000):
+    """Scores random 3-point circles in vectorized chunks; returns the inlier mask of the best."""
+    samples = np.sort(rng.integers(0, len(x), (hypotheses, 3)), axis=1)
+    xc, yc, r = _circumcircles(x, y, samples)
+    counts = np.zeros(hypotheses, dtype=np.int64)
+    chunk = max(1, max_cells // len(x))
+    for start in range(0, hypotheses, chunk):
+        part = slice(start, start + chunk)
+        residuals = np.abs(np.hypot(x - xc[part, None], y - yc[part, None]) - r[part, None])
+        counts[part] = (residuals <= threshold).sum(axis=1)
+    best = np.argmax(counts)
+    return np.abs(np.hypot(x - xc[best], y - yc[best]) - r[best]) <= threshold
+
+
+def _robust_weights(residuals, scale, loss):
+    u = np.abs(residuals) / scale
+    if loss == "huber":
+        return np.where(u <= HUBER_K, 1.0, HUBER_K / np.maximum(u, HUBER_K))
+    if loss == "tukey":
+        return np.where(u < TUKEY_C, (1 - (u / TUKEY_C) ** 2) ** 2, 0.0)
+    raise ValueError(f"Unknown robust loss: {loss}")
+
+
+def fit_circle_robust(x, y, threshold=0.2, hypotheses=256, loss="tukey", reweights=5, method="taubin", seed=0) -> CircleFit:
+    """
+    Fits a circle that stray edge points cannot pull, in bounded time.
+
+    A fixed number of random 3-point hypotheses is scored in one vectorized pass (RANSAC);
+    the best consensus set seeds a geometric fit, which is then refined by a fixed number of
+    iteratively reweighted fits over all points with the Huber or Tukey loss, the residual
+    scale being the MAD of the inliers. The seed makes the result reproducible.
+
+    Args:
+        threshold (float): Inlier distance to the circle (same unit as x and y).
+
+    Returns:
+        CircleFit: Floats; inlier_ratio is the share of points within threshold of the result,
+        rms is over those inliers.
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    if len(x) < 3:
+        return CircleFit(np.nan, np.nan, np.nan, np.nan, 0, np.inf, 0.0)
+    inliers = _ransac(x, y, threshold, hypotheses, np.random.default_rng(seed))
+    if inliers.sum() < 3:
+        inliers[:] = True
+    fit = fit_circles(x[None], y[None], mask=inliers[None], method=method)
+    iterations = int(fit.iterations[0])
+    for _ in range(reweights):
+        residuals = np.hypot(x - fit.xc[0], y - fit.yc[0]) - fit.r[0]
+        inliers = np.abs(residuals) <= threshold
+        if inliers.sum() < 3:
+            break
+        scale = max(1.4826 * np.median(np.abs(residuals[inliers])), 1e-9)
+        weights = _robust_weights(residuals, scale, loss)
+        previous = np.array([fit.xc[0], fit.yc[0], fit.r[0]])
+        fit = fit_circles(x[None], y[None], mask=weights[None], method=method)
+        iterations += int(fit.iterations[0])
+        if np.max(np.abs(np.array([fit.xc[0], fit.yc[0], fit.r[0]]) - previous)) <= 1e-9:
+            break
+
+    xc, yc, r = fit.xc[0].item(), fit.yc[0].item(), fit.r[0].item()
+    residuals = np.hypot(x - xc, y - yc) - r
+    inliers = np.abs(residuals) <= threshold
+    rms = float(np.sqrt(np.mean(residuals[inliers] ** 2))) if inliers.any() else np.nan
+    return CircleFit(xc, yc, r, rms, iterations, fit.cond[0].item(), float(inliers.mean()))
+
+
+def repair_circle_fit(x, y, fit, min_inlier_ratio, threshold=0.2, hypotheses=1024, min_support=0.5, seed=1) -> CircleFit:
+    """
+    Repairs a robust fit whose inlier_ratio is below min_inlier_ratio from the same points,
+    so a noisy edge does not cost a re-acquisition of the view.
+
+    The fit is first repeated with more RANSAC hypotheses, in case the consensus set was
+    missed. If the share is still too low, the points farther than threshold from the better
+    of the two are dropped as strays and the rest is fitted with half the threshold. That fit
+    is accepted if the kept points are at least min_support of all points and its
+    inlier_ratio, over the kept points and at the tighter threshold, reaches min_inlier_ratio.
+
+    Returns:
+        CircleFit: The repaired fit with repaired_from set to the inlier_ratio of fit, or fit
+        itself if it needs no repair or cannot be repaired.
+    """
+    if fit.inlier_ratio is None or fit.inlier_ratio >= min_inlier_ratio:
+        return fit
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    retry = fit_circle_robust(x, y, threshold, hypotheses, seed=seed)
+    best = retry if retry.inlier_ratio > fit.inlier_ratio else fit
+    if best.inlier_ratio >= min_inlier_ratio:
+        return best._replace(repaired_from=fit.inlier_ratio)
+
+    keep = np.abs(np.hypot(x - best.xc, y - best.yc) - best.r) <= threshold
+    if keep.sum() >= 3 and keep.mean() >= min_support:
+        trimmed = fit_circle_robust(x[keep], y[keep], threshold / 2, hypotheses, seed=seed)
+        if trimmed.inlier_ratio >= min_inlier_ratio:
+            return trimmed._replace(repaired_from=fit.inlier_ratio)
+    return fit
@@ -3,36 +3,177 @@ import cv2
 import matplotlib.pyplot as plt
 from scipy.spatial import cKDTree
 
+# Footprint of cv2.circle(radius=0, thickness=3), which the rasterizer used to draw per point
+POINT_FOOTPRINT = cv2.getStructuringElement(cv2.MORPH_CROSS, (3, 3))
+POINT_FOOTPRINT = cv2.dilate(np.pad(POINT_FOOTPRINT, 1), POINT_FOOTPRINT)
+EDGE_KERNEL = cv2.getStructuringElement(cv2.MORPH_CROSS, (3, 3))
+
 def get_scale():
     return 13
 
 def upscale_points(points, scale, image_size=(300, 300)):
+    """
+    Rasterizes 2D points (mm) into a binary image of image_size * scale pixels.
+
+    Pixel indices are scattered in one step and grown to the drawn point footprint by a
+    single dilation; the image is identical to drawing every point with cv2.circle.
+    """
     upscale_size = (image_size[0] * scale, image_size[1] * scale)
     image = np.zeros(upscale_size, dtype=np.uint8)
-    for x, y in points:
-        x, y = int(x * scale), int(y * scale)
-        if 0 <= x < upscale_size[1] and 0 <= y < upscale_size[0]:
-            cv2.circle(image, (x, y), radius=0, color=255, thickness=3)
-    return image
+    pixels = (np.asarray(points)[:, :2] * scale).astype(np.int64)
+    x, y = pixels[:, 0], pixels[:, 1]
+    inside = (x >= 0) & (x < upscale_size[1]) & (y >= 0) & (y < upscale_size[0])
+    image[y[inside], x[inside]] = 255
+    return cv2.dilate(image, POINT_FOOTPRINT)
+
+def rasterize_points(points, scale, margin=4, max_cells=(300 * 13) ** 2, trim=0.001):
+    """
+    Rasterizes 2D points (mm) like upscale_points, on a canvas fitted to their bounding box.
+
+    The canvas spans the occupied pixels plus margin pixels on every side, so its size
+    follows the region of interest. Row/column indices of the image are relative to origin
+    (row, col); add origin to get the pixel coordinates of the fixed canvas (mm * scale).
+
+    The canvas never exceeds max_cells pixels, the size of the former fixed 300 mm canvas
+    at scale 13. When stray points stretch the bounding box beyond that, the canvas is
+    fitted to the points between the trim and 1 - trim quantiles of each axis instead, and
+    if that is still too large it is cropped around its centre; points outside the canvas
+    are dropped, as upscale_points drops points outside its fixed canvas.
+
+    Returns:
+        image (np.ndarray): Binary uint8 image.
+        origin (np.ndarray): (row, col) pixel offset of the image.
+    """
+    points = np.asarray(points)
+    x = np.floor(points[:, 0] * scale).astype(np.int64)
+    y = np.floor(points[:, 1] * scale).astype(np.int64)
+    low, high = np.array([y.min(), x.min()]), np.array([y.max(), x.max()])
+    if np.prod(high - low + 2 * margin + 1) > max_cells:
+        # Stray points: fit the canvas to the bulk of the points
+        low = np.floor(np.quantile([y, x], trim, axis=1)).astype(np.int64)
+        high = np.ceil(np.quantile([y, x], 1 - trim, axis=1)).astype(np.int64)
+        size = high - low + 2 * margin + 1
+        if np.prod(size) > max_cells:
+            # Crop around the centre, keeping the aspect ratio
+            shrink = np.sqrt(max_cells / np.prod(size))
+            center, half = (low + high) // 2, np.floor((size * shrink - 2 * margin - 1) / 2).astype(np.int64)
+            low, high = center - half, center + half
+        inside = (y >= low[0]) & (y <= high[0]) & (x >= low[1]) & (x <= high[1])
+        x, y = x[inside], y[inside]
+    origin = low - margin
+    height, width = high - origin + margin + 1
+    image = np.zeros(height * width, dtype=np.uint8)
+    image[(y - origin[0]) * width + (x - origin[1])] = 255
+    return cv2.dilate(image.reshape(height, width), POINT_FOOTPRINT), origin
+
+def detect_edges(image, method="binary"):
+    """
+    Returns the edge image of a rasterized projection.
 
-def detect_edges(image):
-    blurred = cv2.GaussianBlur(image, (1,1), 0.5)
-    edges = cv2.Canny(image, 150, 200)
-    return edges
+    "binary" keeps the mask pixels that have a 4-neighbour outside the mask (mask XOR
+    eroded mask), which is exact for the binary images upscale_points produces.
+    "canny" is the former cv2.Canny(150, 200) operator.
+    """
+    if method == "canny":
+        return cv2.Canny(image, 150, 200)
+    if method != "binary":
+        raise ValueError(f"Unknown edge method: {method}")
+    return cv2.bitwise_xor(image, cv2.erode(image, EDGE_KERNEL))
+
+def envelope_points(points, bin_width):
+    """
+    Outer silhouette of a 2D point set without rasterizing it.
+
+    Points are binned in bin_width (mm) columns along X and rows along Y; in every column
+    the points with the lowest and highest Y, and in every row the points with the lowest
+    and highest X are kept. The returned points are input points, at native precision.
+    """
+    points = np.asarray(points)[:, :2]
+    keep = np.zeros(len(points), dtype=bool)
+    for axis in (0, 1):
+        coords = points[:, axis]
+        values = np.ascontiguousarray(points[:, 1 - axis])
+        bins = ((coords - coords.min()) / bin_width).astype(np.intp)
+        # Same dtype as values: ufunc.at takes its fast path only without casting
+        low = np.full(bins.max() + 1, np.inf, dtype=values.dtype)
+        high = np.full(bins.max() + 1, -np.inf, dtype=values.dtype)
+        np.minimum.at(low, bins, values)
+        np.maximum.at(high, bins, values)
+        keep |= (values == low[bins]) | (values == high[bins])
+    return points[keep]
+
+def neighbor_counts(points, radius, max_grid_cells=16_000_000):
+    """
+    Number of points within radius of every point, the point itself included, computed
+    without materializing neighbour lists.
+
+    Integer pixel coordinates are counted on their lattice: occupancy is accumulated on a
+    grid over their bounding box and correlated with the disc of the radius. Other inputs,
+    or lattices larger than max_grid_cells, are counted with cKDTree(return_length=True).
+    """
+    points = np.asarray(points)
+    reach = int(np.floor(radius))
+    if np.issubdtype(points.dtype, np.integer):
+        origin = points.min(axis=0) - reach
+        height, width = points.max(axis=0) - origin + reach + 1
+        if height * width <= max_grid_cells:
+            cells = (points[:, 0] - origin[0]) * width + (points[:, 1] - origin[1])
+            grid = np.bincount(cells, minlength=height * width).astype(np.float32).reshape(height, width)
+            offsets = np.arange(-reach, reach + 1)
+            disc = (offsets[:, None] ** 2 + offsets[None, :] ** 2 <= radius ** 2).astype(np.float32)
+            counts = cv2.filter2D(grid, -1, disc, borderType=cv2.BORDER_CONSTANT)
+            return np.rint(counts.ravel()[cells]).astype(np.int64)
+    return cKDTree(points).query_ball_point(points, r=radius, return_length=True)
 
 def radius_outlier_removal(points, radius=5, min_neighbors=3):
-    tree = cKDTree(points)
-    counts = tree.query_ball_point(points, r=radius)
-    mask = np.array([len(c) >= min_neighbors for c in counts])
-    return points[mask]
+    if len(points) == 0:
+        return points
+    return points[neighbor_counts(points, radius) >= min_neighbors]
+
+def process_and_visualize(points, edge_method="binary", engine="raster", bin_width=None, scale=None,
+                          window=None, pad=None):
+    """
+    Returns the boundary of a 2D projection as (row, col) = (y, x) * scale coordinates.
+
+    engine="raster" rasterizes the points and detects edges with edge_method; the
+    coordinates are integer pixels. engine="envelope" takes the per-bin min/max envelope
+    of the points (bin_width mm, 1 / scale by default); the coordinates are the exact
+    point positions in the same units. Both are cleaned by radius_outlier_removal.
+
+    Args:
+        scale (float, optional): Pixels per mm; get_scale() by default. Divide the
+            returned coordinates by the same scale.
+        window (tuple, optional): (x_min, x_max, y_min, y_max) in mm. Only points within
+            the window plus pad mm (10 pixels by default, beyond the outlier radius) are
+            processed and only boundary points inside the window are returned, so a fine
+            scale costs in proportion to the window. The edges the crop creates lie in the
+            pad and are dropped.
+    """
+    scale = get_scale() if scale is None else scale
+    points = np.asarray(points)
+    if window is not None:
+        x_min, x_max, y_min, y_max = window
+        pad = 10 / scale if pad is None else pad
+        points = points[(points[:, 0] > x_min - pad) & (points[:, 0] < x_max + pad) &
+                        (points[:, 1] > y_min - pad) & (points[:, 1] < y_max + pad)]
+    if len(points) == 0:
+        return np.empty((0, 2), dtype=np.int64)
 
-def process_and_visualize(points):
-    scale = get_scale()
-    high_res_image = upscale_points(points, scale=scale)
-    edges = detect_edges(high_res_image)
+    if engine == "envelope":
+        boundary = envelope_points(points, bin_width if bin_width is not None else 1 / scale)
+        edge_coords = boundary[:, ::-1] * scale
+    elif engine == "raster":
+        high_res_image, origin = rasterize_points(points, scale=scale)
+        edges = detect_edges(high_res_image, method=edge_method)
+        # Canvas offset'ini geri ekle: koordinatlar mm * scale piksel cinsinden kalır
+        edge_coords = np.column_stack(np.where(edges > 0)) + origin
+    else:
+        raise ValueError(f"Unknown edge engine: {engine}")
 
-    edge_coords = np.column_stack(np.where(edges > 0))
     # Radius-based outlier temizliği
     edge_coords = radius_outlier_removal(edge_coords, radius=5, min_neighbors=3)
 
+    if window is not None:
+        x, y = edge_coords[:, 1] / scale, edge_coords[:, 0] / scale
+        edge_coords = edge_coords[(x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max)]
     return edge_coords
@@ -1,7 +1,9 @@
 import open3d as o3d
 import numpy as np
-import matplotlib.pyplot as plt
 from Scripts import edges
+from Scripts.plot_artifact import PlotArtifact
+from depth_scan import DepthScan
+from point_cloud_view import PointCloudView
 import logging 
 from numpy import isfinite
 
@@ -12,12 +14,22 @@ def get_40(points, debug=False):
     Gelişmiş hassasiyet kontrolü ile nokta bulutu verilerinin genişliğini (x-ekseni aralığı) hesaplar.
     
     Args:
-        points (np.ndarray): (N, 3) şeklinde nokta bulutu verisi
+        points (np.ndarray | PointCloudView | DepthScan): (N, 3) şeklinde nokta bulutu verisi, görünümü veya
+            organize derinlik haritası; derinlik haritasında yalnızca üst 50 mm'lik bant dilimlenip noktaya çevrilir
         debug (bool): Hata ayıklama çıktısını etkinleştir
     
     Returns:
         float: 5 ondalık basamağa yuvarlanmış genişlik
     """
+    if isinstance(points, DepthScan):
+        if points.count() == 0:
+            points = np.empty((0, 3))
+        else:
+            y_max = points.bounds()[3]
+            points = points.roi(y=(y_max - 50, y_max), closed=True).points()
+    view = PointCloudView.of(points)
+    points = view.points
+
     if points.size == 0:
         logger.warning("get_40 fonksiyonuna boş nokta bulutu verildi")
         return 0.0
@@ -38,10 +50,9 @@ def get_40(points, debug=False):
     
     # Daha yüksek hassasiyetle min ve max hesapla
     # Yalnızca y ekseni ymax ile ymax - 50 arasındaki noktaları seç
-    y_max = np.max(points[:, 1])
+    y_max = view.max(1)
     y_min_range = y_max - 50
-    mask = (points[:, 1] <= y_max) & (points[:, 1] >= y_min_range)
-    x_coords_in_y_range = points[mask, 0]
+    x_coords_in_y_range = view.query(y=(y_min_range, y_max), closed=True)[:, 0]
     valid_x = x_coords_in_y_range[isfinite(x_coords_in_y_range)]
 
     x_min = np.min(valid_x)
@@ -74,84 +85,91 @@ def save_filtered_point_cloud(points_array, file_path):
     else:
         print(f"'{file_path}' boş bir veri içeriyor, kaydedilmedi.")
 
-def arm_horn_lengths(points, b_vertical=None):
+def arm_horn_lengths(points, b_vertical=None, artifacts=None):
     if b_vertical is None:
         raise ValueError("b_vertical değeri None olamaz.")
 
+    view = PointCloudView.of(points)
+    points = view.points
+
     # X merkezine göre bölme
-    x_center = (np.max(points[:, 0]) + np.min(points[:, 0])) / 2
+    x_center = (view.max(0) + view.min(0)) / 2
     delta_x = 1
 
     # Filtrelenmiş noktalar
-    filtered_points = points[
-        (points[:, 0] > x_center) & (points[:, 0] < x_center+ delta_x)
-    ]
+    filtered_points = view.query(x=(x_center, x_center + delta_x))
     
     # Boş veri kontrolü
     if filtered_points.size == 0:
         logger.error("Uyarı: Filtrelenmiş nokta bulutu boş!")
         return 0.0
 
-    # Görselleştirme
-    plt.figure(figsize=(12, 8))
-    
-    # Orijinal nokta bulutu (gri, küçük)
-    plt.scatter(points[:, 0], points[:, 1], c='lightgray', s=1, alpha=0.5, label='Orijinal')
-    
-    # Filtrelenmiş nokta bulutları (daha büyük ve renkli)
-    if filtered_points.size > 0:
-        plt.scatter(filtered_points[:, 0], filtered_points[:, 1], c='red', s=3, alpha=0.8, label='Filtre 1')
-    
-    plt.xlabel('X')
-    plt.ylabel('Y')
-    plt.title('Nokta Bulutu Filtreleme Sonuçları (XY Görünümü)')
-    plt.legend()
-    plt.grid(True, alpha=0.3)
-    plt.axis('equal')  # Eşit ölçeklendirme
-    
-    # PNG olarak kaydet
-    # plt.savefig('filtered_point_clouds_xy.png', dpi=300, bbox_inches='tight')
-    # plt.show()
+    # Görselleştirme kaydı
+    if artifacts is not None:
+        artifacts.append(
+            PlotArtifact('Nokta Bulutu Filtreleme Sonuçları (XY Görünümü)', 'X', 'Y', grid=0.3, figsize=(12, 8))
+            .scatter(points[:, 0], points[:, 1], c='lightgray', s=1, alpha=0.5, label='Orijinal')
+            .scatter(filtered_points[:, 0], filtered_points[:, 1], c='red', s=3, alpha=0.8, label='Filtre 1')
+        )
 
     l_248 = b_vertical - np.min(filtered_points[:, 1])
     return l_248
 
-def horn_diff(points, y_offset_low=60, y_offset_high=100, z_threshold=8, margin_fraction=0.05):
+def horn_diff(points, y_offset_low=60, y_offset_high=100, z_threshold=8, margin_fraction=0.05, edge_engine="raster",
+              scale=None, artifacts=None):
     """
     Nokta bulutunun X-Y düzlemindeki sol ve sağ bölgesini analiz eder, 
     kenar noktalarını belirler ve kenar çizgisine yakın noktaların ortalamasıyla 
-    yeni left ve right değerlerini hesaplayıp farklarını görselleştirir.
+    yeni left ve right değerlerini hesaplayıp farklarını döndürür.
 
     Parameters:
-    - points: numpy.ndarray, 3D noktaları içeren dizi (Nx3).
+    - points: numpy.ndarray, 3D noktaları içeren dizi (Nx3), PointCloudView veya DepthScan; derinlik haritasında
+      sol ve sağ bölgeler dilim olarak alınır, tüm bulut yalnızca görselleştirme istenirse noktaya çevrilir.
     - y_offset_low: float, Y ekseninde alt limit için offset.
     - y_offset_high: float, Y ekseninde üst limit için offset.
     - z_threshold: float, Z eksenindeki üst noktalardan seçme eşiği.
     - margin_fraction: float, kenar nokta seçiminde, grubun x aralığının kullanılacak oranı.
+    - edge_engine: str, kenar çıkarma yöntemi, "raster" veya "envelope".
+    - scale: float, kenar çıkarma çözünürlüğü (piksel/mm), varsayılan edges.get_scale().
+    - artifacts: list, verilirse nokta bulutu, kenarlar ve yeni left/right çizgileri bir PlotArtifact olarak eklenir.
 
     Returns:
     - x_difference: float, yeni left ve right arasındaki fark.
     - difference: float, medyan ile hesaplanan merkez arasındaki fark.
     """
-    import numpy as np
-    import matplotlib.pyplot as plt
+    if isinstance(points, DepthScan):
+        # Medyan x değeri ve bölgeler derinlik haritası dilimlerinden
+        median = points.median(0)
+        y_low = points.bounds()[2]
+        y_min = y_low + y_offset_low
+        y_max_val = y_low + y_offset_high
+        left = points.roi(x=(None, median), y=(y_min, y_max_val)).points()
+        right = points.roi(x=(median, None), y=(y_min, y_max_val)).points()
+        if artifacts is not None:
+            points = points.points()
+    else:
+        view = PointCloudView.of(points)
+        points = view.points
 
-    # Medyan x değeri
-    median = np.median(points[:, 0])
-    y_min = np.min(points[:, 1]) + y_offset_low
-    y_max_val = np.min(points[:, 1]) + y_offset_high
+        # Medyan x değeri
+        median = view.median(0)
+        y_min = view.min(1) + y_offset_low
+        y_max_val = view.min(1) + y_offset_high
 
-    # Sol ve sağ bölgeleri filtrele
-    left = points[(points[:, 0] < median) & (points[:, 1] > y_min) & (points[:, 1] < y_max_val)]
-    right = points[(points[:, 0] > median) & (points[:, 1] > y_min) & (points[:, 1] < y_max_val)]
+        # Sol ve sağ bölgeleri filtrele
+        left = view.query(x=(None, median), y=(y_min, y_max_val))
+        right = view.query(x=(median, None), y=(y_min, y_max_val))
 
     # Z ekseni filtresi: Yeterli veri varsa
     left = left[left[:, 2] > (np.max(left[:, 2]) - z_threshold)] if left.size > 0 else np.empty((0, 3))
     right = right[right[:, 2] > (np.max(right[:, 2]) - z_threshold)] if right.size > 0 else np.empty((0, 3))
 
+    # Ölçek bilgisini al
+    scale = edges.get_scale() if scale is None else scale
+
     # Kenar işlemleri: edges modülündeki fonksiyonu çağır (varsayım: edges modülü mevcut)
     if left.size > 0:
-        processed_left = edges.process_and_visualize(left[:, [0, 1]])
+        processed_left = edges.process_and_visualize(left[:, [0, 1]], engine=edge_engine, scale=scale)
         if isinstance(processed_left, tuple):
             processed_left = processed_left[0]
         processed_left = np.array(processed_left)
@@ -159,16 +177,13 @@ def horn_diff(points, y_offset_low=60, y_offset_high=100, z_threshold=8, margin_
         processed_left = np.empty((0, 2))
 
     if right.size > 0:
-        processed_right = edges.process_and_visualize(right[:, [0, 1]])
+        processed_right = edges.process_and_visualize(right[:, [0, 1]], engine=edge_engine, scale=scale)
         if isinstance(processed_right, tuple):
             processed_right = processed_right[0]
         processed_right = np.array(processed_right)
     else:
         processed_right = np.empty((0, 2))
 
-    # Ölçek bilgisini al
-    scale = edges.get_scale()
-
     # İşlenmiş verileri iki boyutlu diziye dönüştür.
     # Not: sütun sırası; ilk sütun x değeri, ikinci sütun y değeri.
     if processed_left.size > 0:
@@ -207,54 +222,45 @@ def horn_diff(points, y_offset_low=60, y_offset_high=100, z_threshold=8, margin_
         # print("feature14", difference)
         x_difference = new_right - new_left
 
-        plt.figure(figsize=(8, 8))
-        plt.scatter(points[:, 0], points[:, 1], s=1, color='blue', alpha=0.5, label='Object')
-        plt.scatter(left_arr[:, 0], left_arr[:, 1], s=10, color='green', label='Left')
-        plt.scatter(right_arr[:, 0], right_arr[:, 1], s=10, color='red', label='Right')
-        # Yeni kenar ortalamalarını gösteren çizgiler
-        plt.axvline(new_left, color='green', linestyle='--', label='New Left')
-        plt.axvline(new_right, color='red', linestyle='--', label='New Right')
-        plt.title("X-Y Düzleminde Boynuz Farkları")
-        plt.xlabel("X")
-        plt.ylabel("Y")
-        plt.axis('equal')
-        plt.legend()
-        plt.grid(True)
-        plt.show()
+        if artifacts is not None:
+            artifacts.append(
+                PlotArtifact("X-Y Düzleminde Boynuz Farkları", "X", "Y", grid=True)
+                .scatter(points[:, 0], points[:, 1], s=1, color='blue', alpha=0.5, label='Object')
+                .scatter(left_arr[:, 0], left_arr[:, 1], s=10, color='green', label='Left')
+                .scatter(right_arr[:, 0], right_arr[:, 1], s=10, color='red', label='Right')
+                # Yeni kenar ortalamalarını gösteren çizgiler
+                .vline(new_left, color='green', linestyle='--', label='New Left')
+                .vline(new_right, color='red', linestyle='--', label='New Right')
+            )
 
         return x_difference, difference
     else:
         # print("Sol veya sağ bölge için yeterli nokta yok.")
         return 0, 0
 
-def filter_and_visualize_projection_with_ply(points):
+def filter_and_visualize_projection_with_ply(points, artifacts=None):
+    view = PointCloudView.of(points)
+    points = view.points
+
     # X ekseninde ortadaki bölgeyi seç
-    median = np.median(points[:, 0])
+    median = view.median(0)
 
     # Y ekseninde max Y değeri ve max Y - 40 arası, Z ekseninde max Z - 15 arası filtreleme
-    y_max = np.max(points[:, 1])
-    z_max = np.max(points[:, 2])
+    y_max = view.max(1)
+    z_max = view.max(2)
 
     # Filtreleme işlemi
-    projected_points_2d = points[
-        (points[:, 0] < median + 1) &
-        (points[:, 0] > median - 1) &
-        (points[:, 1] < y_max) &
-        (points[:, 1] > y_max - 50) &
-        (points[:, 2] > z_max - 13)
-    ]
+    projected_points_2d = view.query(x=(median - 1, median + 1), y=(y_max - 50, y_max), z=(z_max - 13, None))
     
-    l_81_5 = np.min(projected_points_2d[:, 1])-np.min(points[:, 1])
+    l_81_5 = np.min(projected_points_2d[:, 1]) - view.min(1)
     l_7_1 = np.max(projected_points_2d[:, 1])-np.min(projected_points_2d[:, 1])
-    # Görselleştirme
-    plt.figure(figsize=(8, 8))
-    plt.scatter(points[:, 2], points[:, 1], color='red', s=1, label="All Points (Y-Z Proj.)")
-    plt.scatter(projected_points_2d[:, 2], projected_points_2d[:, 1], color='blue', s=1, label="Filtered Region (Y-Z Proj.)")
-    plt.title("Y-Z Düzleminde Filtrelenmiş Bölge ve Tüm Noktalar")
-    plt.xlabel("Y")
-    plt.ylabel("Z")
-    plt.axis('equal')
-    plt.legend()
-    plt.grid(True)  
+    # Görselleştirme kaydı
+    if artifacts is not None:
+        artifacts.append(
+            PlotArtifact("Y-Z Düzleminde Filtrelenmiş Bölge ve Tüm Noktalar", "Y", "Z", grid=True)
+            .scatter(points[:, 2], points[:, 1], color='red', s=1, label="All Points (Y-Z Proj.)")
+            .scatter(projected_points_2d[:, 2], projected_points_2d[:, 1], color='blue', s=1,
+                     label="Filtered Region (Y-Z Proj.)")
+        )
 
     return l_81_5, l_7_1
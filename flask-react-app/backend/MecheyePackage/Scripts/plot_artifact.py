@@ -0,0 +1,100 @@
+import numpy as np
+
+
+class PlotArtifact(object):
+    """
+    Everything one measurement figure shows: the arrays to draw and the fitted primitives.
+
+    Measurement functions fill an artifact only when the caller passes an artifacts list,
+    and nothing is drawn until render() is called, so the measurement path never creates
+    a figure. Layers are drawn in the order they were added.
+    """
+    def __init__(self, title: str, xlabel: str, ylabel: str, equal: bool = True, grid: bool = False,
+                 figsize=(8, 8)):
+        self.title = title
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.equal = equal
+        self.grid = grid
+        self.figsize = figsize
+        self.layers = []
+
+    def scatter(self, x, y, **style):
+        self.layers.append(("scatter", (np.asarray(x), np.asarray(y)), style))
+        return self
+
+    def line(self, x, y, **style):
+        self.layers.append(("line", (np.asarray(x), np.asarray(y)), style))
+        return self
+
+    def circle(self, xc: float, yc: float, r: float, **style):
+        self.layers.append(("circle", (xc, yc, r), style))
+        return self
+
+    def rectangle(self, x: float, y: float, width: float, height: float, **style):
+        self.layers.append(("rectangle", (x, y, width, height), style))
+        return self
+
+    def vline(self, x: float, **style):
+        self.layers.append(("vline", (x,), style))
+        return self
+
+    def render(self, ax=None, density_above: int = None, density_bins: int = 800):
+        """
+        Draws the artifact on ax, or on a new pyplot figure, and returns the figure.
+
+        Scatter layers with more than density_above points are drawn as a density image
+        (point counts on a grid of density_bins cells along the longer side) instead of
+        one marker per point; smaller layers such as edge points and all primitives are
+        drawn exactly. None draws every point.
+        """
+        if ax is None:
+            import matplotlib.pyplot as plt
+            ax = plt.figure(figsize=self.figsize).gca()
+        for kind, args, style in self.layers:
+            if kind == "scatter":
+                if density_above is not None and args[0].size > density_above:
+                    _draw_density(ax, *args, bins=density_bins, **style)
+                else:
+                    ax.scatter(*args, **style)
+            elif kind == "line":
+                ax.plot(*args, **style)
+            elif kind == "circle":
+                xc, yc, r = args
+                theta = np.linspace(0, 2 * np.pi, 100)
+                ax.plot(xc + r * np.cos(theta), yc + r * np.sin(theta), **style)
+            elif kind == "rectangle":
+                from matplotlib.patches import Rectangle
+                x, y, width, height = args
+                ax.add_patch(Rectangle((x, y), width, height, **style))
+            elif kind == "vline":
+                ax.axvline(*args, **style)
+        ax.set_title(self.title)
+        ax.set_xlabel(self.xlabel)
+        ax.set_ylabel(self.ylabel)
+        if self.equal:
+            ax.axis('equal')
+        if self.grid:
+            ax.grid(True, alpha=self.grid if isinstance(self.grid, float) else None)
+        if any("label" in style for _, _, style in self.layers):
+            ax.legend()
+        return ax.figure
+
+
+def _draw_density(ax, x, y, bins: int, color=None, c=None, alpha=None, label=None, **_):
+    """Draws points as log-scaled counts on a grid with imshow, shaded in the colour of the layer."""
+    from matplotlib.colors import LinearSegmentedColormap, to_rgba
+    color = color if color is not None else c if c is not None else "C0"
+    x_min, y_min = x.min(), y.min()
+    cell = max(x.max() - x_min, y.max() - y_min) / bins or 1.0
+    ix = ((x - x_min) / cell).astype(np.intp)
+    iy = ((y - y_min) / cell).astype(np.intp)
+    width, height = ix.max() + 1, iy.max() + 1
+    counts = np.bincount(iy * width + ix, minlength=width * height).reshape(height, width)
+    cmap = LinearSegmentedColormap.from_list("density", [to_rgba(color, 0.3), to_rgba(color, 1.0)])
+    ax.imshow(np.ma.masked_equal(np.log1p(counts), 0), origin="lower", cmap=cmap, alpha=alpha, aspect="auto",
+              interpolation="nearest", zorder=0,
+              extent=(x_min, x_min + width * cell, y_min, y_min + height * cell))
+    if label is not None:
+        # Legend entry of the image
+        ax.scatter([], [], color=color, alpha=alpha, label=label)
@@ -1,52 +1,55 @@
 import numpy as np
 import open3d as o3d
-import matplotlib.pyplot as plt
-from scipy.optimize import leastsq
-from Scripts import edges
-# Çember fitting için yardımcı fonksiyonlar
-def calc_radius(xc, yc, x, y):
-    return np.sqrt((x - xc)**2 + (y - yc)**2)
+import logging
+from Scripts import edges, circle_fit
+from Scripts.plot_artifact import PlotArtifact
+from point_cloud_view import PointCloudView
 
-def cost_function(params, x, y):
-    xc, yc, r = params
-    return calc_radius(xc, yc, x, y) - r
+logger = logging.getLogger(__name__)
 
-def initial_guess(x, y):
-    xc = np.mean(x)
-    yc = np.mean(y)
-    r = np.mean(np.sqrt((x - xc)**2 + (y - yc)**2))
-    return [xc, yc, r]
-
-def slope(pcd, b_vertical=None, y_divisor=0.22, delta_y=0.5, crc_l=58.67):
+def slope(pcd, b_vertical=None, y_divisor=0.22, delta_y=0.5, crc_l=58.67, edge_engine="raster", scale=None,
+          fit_mode="least_squares", min_inlier_ratio=0.0, return_fit=False, artifacts=None):
     """
     Nokta bulutu üzerinde kaydırma, filtreleme ve çember fitting işlemleri yapar.
 
     Parameters:
-    - points: numpy.ndarray, giriş nokta bulutu (Nx3 boyutunda).
+    - pcd: numpy.ndarray veya PointCloudView, giriş nokta bulutu (Nx3 boyutunda). Kaydırma yalnızca filtre
+      bandındaki noktalara uygulanır; tüm bulut yalnızca görselleştirme istenirse kopyalanır.
     - y_divisor: float, Y ekseninde filtreleme için bölme faktörü.
     - delta_y: float, X ekseni için filtreleme genişliği.
     - crc_l: float, Y ekseninde filtreleme uzunluğu.
+    - edge_engine: str, kenar çıkarma yöntemi, "raster" veya "envelope".
+    - scale: float, kenar çıkarma çözünürlüğü (piksel/mm), varsayılan edges.get_scale().
+    - fit_mode: str, "least_squares" veya "robust" (RANSAC + Tukey, bkz. circle_fit.fit_circle_robust).
+    - min_inlier_ratio: float, robust fit'in inlier oranı bunun altındaysa aynı kenar noktalarından
+      onarılır (bkz. circle_fit.repair_circle_fit).
+    - return_fit: bool, True ise sonuca çember fit raporu (circle_fit.CircleFit) eklenir.
+    - artifacts: list, verilirse noktalar, kenarlar ve çember bir PlotArtifact olarak eklenir.
 
     Returns:
     - yc, zc: float, fitted circle'ın merkezi koordinatları.
     - r_outer: float, fitted circle'ın yarıçapı.
+    - l79_73: float, b_vertical verildiyse çember merkezinin b_vertical'a uzaklığı.
+    - fit: circle_fit.CircleFit, yalnızca return_fit True ise.
     """
     
-    points = np.asarray(pcd).copy()
+    view = PointCloudView.of(pcd)
     l79_73 = 0
-    
-    # Y eksenini ters çevir
-    points[:, 1] = -points[:, 1]
-    
-    # Minimum değerleri çıkararak noktaları kaydır
-    min_vals = np.min(points, axis=0)
-    points -= min_vals
-            
 
-    # Min ve max değerleri hesapla
-    x_min, x_max = np.min(points[:, 0]), np.max(points[:, 0])
-    y_min, y_max = np.min(points[:, 1]), np.max(points[:, 1])
-    z_min, z_max = np.min(points[:, 2]), np.max(points[:, 2])
+    def shifted(points):
+        # Y eksenini ters çevir, minimum değerleri çıkararak noktaları kaydır
+        points = points.copy()
+        points[:, 1] = -points[:, 1]
+        points -= min_vals
+        return points
+
+    # Ters çevrilmiş Y ile minimum değerler, görünüm istatistiklerinden
+    min_vals = np.array([view.min(0), -view.max(1), view.min(2)], dtype=view.points.dtype)
+
+    # Min ve max değerleri hesapla (kaydırma monoton olduğundan kaydırılmış bulutunkilerle aynı)
+    x_min, x_max = min_vals[0] - min_vals[0], view.max(0) - min_vals[0]
+    y_min, y_max = min_vals[1] - min_vals[1], -view.min(1) - min_vals[1]
+    z_min, z_max = min_vals[2] - min_vals[2], view.max(2) - min_vals[2]
 
     # Y ve Z ekseni filtreleme sınırlarını belirle
     y_min_filter = y_min + (y_divisor * (y_max - y_min)) - 2
@@ -56,7 +59,11 @@ def slope(pcd, b_vertical=None, y_divisor=0.22, delta_y=0.5, crc_l=58.67):
     z_min_filter = z_min + 0.05 * (z_max - z_min)
     z_max_filter = z_min_filter + 100
 
-    # Filtreleme işlemi
+    # Filtreleme işlemi: biraz geniş tutulan bant orijinal koordinatlarda sorgulanır, kaydırılır ve
+    # kesin sınırlar kaydırılmış koordinatlarda uygulanır
+    eps = 1e-3
+    points = shifted(view.query(x=(min_vals[0] + x_center - delta_y - eps, min_vals[0] + x_center + delta_y + eps),
+                                y=(-min_vals[1] - y_max_filter - eps, -min_vals[1] - y_min_filter + eps)))
     filtered_points = points[
         (points[:, 0] > x_center - delta_y) &
         (points[:, 0] < x_center + delta_y) &
@@ -65,16 +72,21 @@ def slope(pcd, b_vertical=None, y_divisor=0.22, delta_y=0.5, crc_l=58.67):
     ]
 
     # Kenar işleme (2D)
-    projected_points_2d = edges.process_and_visualize(filtered_points[:, [1, 2]])
+    # Yalnızca filtrelenmiş bant rasterize edilir
+    scale = edges.get_scale() if scale is None else scale
+    projected_points_2d = edges.process_and_visualize(filtered_points[:, [1, 2]], engine=edge_engine, scale=scale)
     # projected_points_2d = filtered_points[:, [1, 2]]
     # Çember fitting için 2D koordinatlar
-    scale= edges.get_scale()
     y_2d, z_2d = projected_points_2d[:, 1] / scale, projected_points_2d[:, 0] / scale
     
-    # Başlangıç tahmini ve fitting işlemi
-    guess = initial_guess(y_2d, z_2d)
-    result, _ = leastsq(cost_function, guess, args=(y_2d, z_2d))
-    yc, zc, r_outer = result
+    # Taubin başlangıcı + analitik Jacobian'lı LM ile fitting işlemi
+    if fit_mode == "robust":
+        fit = circle_fit.repair_circle_fit(y_2d, z_2d, circle_fit.fit_circle_robust(y_2d, z_2d), min_inlier_ratio)
+    else:
+        fit = circle_fit.fit_circle(y_2d, z_2d)
+    yc, zc, r_outer = fit.xc, fit.yc, fit.r
+    logger.debug(f"slope circle fit: r={fit.r:.4f} rms={fit.rms:.4f} iterations={fit.iterations} cond={fit.cond:.3g} "
+                 f"inliers={fit.inlier_ratio} repaired_from={fit.repaired_from}")
 
     # print(f"Seçilen çemberin merkezi: ({yc:.2f}, {zc:.2f}), Yarıçap: {r_outer:.2f}")
 
@@ -84,21 +96,15 @@ def slope(pcd, b_vertical=None, y_divisor=0.22, delta_y=0.5, crc_l=58.67):
         l79_73 =  yc - b_vertical
         # print("l_79_73",l79_73)
     
-    # Çember noktalarını oluştur
-    theta = np.linspace(0, 2 * np.pi, 100)
-    circle_y = yc + r_outer * np.cos(theta)
-    circle_z = zc + r_outer * np.sin(theta)
-    # Görselleştirme
-    plt.figure(figsize=(8, 8))
-    plt.scatter(points[:,1], points[:,2], color='green', label='Noktalar')
-    plt.scatter(y_2d, z_2d, color='blue', label='Noktalar')
-    plt.plot(circle_y, circle_z, color='red', label=f'Fitted Circle (r={r_outer:.2f})')
-    plt.title("Y-Z Düzleminde Nokta Bulutu ve Çember Fitting")
-    plt.xlabel("Y")
-    plt.ylabel("Z")
-    plt.axis('equal')
-    plt.legend()
-    plt.grid(True)
+    # Görselleştirme kaydı
+    if artifacts is not None:
+        points = shifted(view.points)
+        artifacts.append(
+            PlotArtifact("Y-Z Düzleminde Nokta Bulutu ve Çember Fitting", "Y", "Z", grid=True)
+            .scatter(points[:, 1], points[:, 2], color='green', label='Noktalar')
+            .scatter(y_2d, z_2d, color='blue', label='Noktalar')
+            .circle(yc, zc, r_outer, color='red', label=f'Fitted Circle (r={r_outer:.2f})')
+        )
 
     # Open3D ile 3D görselleştirme
     # filtered_pcd = o3d.geometry.PointCloud()
@@ -111,4 +117,6 @@ def slope(pcd, b_vertical=None, y_divisor=0.22, delta_y=0.5, crc_l=58.67):
     # o3d.io.write_point_cloud("filtered_points.ply", filtered_pcd)   
     # o3d.io.write_point_cloud("filtered2.ply", filtered_pcd2)
     
+    if return_fit:
+        return yc, zc, r_outer, l79_73, fit
     return yc, zc, r_outer, l79_73
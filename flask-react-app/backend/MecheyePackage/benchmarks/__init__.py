@@ -0,0 +1,31 @@
+"""
+Micro-benchmarks of the scan pipeline that run without the profiler or the robot.
+
+Run from MecheyePackage, whose modules they import; behaviour is covered by the tests in
+tests/, the benchmarks only time the former path against the current one.
+
+Usage:
+    python -m benchmarks handoff [--width 4096] [--lines 4000] [--repeat 10]
+    python -m benchmarks edges [--radius 20] [--spacing 0.1] [--repeat 3]
+    python -m benchmarks canvas [--radii 5 20 60] [--repeat 3]
+    python -m benchmarks engines [SCAN_DIR ...]
+    python -m benchmarks outliers [SCAN_DIR ...] [--repeat 3]
+    python -m benchmarks headless [SCAN_DIR ...] [--dpi 300] [--repeat 3]
+    python -m benchmarks figures [SCAN_DIR ...] [--dpi 300] [--budget SECONDS]
+    python -m benchmarks density [SCAN_DIR ...] [--dpi 300] [--density-above 20000] [--density-bins 800]
+    python -m benchmarks depthscan [--width 2500] [--lines 4000] [--repeat 3]
+    python -m benchmarks views [SCAN_DIR ...] [--width 2500] [--lines 4000] [--repeat 3]
+    python -m benchmarks calibration [--width 2500] [--repeat 3]
+    python -m benchmarks graph [SCAN_DIR] [--acquire-ms 1200 1500 1500 3500] [--workers 4]
+    python -m benchmarks pool [SCAN_DIR] [--processes 2] [--repeat 5]
+    python -m benchmarks circlefit [--points 1500] [--arc 90] [--resamples 200] [--repeat 5]
+    python -m benchmarks robust [--points 1500] [--outliers 0 0.05 0.2 0.4] [--repeat 3]
+
+Modules:
+    acquisition  batch hand-off of the acquisition callback (handoff)
+    raster       rasterizer, edge engines and outlier removal (edges, canvas, engines, outliers)
+    figures      figure rendering and the figure worker (headless, figures, density)
+    clouds       DepthScan, PointCloudView and calibration (depthscan, views, calibration)
+    scheduling   measurement graph and worker process pool (graph, pool)
+    circles      circle fits (circlefit, robust)
+"""
@@ -0,0 +1,127 @@
+import argparse
+
+import benchmarks
+from benchmarks import acquisition, circles, clouds, figures, raster, scheduling
+
+
+def print_report(report):
+    if isinstance(report, dict):
+        for name, value in report.items():
+            print(f"{name}: {value}")
+    else:
+        for entry in report:
+            print(entry)
+
+
+def print_per_scan(bench):
+    """Runs bench once per scan directory and prints its report under the directory."""
+    def run(args):
+        for scan_dir in args.scan_dirs:
+            print(scan_dir)
+            for name, entry in bench(scan_dir, args).items():
+                print(f"  {name}: {entry}")
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=benchmarks.__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    handoff = subparsers.add_parser("handoff", help="callback to consumer batch hand-off")
+    handoff.add_argument("--width", type=int, default=4096)
+    handoff.add_argument("--lines", type=int, default=4000)
+    handoff.add_argument("--repeat", type=int, default=10)
+    handoff.set_defaults(run=lambda args: print_report(acquisition.bench_handoff(args.width, args.lines, args.repeat)))
+
+    edge = subparsers.add_parser("edges", help="rasterizer and edge kernel of Scripts/edges.py")
+    edge.add_argument("--radius", type=float, default=20.0)
+    edge.add_argument("--spacing", type=float, default=0.1)
+    edge.add_argument("--repeat", type=int, default=3)
+    edge.set_defaults(run=lambda args: print(raster.bench_edges(args.radius, args.spacing, args.repeat)))
+
+    canvas = subparsers.add_parser("canvas", help="fixed against bounding-box raster canvas")
+    canvas.add_argument("--radii", type=float, nargs="+", default=[5.0, 20.0, 60.0])
+    canvas.add_argument("--repeat", type=int, default=3)
+    canvas.set_defaults(run=lambda args: print_report(raster.bench_canvas(args.radii, args.repeat)))
+
+    engines = subparsers.add_parser("engines", help="raster against envelope edge engine on recorded scans")
+    engines.add_argument("scan_dirs", nargs="*", default=["Scan_Outputs"])
+    engines.set_defaults(run=print_per_scan(lambda scan_dir, args: raster.compare_engines(scan_dir)))
+
+    outliers = subparsers.add_parser("outliers", help="neighbour counting of radius_outlier_removal")
+    outliers.add_argument("scan_dirs", nargs="*", default=["Scan_Outputs"])
+    outliers.add_argument("--repeat", type=int, default=3)
+    outliers.set_defaults(run=print_per_scan(lambda scan_dir, args: raster.bench_outliers(scan_dir, args.repeat)))
+
+    headless = subparsers.add_parser("headless", help="measurement steps with and without their figures")
+    headless.add_argument("scan_dirs", nargs="*", default=["Scan_Outputs"])
+    headless.add_argument("--dpi", type=int, default=300)
+    headless.add_argument("--repeat", type=int, default=3)
+    headless.set_defaults(run=print_per_scan(lambda scan_dir, args: figures.bench_headless(scan_dir, args.dpi, args.repeat)))
+
+    figure = subparsers.add_parser("figures", help="inline pyplot figures against the figure worker")
+    figure.add_argument("scan_dirs", nargs="*", default=["Scan_Outputs"])
+    figure.add_argument("--dpi", type=int, default=300)
+    figure.add_argument("--budget", type=float, default=None, help="rendering seconds per cycle")
+    figure.set_defaults(run=print_per_scan(lambda scan_dir, args: figures.bench_figure_worker(
+        scan_dir, args.dpi, args.budget)))
+
+    density = subparsers.add_parser("density", help="per-point scatter against density image figures")
+    density.add_argument("scan_dirs", nargs="*", default=["Scan_Outputs"])
+    density.add_argument("--dpi", type=int, default=300)
+    density.add_argument("--density-above", type=int, default=20000)
+    density.add_argument("--density-bins", type=int, default=800)
+    density.set_defaults(run=print_per_scan(lambda scan_dir, args: figures.bench_density(
+        scan_dir, args.dpi, args.density_above, args.density_bins)))
+
+    depthscan = subparsers.add_parser("depthscan", help="vertical ROI queries on N x 3 points against DepthScan")
+    depthscan.add_argument("--width", type=int, default=2500)
+    depthscan.add_argument("--lines", type=int, default=4000)
+    depthscan.add_argument("--repeat", type=int, default=3)
+    depthscan.set_defaults(run=lambda args: print_report(clouds.bench_depthscan(args.width, args.lines, args.repeat)))
+
+    views = subparsers.add_parser("views", help="band filters on N x 3 arrays against PointCloudView")
+    views.add_argument("scan_dirs", nargs="*", default=[])
+    views.add_argument("--width", type=int, default=2500)
+    views.add_argument("--lines", type=int, default=4000)
+    views.add_argument("--repeat", type=int, default=3)
+    views.set_defaults(run=lambda args: print_report(clouds.bench_views(args.scan_dirs, args.width, args.lines, args.repeat)))
+
+    calibration = subparsers.add_parser("calibration", help="chained float64 point preparation against calibration.json")
+    calibration.add_argument("--width", type=int, default=2500)
+    calibration.add_argument("--repeat", type=int, default=3)
+    calibration.set_defaults(run=lambda args: print_report(clouds.bench_calibration(args.width, args.repeat)))
+
+    graph = subparsers.add_parser("graph", help="threaded join schedule against the measurement graph")
+    graph.add_argument("scan_dir", nargs="?", default="Scan_Outputs")
+    graph.add_argument("--acquire-ms", type=float, nargs=4, default=[1200, 1500, 1500, 3500])
+    graph.add_argument("--workers", type=int, default=4)
+    graph.set_defaults(run=lambda args: print_report(scheduling.bench_graph(args.scan_dir, args.acquire_ms, args.workers)))
+
+    pool = subparsers.add_parser("pool", help="small and horizontal fits on threads against worker processes")
+    pool.add_argument("scan_dir", nargs="?", default="Scan_Outputs")
+    pool.add_argument("--processes", type=int, default=2)
+    pool.add_argument("--repeat", type=int, default=5)
+    pool.set_defaults(run=lambda args: print_report(scheduling.bench_pool(args.scan_dir, args.processes, args.repeat)))
+
+    circlefit = subparsers.add_parser("circlefit", help="leastsq against the shared circle fit module")
+    circlefit.add_argument("--points", type=int, default=1500)
+    circlefit.add_argument("--arc", type=float, default=90.0)
+    circlefit.add_argument("--resamples", type=int, default=200)
+    circlefit.add_argument("--repeat", type=int, default=5)
+    circlefit.set_defaults(run=lambda args: print_report(circles.bench_circlefit(args.points, args.arc, args.resamples,
+                                                                                 args.repeat)))
+
+    robust = subparsers.add_parser("robust", help="least-squares against robust circle fits with outliers")
+    robust.add_argument("--points", type=int, default=1500)
+    robust.add_argument("--outliers", type=float, nargs="+", default=[0.0, 0.05, 0.2, 0.4])
+    robust.add_argument("--repeat", type=int, default=3)
+    robust.set_defaults(run=lambda args: print_report(circles.bench_robust(args.points, args.outliers, args.repeat)))
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
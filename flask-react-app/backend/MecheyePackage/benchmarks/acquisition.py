@@ -0,0 +1,60 @@
+"""Hand-off of profile batches from the acquisition callback to the consumer."""
+import multiprocessing
+import threading
+import numpy as np
+
+from benchmarks.common import best_ms
+
+
+def synthetic_batch(width: int, lines: int, valid_ratio: float = 0.3, seed: int = 0) -> dict:
+    """Arrays shaped like one ProfileBatch: float32 depth (NaN = invalid), uint8 intensity, encoder."""
+    rng = np.random.default_rng(seed)
+    depth = rng.uniform(0, 100, (lines, width)).astype(np.float32)
+    depth[rng.random((lines, width)) > valid_ratio] = np.nan
+    return {
+        "depth": depth,
+        "intensity": rng.integers(0, 255, (lines, width), dtype=np.uint8),
+        "encoder": np.arange(lines, dtype=np.int32),
+    }
+
+
+def bench_handoff(width: int = 4096, lines: int = 4000, repeat: int = 10) -> dict:
+    """
+    Copy cost of handing the vertical batch from the acquisition callback to the consumer.
+
+    "double_copy" is the former path: the callback appends the batch to its own buffer under
+    a multiprocessing.Lock, then the consumer appends that buffer again. "zero_copy" is the
+    current path: one append under a threading.Lock, then the buffer is handed over by reference.
+    """
+    batch = synthetic_batch(width, lines)
+    process_lock = multiprocessing.Lock()
+    thread_lock = threading.Lock()
+
+    def append(lock):
+        with lock:
+            return {name: array.copy() for name, array in batch.items()}
+
+    def double_copy():
+        callback_buffer = append(process_lock)
+        return {name: array.copy() for name, array in callback_buffer.items()}
+
+    def zero_copy():
+        callback_buffer = append(thread_lock)
+        with thread_lock:
+            consumer_buffer = callback_buffer
+        return consumer_buffer
+
+    def lock_cost(lock, n=100000):
+        def run():
+            for _ in range(n):
+                with lock:
+                    pass
+        return best_ms(run, 3) * 1000 / n
+
+    return {
+        "batch_mb": round(sum(array.nbytes for array in batch.values()) / 2**20, 1),
+        "double_copy_ms": round(best_ms(double_copy, repeat), 2),
+        "zero_copy_ms": round(best_ms(zero_copy, repeat), 2),
+        "multiprocessing_lock_us": round(lock_cost(process_lock), 3),
+        "threading_lock_us": round(lock_cost(thread_lock), 3),
+    }
@@ -0,0 +1,79 @@
+"""Circle fits of Scripts/circle_fit.py against the former leastsq fits."""
+import numpy as np
+
+from benchmarks.common import best_ms
+
+
+def bench_circlefit(points: int = 1500, arc: float = 90.0, resamples: int = 200, repeat: int = 5, seed: int = 0) -> dict:
+    """
+    The former scipy leastsq circle fit (mean-based guess, numerical Jacobian) against
+    Scripts/circle_fit on a noisy arc of arc degrees, single and as a bootstrap batch.
+    """
+    from scipy.optimize import leastsq
+    from Scripts import circle_fit
+
+    rng = np.random.default_rng(seed)
+    theta = rng.uniform(0, np.radians(arc), points)
+    x = 40 + 25 * np.cos(theta) + rng.normal(0, 0.05, points)
+    y = 60 + 25 * np.sin(theta) + rng.normal(0, 0.05, points)
+
+    def legacy(x, y):
+        guess = [np.mean(x), np.mean(y), np.mean(np.hypot(x - np.mean(x), y - np.mean(y)))]
+        return leastsq(lambda p, x, y: np.hypot(x - p[0], y - p[1]) - p[2], guess, args=(x, y))[0]
+
+    reference = legacy(x, y)
+    report = {"leastsq": {"r": round(float(reference[2]), 5), "ms": round(best_ms(lambda: legacy(x, y), repeat), 3)}}
+    for method in circle_fit.ALGEBRAIC_METHODS:
+        algebraic = circle_fit.fit_circle(x, y, method=method, refine=False)
+        fit = circle_fit.fit_circle(x, y, method=method)
+        report[method] = {
+            "algebraic_r": round(algebraic.r, 5),
+            "algebraic_ms": round(best_ms(lambda: circle_fit.fit_circle(x, y, method=method, refine=False), repeat), 3),
+            "r": round(fit.r, 5),
+            "ms": round(best_ms(lambda: circle_fit.fit_circle(x, y, method=method), repeat), 3),
+            "max_diff_to_leastsq": float(np.max(np.abs(np.array(fit[:3]) - reference))),
+            "iterations": fit.iterations,
+            "rms": round(fit.rms, 5),
+            "cond": float(f"{fit.cond:.3g}"),
+        }
+
+    index = rng.integers(0, points, (resamples, points))
+    report["bootstrap"] = {
+        "resamples": resamples,
+        "leastsq_loop_ms": round(best_ms(lambda: [legacy(x[i], y[i]) for i in index], 1), 1),
+        "batched_ms": round(best_ms(lambda: circle_fit.fit_circles(x[index], y[index]), 1), 1),
+        "r_std": round(float(circle_fit.fit_circles(x[index], y[index]).r.std()), 5),
+    }
+    return report
+
+
+def bench_robust(points: int = 1500, outliers=(0.0, 0.05, 0.2, 0.4), repeat: int = 3, seed: int = 0) -> list:
+    """
+    Least-squares against robust (RANSAC + Huber/Tukey) circle fits on a noisy 90 degree arc
+    with a growing share of stray points scattered around the arc's bounding box.
+    """
+    from Scripts import circle_fit
+
+    rng = np.random.default_rng(seed)
+    theta = rng.uniform(0, np.pi / 2, points)
+    arc_x = 40 + 25 * np.cos(theta) + rng.normal(0, 0.05, points)
+    arc_y = 60 + 25 * np.sin(theta) + rng.normal(0, 0.05, points)
+    results = []
+    for share in outliers:
+        count = int(points * share)
+        x = np.r_[arc_x, rng.uniform(40, 65, count)]
+        y = np.r_[arc_y, rng.uniform(60, 85, count)]
+        fits = {"least_squares": lambda: circle_fit.fit_circle(x, y)}
+        for loss in circle_fit.ROBUST_LOSSES:
+            fits[loss] = lambda loss=loss: circle_fit.fit_circle_robust(x, y, loss=loss)
+        entry = {"outliers": share}
+        for name, fit in fits.items():
+            result = fit()
+            entry[name] = {
+                "center_error": round(float(np.hypot(result.xc - 40, result.yc - 60)), 4),
+                "r_error": round(result.r - 25, 4),
+                "inlier_ratio": None if result.inlier_ratio is None else round(result.inlier_ratio, 3),
+                "ms": round(best_ms(fit, repeat), 1),
+            }
+        results.append(entry)
+    return results
@@ -0,0 +1,238 @@
+"""Point cloud representations: DepthScan, PointCloudView and calibrated view preparation."""
+import time
+import numpy as np
+
+from benchmarks.common import PACKAGE_DIR, best_ms, synthetic_vertical_depth, legacy_vertical_prep
+
+
+def bench_depthscan(width: int = 2500, lines: int = 4000, repeat: int = 3) -> dict:
+    """
+    ROI extraction of the vertical measurement on N x 3 points (boolean masks over the whole
+    cloud) against DepthScan (grid slices), on a synthetic vertical depth map.
+
+    "prep" is gripper removal, 180 degree rotation and to_origin; "bands" are the ROI
+    queries of get_40 and both horn_diff calls. get_40 and horn_diff results are compared
+    between the two representations.
+    """
+    from depth_conversion import DepthToPointsConverter
+    from depth_scan import DepthScan
+    from Scripts import get_40, horn_diff
+
+    x_unit, y_unit = 40.0, 75.0
+    depth = synthetic_vertical_depth(width, lines, x_unit, y_unit)
+    cloud = DepthToPointsConverter().convert(depth, x_unit, y_unit).copy()
+    scan = DepthScan(depth, x_unit, y_unit)
+
+    def scan_prep():
+        x_min = scan.bounds()[0]
+        _, _, y_min, y_max = scan.roi(x=(None, x_min + 23)).bounds()
+        return scan.without(y=(y_min - 5, y_max + 5), closed=True).rotated(180).to_origin()
+
+    points, prepared = legacy_vertical_prep(cloud), scan_prep()
+
+    def point_bands():
+        y_max = np.max(points[:, 1])
+        band = points[(points[:, 1] <= y_max) & (points[:, 1] >= y_max - 50)]
+        median, y_low = np.median(points[:, 0]), np.min(points[:, 1])
+        for low, high in ((60, 100), (240, 280)):
+            y_band = (points[:, 1] > y_low + low) & (points[:, 1] < y_low + high)
+            left, right = points[(points[:, 0] < median) & y_band], points[(points[:, 0] > median) & y_band]
+        return band, left, right
+
+    def scan_bands():
+        y_max = prepared.bounds()[3]
+        band = prepared.roi(y=(y_max - 50, y_max), closed=True).points()
+        median, y_low = prepared.median(0), prepared.bounds()[2]
+        for low, high in ((60, 100), (240, 280)):
+            y_band = (y_low + low, y_low + high)
+            left, right = prepared.roi(x=(None, median), y=y_band).points(), prepared.roi(x=(median, None), y=y_band).points()
+        return band, left, right
+
+    return {
+        "points": len(cloud),
+        "prep_points_ms": round(best_ms(lambda: legacy_vertical_prep(cloud), repeat), 1),
+        "prep_scan_ms": round(best_ms(scan_prep, repeat), 1),
+        "bands_points_ms": round(best_ms(point_bands, repeat), 1),
+        "bands_scan_ms": round(best_ms(scan_bands, repeat), 2),
+        "get_40": (float(get_40(points)), float(get_40(prepared))),
+        # Against the scan's own points: the legacy rotation by np.cos/np.sin leaves ~1e-14 mm of
+        # cross-talk between X and Y, which splits the median column of horn_diff by rounding noise
+        "horn_17_2": [np.round(horn_diff(prepared.points()), 6).tolist(), np.round(horn_diff(prepared), 6).tolist()],
+        "horn_23_4": [np.round(horn_diff(prepared.points(), 240, 280), 6).tolist(),
+                      np.round(horn_diff(prepared, 240, 280), 6).tolist()],
+    }
+
+
+def bench_views(scan_dirs, width: int = 2500, lines: int = 4000, repeat: int = 3) -> dict:
+    """
+    Band filters of the measurement steps on N x 3 arrays (a mask over the whole cloud per
+    filter and a full pass per statistic) against one PointCloudView per cloud.
+
+    "vertical" runs get_40, both horn_diff and both slope calls, arm_horn_lengths and the
+    max Y of scan.py on the synthetic vertical cloud of bench_depthscan. "horizontal" runs
+    CircleFitter (datum, both circle windows, get_distance, get_B) and the projection on
+    horizontal_post.ply of each recorded scan. Each view is built inside the timed run, so
+    its indexing is included; "sorted_ms" uses sort=True, which also argsorts the axes that
+    are not monotonic. "index_ms" is the cost of indexing X and Y once without and with
+    sorting, "query_ms" one X band as a mask, on the argsorted X and one Y band (monotonic
+    rows) on the view. Results of all runs are compared.
+    """
+    import os
+    from depth_conversion import DepthToPointsConverter
+    from depth_scan import DepthScan
+    from point_cloud_view import PointCloudView
+    from pointcloud_io import read_ply
+    from Scripts import CircleFitter, get_40, horn_diff, slope, arm_horn_lengths, filter_and_visualize_projection_with_ply
+
+    x_unit, y_unit = 40.0, 75.0
+    depth = synthetic_vertical_depth(width, lines, x_unit, y_unit)
+    vertical = legacy_vertical_prep(DepthToPointsConverter().convert(depth, x_unit, y_unit).copy())
+    b_vertical = np.max(vertical[:, 1]) - 100
+
+    def vertical_steps(cloud):
+        return (get_40(cloud), horn_diff(cloud), horn_diff(cloud, 240, 280), slope(cloud, b_vertical)[:3],
+                slope(cloud, y_divisor=0.11, crc_l=28)[:3], arm_horn_lengths(cloud, b_vertical))
+
+    def horizontal_steps(cloud):
+        fitter = CircleFitter(cloud)
+        circles = fitter.fit_circles_and_plot("HORIZONTAL")
+        return circles, fitter.get_distance()[0], fitter.get_B(), filter_and_visualize_projection_with_ply(cloud)
+
+    def compare(steps, cloud):
+        results = [np.hstack(steps(variant)).astype(float)
+                   for variant in (cloud, PointCloudView(cloud), PointCloudView(cloud, sort=True))]
+        return {
+            "points": len(cloud),
+            "array_ms": round(best_ms(lambda: steps(cloud), repeat), 1),
+            "view_ms": round(best_ms(lambda: steps(PointCloudView(cloud)), repeat), 1),
+            "sorted_ms": round(best_ms(lambda: steps(PointCloudView(cloud, sort=True)), repeat), 1),
+            "equal": all(np.array_equal(results[0], result) for result in results[1:]),
+        }
+
+    def flat(steps):
+        return lambda cloud: [np.ravel(value) for value in steps(cloud)]
+
+    view = PointCloudView(vertical, sort=True)
+    view.indices(x=(0, 1), y=(0, 1))
+    median, y_max = np.median(vertical[:, 0]), np.max(vertical[:, 1])
+    report = {
+        "vertical": compare(flat(vertical_steps), vertical),
+        "index_ms": [round(best_ms(lambda: PointCloudView(vertical, sort=sort).indices(x=(0, 1), y=(0, 1)), repeat), 1)
+                     for sort in (False, True)],
+        "query_ms": [round(best_ms(lambda: vertical[(vertical[:, 0] > median) & (vertical[:, 0] < median + 1)], repeat), 2),
+                     round(best_ms(lambda: view.query(x=(median, median + 1)), repeat), 2),
+                     round(best_ms(lambda: view.query(y=(y_max - 50, y_max)), repeat), 2)],
+    }
+    for scan_dir in scan_dirs:
+        horizontal = read_ply(os.path.join(scan_dir, "horizontal_post.ply"))
+        report[f"horizontal {scan_dir}"] = compare(flat(horizontal_steps), horizontal)
+    return report
+
+
+def _legacy_cycle_prep(small, horizontal, horizontal2, vertical) -> dict:
+    """Point preparation of smol_calc, hor_calc and the N x 3 vertical path before the calibration file."""
+    def rotate(points, angle_degrees):
+        angle = np.radians(angle_degrees)
+        rotation = np.array([[np.cos(angle), -np.sin(angle), 0], [np.sin(angle), np.cos(angle), 0], [0, 0, 1]])
+        return points @ rotation.T
+
+    def to_origin(points):
+        points[:, 0] -= np.min(points[:, 0])
+        points[:, 1] -= np.min(points[:, 1])
+        return points
+
+    small = rotate(small, -90)
+    small = small[small[:, 2] > np.min(small[:, 2]) + 37]
+    small = to_origin(small[small[:, 0] < np.min(small[:, 0]) + 50])
+
+    horizontal2[:, 2] -= 70
+    horizontal2[:, 0] -= 50.21
+    datum = np.max(horizontal[:, 0]) - np.abs(np.max(horizontal[:, 0]) - np.min(horizontal2[:, 0]))
+    y_values = np.linspace(np.min(horizontal[:, 1]), np.max(horizontal[:, 1]), num=100)
+    line_points = np.array([[datum, y, np.min(horizontal[:, 2])] for y in y_values])
+    horizontal = to_origin(rotate(np.vstack((horizontal, line_points)), 90))
+
+    min_x = np.min(vertical[:, 0])
+    y_candidates = vertical[:, 1][vertical[:, 0] < min_x + 23]
+    vertical = vertical[(vertical[:, 1] < np.min(y_candidates) - 5) | (vertical[:, 1] > np.max(y_candidates) + 5)]
+    vertical = rotate(vertical, 180)
+    return {"small": small, "horizontal": horizontal, "horizontal2": horizontal2, "vertical": vertical,
+            "vertical_copy": to_origin(vertical.copy())}
+
+
+def _calibrated_cycle_prep(calibration, small, horizontal, horizontal2, vertical) -> dict:
+    """The same preparation with the per-view calibration, as scan.py does it now."""
+    def to_origin(points):
+        points[:, 0] -= np.min(points[:, 0])
+        points[:, 1] -= np.min(points[:, 1])
+        return points
+
+    small = calibration["small"].apply(small)
+    small = small[small[:, 2] > np.min(small[:, 2]) + 37]
+    small = to_origin(small[small[:, 0] < np.min(small[:, 0]) + 50])
+
+    horizontal2 = calibration["horizontal2"].apply(horizontal2)
+    datum = np.max(horizontal[:, 0]) - np.abs(np.max(horizontal[:, 0]) - np.min(horizontal2[:, 0]))
+    count = len(horizontal)
+    augmented = np.empty((count + 100, 3), dtype=np.float32)
+    augmented[:count] = horizontal
+    augmented[count:, 0] = datum
+    augmented[count:, 1] = np.linspace(np.min(horizontal[:, 1]), np.max(horizontal[:, 1]), num=100)
+    augmented[count:, 2] = np.min(horizontal[:, 2])
+    horizontal = calibration["horizontal"].apply(augmented, inplace=True)
+
+    min_x = np.min(vertical[:, 0])
+    y_candidates = vertical[:, 1][vertical[:, 0] < min_x + 23]
+    vertical = vertical[(vertical[:, 1] < np.min(y_candidates) - 5) | (vertical[:, 1] > np.max(y_candidates) + 5)]
+    vertical = calibration["vertical"].apply(vertical, inplace=True)
+    return {"small": small, "horizontal": horizontal, "horizontal2": horizontal2, "vertical": vertical,
+            "vertical_copy": to_origin(vertical.copy())}
+
+
+def bench_calibration(width: int = 2500, repeat: int = 3) -> dict:
+    """
+    Point preparation of one cycle (small, horizontal + horizontal2 and the N x 3 vertical
+    path) with the former chained float64 operations against the per-view calibration of
+    calibration.json, on synthetic depth maps of 1500, 1500, 1500 and 4000 lines.
+
+    Inputs are converter outputs: the calibrated small and horizontal2 views are written to
+    new arrays, the horizontal and vertical arrays the preparation builds are transformed in
+    place. "peak_mb" is the largest traced allocation (tracemalloc) while preparing, beyond
+    the inputs. "max_diff_mm" is the largest coordinate difference per view, and "dtypes"
+    the dtypes of the results.
+    """
+    import os
+    import tracemalloc
+    from depth_conversion import DepthToPointsConverter
+    from calibration import load_calibration
+
+    calibration = load_calibration(os.path.join(PACKAGE_DIR, "calibration.json"))
+    x_unit, y_unit = 40.0, 75.0
+    depths = [synthetic_vertical_depth(width, lines, x_unit, y_unit, seed) for seed, lines in enumerate((1500, 1500, 1500, 4000))]
+    # Raise part of the small view's body above the 37 mm height filter of smol_calc
+    depths[0][:, width // 2:] += 40
+    raw = [DepthToPointsConverter().convert(depth, x_unit, y_unit) for depth in depths]
+
+    def run(prepare):
+        fastest_ms, peak = float("inf"), 0
+        for _ in range(repeat):
+            inputs = [points.copy() for points in raw]
+            tracemalloc.start()
+            start = time.perf_counter()
+            result = prepare(*inputs)
+            fastest_ms = min(fastest_ms, (time.perf_counter() - start) * 1000)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        return result, fastest_ms, peak
+
+    legacy, legacy_ms, legacy_peak = run(_legacy_cycle_prep)
+    calibrated, calibrated_ms, calibrated_peak = run(lambda *inputs: _calibrated_cycle_prep(calibration, *inputs))
+    return {
+        "points": [len(points) for points in raw],
+        "legacy_ms": round(legacy_ms, 1),
+        "calibrated_ms": round(calibrated_ms, 1),
+        "legacy_peak_mb": round(legacy_peak / 2**20, 1),
+        "calibrated_peak_mb": round(calibrated_peak / 2**20, 1),
+        "max_diff_mm": {name: float(np.max(np.abs(legacy[name] - calibrated[name]))) for name in legacy},
+        "dtypes": {name: (str(legacy[name].dtype), str(calibrated[name].dtype)) for name in legacy},
+    }
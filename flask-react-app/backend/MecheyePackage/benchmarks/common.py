@@ -0,0 +1,61 @@
+"""Timing helper, synthetic inputs and recorded-scan loading shared by the benchmarks."""
+import os
+import time
+import numpy as np
+
+
+# MecheyePackage, whose modules the benchmarks import and whose files they read
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def best_ms(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+
+def load_recorded_scan(scan_dir: str):
+    """
+    Clouds scan.py saves with "save_point_clouds" (small.ply, horizontal_post.ply,
+    vertical.ply), i.e. the exact inputs of the fits, plus the vertical cloud moved to the
+    origin as horn_diff takes it.
+    """
+    from pointcloud_io import read_ply
+
+    small = read_ply(os.path.join(scan_dir, "small.ply"))
+    horizontal = read_ply(os.path.join(scan_dir, "horizontal_post.ply"))
+    vertical = read_ply(os.path.join(scan_dir, "vertical.ply"))
+    vertical_origin = vertical.copy()
+    vertical_origin[:, :2] -= vertical_origin[:, :2].min(axis=0)
+    return small, horizontal, vertical, vertical_origin
+
+
+def synthetic_vertical_depth(width: int = 2500, lines: int = 4000, x_unit: float = 40.0, y_unit: float = 75.0,
+                             seed: int = 0) -> np.ndarray:
+    """Depth map shaped like the vertical view: a part body and, 25 mm to its side, the gripper."""
+    rng = np.random.default_rng(seed)
+    x = np.arange(width) * x_unit * 1e-3
+    y = np.arange(lines) * y_unit * 1e-3
+    depth = np.full((lines, width), np.nan, dtype=np.float32)
+    body = (x > 30) & (x < 90)
+    depth[:, body] = 40 + 5 * np.sin(y[:, None] / 20) + rng.normal(0, 0.02, (lines, body.sum()))
+    depth[np.ix_((y > 120) & (y < 160), x < 5)] = 20
+    depth[rng.random(depth.shape) < 0.05] = np.nan
+    return depth
+
+
+def legacy_vertical_prep(points: np.ndarray) -> np.ndarray:
+    """remove_gripper_points, rotate_point_cloud(180) and to_origin of scan.py on N x 3 points."""
+    min_x = np.min(points[:, 0])
+    y_candidates = points[:, 1][points[:, 0] < min_x + 23]
+    y_min, y_max = np.min(y_candidates), np.max(y_candidates)
+    points = points[(points[:, 1] < y_min - 5) | (points[:, 1] > y_max + 5)]
+    angle = np.radians(180)
+    rotation = np.array([[np.cos(angle), -np.sin(angle), 0], [np.sin(angle), np.cos(angle), 0], [0, 0, 1]])
+    points = points @ rotation.T
+    points[:, 0] -= np.min(points[:, 0])
+    points[:, 1] -= np.min(points[:, 1])
+    return points
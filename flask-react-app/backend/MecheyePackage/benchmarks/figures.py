@@ -0,0 +1,148 @@
+"""Cost of the measurement figures: headless steps, the figure worker and density images."""
+import time
+import numpy as np
+
+from benchmarks.common import best_ms, load_recorded_scan
+
+
+def bench_headless(scan_dir: str, dpi: int = 300, repeat: int = 3) -> dict:
+    """
+    Cost of the figures of the measurement steps on a recorded scan (see common.load_recorded_scan).
+
+    "headless_ms" runs a step without an artifacts list, as scan.py does when figures are
+    neither saved nor shown; "artifact_ms" collects its plot artifacts; "render_ms" draws
+    and encodes them as PNG at dpi, the work the measurement path used to do inline.
+    """
+    import io
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from Scripts import CircleFitter, slope, horn_diff, arm_horn_lengths, filter_and_visualize_projection_with_ply
+
+    small, horizontal, vertical, vertical_origin = load_recorded_scan(scan_dir)
+    b_vertical = np.max(vertical[:, 1]) - 100
+
+    steps = {
+        "small_circle": lambda artifacts: CircleFitter(small).fit_circles_and_plot(
+            "SMALL", find_second_circle=False, val_x=0.20, val_z=0.2, delta_z=23, artifacts=artifacts),
+        "horizontal_circles": lambda artifacts: CircleFitter(horizontal).fit_circles_and_plot(
+            "HORIZONTAL", artifacts=artifacts),
+        "slope_1": lambda artifacts: slope(vertical, b_vertical, artifacts=artifacts),
+        "horn_17_2": lambda artifacts: horn_diff(vertical_origin, artifacts=artifacts),
+        "arm_horn": lambda artifacts: arm_horn_lengths(vertical, b_vertical, artifacts=artifacts),
+        "projection": lambda artifacts: filter_and_visualize_projection_with_ply(horizontal, artifacts=artifacts),
+    }
+
+    def render(artifacts):
+        for artifact in artifacts:
+            figure = artifact.render()
+            figure.savefig(io.BytesIO(), format="png", dpi=dpi, bbox_inches="tight")
+            plt.close(figure)
+
+    report = {}
+    for name, step in steps.items():
+        artifacts = []
+        step(artifacts)
+        report[name] = {
+            "headless_ms": round(best_ms(lambda: step(None), repeat), 1),
+            "artifact_ms": round(best_ms(lambda: step([]), repeat), 1),
+            "render_ms": round(best_ms(lambda: render(artifacts), repeat), 1),
+        }
+    return report
+
+
+def bench_figure_worker(scan_dir: str, dpi: int = 300, cycle_budget: float = None) -> dict:
+    """
+    Time the measurement path spends on its figures: rendering and saving them inline with
+    pyplot (the former save_figure path) against handing them to FigureWorker.
+
+    Artifacts are collected once from a recorded scan (see common.load_recorded_scan); the worker
+    report is taken after it has drained the queue, with cycle_budget applied.
+    """
+    import os
+    import tempfile
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from figure_worker import FigureWorker
+    from Scripts import CircleFitter, slope, horn_diff, filter_and_visualize_projection_with_ply
+
+    small, horizontal, vertical, vertical_origin = load_recorded_scan(scan_dir)
+
+    artifacts = []
+    CircleFitter(small).fit_circles_and_plot("SMALL", find_second_circle=False, val_x=0.20, val_z=0.2, delta_z=23,
+                                             artifacts=artifacts)
+    CircleFitter(horizontal).fit_circles_and_plot("HORIZONTAL", artifacts=artifacts)
+    horn_diff(vertical_origin, artifacts=artifacts)
+    slope(vertical, artifacts=artifacts)
+    filter_and_visualize_projection_with_ply(horizontal, artifacts=artifacts)
+
+    with tempfile.TemporaryDirectory() as figures_dir:
+        start = time.perf_counter()
+        for i, artifact in enumerate(artifacts):
+            figure = artifact.render()
+            figure.savefig(os.path.join(figures_dir, f"inline_{i}.png"), dpi=dpi, bbox_inches="tight")
+            plt.close(figure)
+        inline_ms = (time.perf_counter() - start) * 1000
+
+        worker = FigureWorker(figures_dir, dpi=dpi, cycle_budget=cycle_budget)
+        start = time.perf_counter()
+        for i, artifact in enumerate(artifacts):
+            worker.submit(artifact, f"worker_{i}.png")
+        submit_ms = (time.perf_counter() - start) * 1000
+        worker.new_cycle()
+        worker.close(timeout=600)
+        reports = worker.new_cycle()
+        written = len([name for name in os.listdir(figures_dir) if name.startswith("worker_")])
+
+    return {
+        "figures": len(artifacts),
+        "inline_ms": round(inline_ms, 1),
+        "submit_ms": round(submit_ms, 2),
+        "worker_written": written,
+        "worker_report": reports[0] if reports else None,
+    }
+
+
+def bench_density(scan_dir: str, dpi: int = 300, density_above: int = 20000, density_bins: int = 800) -> dict:
+    """
+    Render time and PNG size of the saved figures of a recorded scan (see common.load_recorded_scan),
+    drawn with one marker per point ("scatter") and with the large point layers binned into
+    a density image ("density", PlotArtifact.render(density_above=...)).
+    """
+    import os
+    import tempfile
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    from Scripts import CircleFitter, slope, horn_diff, filter_and_visualize_projection_with_ply
+
+    small, horizontal, vertical, vertical_origin = load_recorded_scan(scan_dir)
+
+    steps = {
+        "small_circles": lambda artifacts: CircleFitter(small).fit_circles_and_plot(
+            "SMALL", find_second_circle=False, val_x=0.20, val_z=0.2, delta_z=23, artifacts=artifacts),
+        "horizontal_circles": lambda artifacts: CircleFitter(horizontal).fit_circles_and_plot(
+            "HORIZONTAL", artifacts=artifacts),
+        "vertical_horn_17_2": lambda artifacts: horn_diff(vertical_origin, artifacts=artifacts),
+        "vertical_slope_1": lambda artifacts: slope(vertical, artifacts=artifacts),
+        "vertical_projection": lambda artifacts: filter_and_visualize_projection_with_ply(horizontal, artifacts=artifacts),
+    }
+
+    report = {}
+    with tempfile.TemporaryDirectory() as figures_dir:
+        for name, step in steps.items():
+            artifacts = []
+            step(artifacts)
+            artifact = artifacts[0]
+            entry = {"points": max(args[0].size for kind, args, _ in artifact.layers if kind == "scatter")}
+            for mode, threshold in (("scatter", None), ("density", density_above)):
+                path = os.path.join(figures_dir, f"{name}_{mode}.png")
+                start = time.perf_counter()
+                figure = Figure(figsize=artifact.figsize)
+                artifact.render(figure.add_subplot(), density_above=threshold, density_bins=density_bins)
+                figure.savefig(path, dpi=dpi, bbox_inches="tight")
+                entry[f"{mode}_ms"] = round((time.perf_counter() - start) * 1000, 1)
+                entry[f"{mode}_kb"] = round(os.path.getsize(path) / 1024, 1)
+            report[name] = entry
+    return report
@@ -0,0 +1,178 @@
+"""Rasterizer, edge kernels, edge engines and outlier removal of Scripts/edges.py."""
+import time
+import numpy as np
+import cv2
+
+from benchmarks.common import best_ms, load_recorded_scan
+
+
+def synthetic_projection(radius: float = 20.0, spacing: float = 0.1, center=(60.0, 60.0), seed: int = 0) -> np.ndarray:
+    """Jittered 2D points (mm) filling a disc, like the X-Z projection a circle is fitted on."""
+    rng = np.random.default_rng(seed)
+    grid = np.arange(-radius, radius, spacing)
+    points = np.stack(np.meshgrid(grid, grid), axis=-1).reshape(-1, 2)
+    points += rng.normal(0, spacing / 4, points.shape)
+    return points[np.hypot(points[:, 0], points[:, 1]) <= radius] + center
+
+
+def _legacy_upscale_points(points, scale, image_size=(300, 300)):
+    upscale_size = (image_size[0] * scale, image_size[1] * scale)
+    image = np.zeros(upscale_size, dtype=np.uint8)
+    for x, y in points:
+        x, y = int(x * scale), int(y * scale)
+        if 0 <= x < upscale_size[1] and 0 <= y < upscale_size[0]:
+            cv2.circle(image, (x, y), radius=0, color=255, thickness=3)
+    return image
+
+
+def bench_edges(radius: float = 20.0, spacing: float = 0.1, repeat: int = 3) -> dict:
+    """
+    Speed and accuracy of the edges.process_and_visualize() raster path.
+
+    "legacy" is the former per-point cv2.circle rasterizer followed by Canny; "vectorized" is
+    the index scatter plus dilation followed by the binary mask XOR eroded mask edge kernel.
+    Accuracy is reported as the distance between both edge sets and the circle each one fits
+    against the synthetic disc.
+    """
+    from scipy.spatial import cKDTree
+    from Scripts import edges
+    from Scripts.circle_fit import fit_circle
+
+    points = synthetic_projection(radius, spacing)
+    scale = edges.get_scale()
+    legacy_image = _legacy_upscale_points(points, scale)
+    image = edges.upscale_points(points, scale)
+
+    def edge_set(image, method):
+        coords = np.column_stack(np.where(edges.detect_edges(image, method) > 0))
+        return edges.radius_outlier_removal(coords, radius=5, min_neighbors=3)
+
+    legacy_coords = edge_set(legacy_image, "canny")
+    coords = edge_set(image, "binary")
+    distance, _ = cKDTree(legacy_coords).query(coords)
+    fits = {}
+    for name, edge_coords in (("legacy", legacy_coords), ("vectorized", coords)):
+        xc, yc, r = fit_circle(edge_coords[:, 1] / scale, edge_coords[:, 0] / scale, method="kasa", refine=False)[:3]
+        fits[name] = {"xc": round(float(xc), 4), "yc": round(float(yc), 4), "r": round(float(r), 4)}
+
+    return {
+        "points": len(points),
+        "raster_identical": bool(np.array_equal(legacy_image, image)),
+        "legacy_raster_ms": round(best_ms(lambda: _legacy_upscale_points(points, scale), repeat), 1),
+        "vectorized_raster_ms": round(best_ms(lambda: edges.upscale_points(points, scale), repeat), 1),
+        "canny_ms": round(best_ms(lambda: edges.detect_edges(image, "canny"), repeat), 1),
+        "binary_edges_ms": round(best_ms(lambda: edges.detect_edges(image, "binary"), repeat), 1),
+        "legacy_edge_points": len(legacy_coords),
+        "vectorized_edge_points": len(coords),
+        "edge_distance_mean_mm": round(float(distance.mean()) / scale, 4),
+        "edge_distance_max_mm": round(float(distance.max()) / scale, 4),
+        "fits": fits,
+        "true_radius": radius,
+    }
+
+
+def bench_canvas(radii=(5.0, 20.0, 60.0), repeat: int = 3) -> list:
+    """
+    Canvas memory and edge extraction time of the fixed 300 x 300 mm canvas (upscale_points)
+    against the bounding-box canvas (rasterize_points) for regions of growing size.
+    """
+    from Scripts import edges
+
+    scale = edges.get_scale()
+    results = []
+    for radius in radii:
+        points = synthetic_projection(radius, center=(radius + 10, radius + 10))
+        fixed_image = edges.upscale_points(points, scale)
+        tight_image, origin = edges.rasterize_points(points, scale)
+        fixed_coords = np.column_stack(np.where(edges.detect_edges(fixed_image) > 0))
+        tight_coords = np.column_stack(np.where(edges.detect_edges(tight_image) > 0)) + origin
+        results.append({
+            "radius": radius,
+            "points": len(points),
+            "fixed_canvas_mb": round(fixed_image.nbytes / 2**20, 2),
+            "tight_canvas_mb": round(tight_image.nbytes / 2**20, 2),
+            "fixed_ms": round(best_ms(lambda: edges.detect_edges(edges.upscale_points(points, scale)), repeat), 1),
+            "tight_ms": round(best_ms(lambda: edges.detect_edges(edges.rasterize_points(points, scale)[0]), repeat), 1),
+            "same_edges": bool(np.array_equal(fixed_coords, tight_coords)),
+        })
+    return results
+
+
+def compare_engines(scan_dir: str) -> dict:
+    """
+    Runs the circle, slope and horn fits of one recorded scan with both edge engines.
+
+    scan_dir holds the clouds scan.py saves with "save_point_clouds" (small.ply,
+    horizontal_post.ply, vertical.ply), i.e. the exact inputs of the fits. Every fit reports
+    its result per engine, the largest absolute difference between them and the run time.
+    """
+    from Scripts import CircleFitter, slope, horn_diff
+
+    small, horizontal, vertical, vertical_origin = load_recorded_scan(scan_dir)
+
+    fits = {
+        "small_circle": lambda engine: CircleFitter(small).fit_circles_and_plot(
+            "SMALL", find_second_circle=False, val_x=0.20, val_z=0.2, delta_z=23, edge_engine=engine),
+        "horizontal_circles": lambda engine: CircleFitter(horizontal).fit_circles_and_plot(
+            "HORIZONTAL", edge_engine=engine),
+        "slope_1": lambda engine: slope(vertical, edge_engine=engine)[:3],
+        "slope_2": lambda engine: slope(vertical, y_divisor=0.11, crc_l=28, edge_engine=engine)[:3],
+        "horn_17_2": lambda engine: horn_diff(vertical_origin, edge_engine=engine),
+        "horn_23_4": lambda engine: horn_diff(vertical_origin, 240, 280, edge_engine=engine),
+    }
+    report = {}
+    for name, fit in fits.items():
+        entry = {}
+        for engine in ("raster", "envelope"):
+            start = time.perf_counter()
+            result = fit(engine)
+            entry[f"{engine}_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            entry[engine] = None if result is None else np.round(np.asarray(result, dtype=float).ravel(), 4).tolist()
+        if entry["raster"] is not None and entry["envelope"] is not None:
+            entry["max_abs_diff"] = round(max(abs(a - b) for a, b in zip(entry["raster"], entry["envelope"])), 4)
+        report[name] = entry
+    return report
+
+
+def bench_outliers(scan_dir: str, repeat: int = 3) -> dict:
+    """
+    Neighbour counting of radius_outlier_removal on the raw edge sets of the small (X-Y),
+    horizontal (X-Y) and vertical (Y-Z) projections of a recorded scan (see common.load_recorded_scan).
+
+    "lists" is the former query_ball_point neighbour lists counted in Python,
+    "return_length" counts in cKDTree, "lattice" counts on the pixel grid (current path).
+    """
+    import os
+    from scipy.spatial import cKDTree
+    from pointcloud_io import read_ply
+    from Scripts import edges
+
+    projections = {
+        "small": read_ply(os.path.join(scan_dir, "small.ply"))[:, [0, 1]],
+        "horizontal": read_ply(os.path.join(scan_dir, "horizontal_post.ply"))[:, [0, 1]],
+        "vertical": read_ply(os.path.join(scan_dir, "vertical.ply"))[:, [1, 2]],
+    }
+    radius, min_neighbors = 5, 3
+    report = {}
+    for name, points in projections.items():
+        image, origin = edges.rasterize_points(points, edges.get_scale())
+        coords = np.column_stack(np.where(edges.detect_edges(image) > 0)) + origin
+
+        def lists():
+            counts = cKDTree(coords).query_ball_point(coords, r=radius)
+            return np.array([len(c) >= min_neighbors for c in counts])
+
+        def return_length():
+            return cKDTree(coords).query_ball_point(coords, r=radius, return_length=True) >= min_neighbors
+
+        def lattice():
+            return edges.neighbor_counts(coords, radius) >= min_neighbors
+
+        report[name] = {
+            "edge_points": len(coords),
+            "lists_ms": round(best_ms(lists, repeat), 1),
+            "return_length_ms": round(best_ms(return_length, repeat), 1),
+            "lattice_ms": round(best_ms(lattice, repeat), 1),
+            "same_mask": bool(np.array_equal(lists(), lattice()) and np.array_equal(lists(), return_length())),
+        }
+    return report
@@ -0,0 +1,188 @@
+"""Scheduling of the measurement steps: the measurement graph and the worker process pool."""
+import time
+import numpy as np
+
+from benchmarks.common import synthetic_vertical_depth
+
+
+def bench_graph(scan_dir: str, acquire_ms=(1200, 1500, 1500, 3500), workers: int = 4) -> dict:
+    """
+    One scan cycle with the former schedule (small and horizontal on threads, both joined
+    after the vertical acquisition, then the vertical steps one after another) against
+    MeasurementGraph, which starts every step as soon as its inputs exist.
+
+    Acquisitions of the small, horizontal, horizontal2 and vertical views are simulated by
+    sleeping acquire_ms; the steps run the Scripts functions on small.ply and
+    horizontal_post.ply of scan_dir and on the synthetic vertical depth map. "cycle_ms" is
+    the time from the first acquisition to the results.
+    """
+    import os
+    from pointcloud_io import read_ply
+    from depth_scan import DepthScan
+    from point_cloud_view import PointCloudView
+    from calibration import ViewCalibration
+    from measurement_graph import MeasurementGraph
+    from Scripts import CircleFitter, get_40, horn_diff, slope, arm_horn_lengths, filter_and_visualize_projection_with_ply
+
+    small_cloud = read_ply(os.path.join(scan_dir, "small.ply"))
+    horizontal_cloud = read_ply(os.path.join(scan_dir, "horizontal_post.ply"))
+    depth = synthetic_vertical_depth()
+
+    def small(cloud):
+        fitter = CircleFitter(PointCloudView(cloud))
+        _, z_center, radius = fitter.fit_circles_and_plot("SMALL", find_second_circle=False, val_x=0.20, val_z=0.2,
+                                                          delta_z=23)
+        return {"dist_3mm_s": fitter.get_distance(second_crc=False, z_distance_to_datum=23.1)[0],
+                "feature_3": z_center - fitter.get_datum(), "radius_small": radius}
+
+    def horizontal(cloud, _):
+        view = PointCloudView(cloud)
+        fitter = CircleFitter(view)
+        _, circle2 = fitter.fit_circles_and_plot("HORIZONTAL")
+        return {"horizontal": view, "circle_fitter": fitter, "dist_3mm_h": fitter.get_distance()[0],
+                "feature_2": circle2[2]}
+
+    def vertical(scan, _):
+        x_min = scan.bounds()[0]
+        _, _, y_min, y_max = scan.roi(x=(None, x_min + 23)).bounds()
+        scan = ViewCalibration.rotation_z(180).apply_scan(scan.without(y=(y_min - 5, y_max + 5), closed=True))
+        return {"points": PointCloudView(scan.points()), "origin": scan.to_origin()}
+
+    steps = [
+        ("B", lambda h: h["circle_fitter"].get_B(), ["horizontal"]),
+        ("projection", lambda h: filter_and_visualize_projection_with_ply(h["horizontal"]), ["horizontal"]),
+        ("l_40", lambda v: get_40(v["origin"]), ["vertical"]),
+        ("horn_17_2", lambda v: horn_diff(v["origin"]), ["vertical"]),
+        ("horn_23_4", lambda v: horn_diff(v["origin"], 240, 280), ["vertical"]),
+        ("slope_2", lambda v: slope(v["points"], y_divisor=0.11, crc_l=28), ["vertical"]),
+        ("b_vertical", lambda v, h, B: B + (v["points"].max(1) - h["horizontal"].max(2)), ["vertical", "horizontal", "B"]),
+        ("slope_1", lambda v, b: slope(v["points"], b), ["vertical", "b_vertical"]),
+        ("l_248", lambda v, b: arm_horn_lengths(v["points"], b), ["vertical", "b_vertical"]),
+        ("results", lambda s, h, *_: np.mean([h["dist_3mm_h"], s["dist_3mm_s"]]),
+         ["small", "horizontal", "l_40", "horn_17_2", "horn_23_4", "slope_1", "slope_2", "l_248", "projection"]),
+    ]
+
+    def acquire(view):
+        time.sleep(acquire_ms[view] / 1000)
+
+    def threaded():
+        import threading
+        start, values = time.perf_counter(), {}
+        acquire(0)
+        thread_small = threading.Thread(target=lambda: values.update(small=small(small_cloud)))
+        thread_small.start()
+        acquire(1)
+        acquire(2)
+        thread_horizontal = threading.Thread(target=lambda: values.update(horizontal=horizontal(horizontal_cloud, None)))
+        thread_horizontal.start()
+        acquire(3)
+        thread_small.join()
+        thread_horizontal.join()
+        values["vertical"] = vertical(DepthScan(depth, 40.0, 75.0), None)
+        for name, func, inputs in steps:
+            values[name] = func(*(values[value] for value in inputs))
+        return (time.perf_counter() - start) * 1000, values["results"]
+
+    def scheduled():
+        start = time.perf_counter()
+        graph = MeasurementGraph(workers)
+        graph.add("small", small, ["small_data"])
+        graph.add("horizontal", horizontal, ["horizontal_data", "horizontal2_data"])
+        graph.add("vertical", vertical, ["vertical_scan", "vertical_data"])
+        for name, func, inputs in steps:
+            graph.add(name, func, inputs)
+        acquire(0)
+        graph.provide("small_data", small_cloud)
+        acquire(1)
+        graph.provide("horizontal_data", horizontal_cloud)
+        acquire(2)
+        graph.provide("horizontal2_data", None)
+        acquire(3)
+        graph.provide("vertical_scan", DepthScan(depth, 40.0, 75.0))
+        graph.provide("vertical_data", None)
+        results = graph.wait()["results"]
+        cycle_ms = (time.perf_counter() - start) * 1000
+        graph.close()
+        return cycle_ms, results, graph.report()
+
+    threaded_ms, threaded_results = threaded()
+    graph_ms, graph_results, report = scheduled()
+    return {
+        "acquisition_ms": sum(acquire_ms),
+        "threaded_cycle_ms": round(threaded_ms, 1),
+        "graph_cycle_ms": round(graph_ms, 1),
+        "equal": bool(threaded_results == graph_results),
+        "graph": report,
+    }
+
+
+class _PoolBenchTarget(object):
+    """Small and horizontal circle fits as smol_calc and hor_calc run them, returning scalars only."""
+    @staticmethod
+    def small(points: np.ndarray) -> dict:
+        from point_cloud_view import PointCloudView
+        from Scripts import CircleFitter
+        fitter = CircleFitter(PointCloudView(points))
+        _, z_center, radius = fitter.fit_circles_and_plot("SMALL", find_second_circle=False, val_x=0.20, val_z=0.2,
+                                                          delta_z=23)
+        return {"dist_3mm_s": fitter.get_distance(second_crc=False, z_distance_to_datum=23.1)[0],
+                "feature_3": z_center - fitter.get_datum(), "radius_small": radius}
+
+    @staticmethod
+    def horizontal(points: np.ndarray) -> dict:
+        from point_cloud_view import PointCloudView
+        from Scripts import CircleFitter
+        fitter = CircleFitter(PointCloudView(points))
+        _, circle2 = fitter.fit_circles_and_plot("HORIZONTAL")
+        return {"dist_3mm_h": fitter.get_distance()[0], "B": fitter.get_B(), "feature_2": circle2[2]}
+
+
+def bench_pool(scan_dir: str, processes: int = 2, repeat: int = 5) -> dict:
+    """
+    Small and horizontal fits submitted together, as the measurement graph does when both
+    views are in, on a thread pool against MeasurementPool worker processes with the clouds
+    in shared memory. Per-view times run from the submit to the result, best of repeat.
+    """
+    import os
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from pointcloud_io import read_ply
+    from measurement_pool import MeasurementPool
+
+    clouds = {"small": read_ply(os.path.join(scan_dir, "small.ply")),
+              "horizontal": read_ply(os.path.join(scan_dir, "horizontal_post.ply"))}
+    target = _PoolBenchTarget()
+
+    def cycle(submit):
+        start, done = time.perf_counter(), {}
+        futures = {submit(name, cloud): name for name, cloud in clouds.items()}
+        for future in as_completed(futures):
+            done[futures[future]] = time.perf_counter()
+        results = {name: future.result() for future, name in futures.items()}
+        end = time.perf_counter()
+        times = {name: (done[name] - start) * 1000 for name in clouds}
+        times["cycle"] = (end - start) * 1000
+        return times, results
+
+    def best(submit):
+        runs = [cycle(submit) for _ in range(repeat)]
+        times = {name: round(min(run[0][name] for run in runs), 1) for name in runs[0][0]}
+        return times, runs[0][1]
+
+    with ThreadPoolExecutor(processes) as executor:
+        threaded, threaded_results = best(lambda name, cloud: executor.submit(getattr(target, name), cloud.copy()))
+
+    start = time.perf_counter()
+    pool = MeasurementPool(target, processes)
+    startup_ms = (time.perf_counter() - start) * 1000
+    try:
+        pooled, pooled_results = best(lambda name, cloud: pool.submit(name, cloud))
+    finally:
+        pool.close()
+
+    return {
+        "points": {name: len(cloud) for name, cloud in clouds.items()},
+        "threads_ms": threaded,
+        "processes_ms": pooled,
+        "pool_startup_ms": round(startup_ms, 1),
+        "equal": threaded_results == pooled_results,
+    }
@@ -0,0 +1,113 @@
+import json
+import numpy as np
+
+
+class ViewCalibration(object):
+    """
+    Homogeneous transform that takes the points of one scan view from profiler to part
+    coordinates, p' = R p + t, optionally followed by shifting X and Y to start at zero
+    (JaguarScanner.to_origin).
+
+    apply() transforms points in blocks of chunk_rows into a float32 result, so a view costs
+    one pass and no full-size temporary beyond the result; with inplace the result is the
+    input array itself. When R only permutes and negates axes, as the
+    quarter turns of the scan views do, the origin shift is taken from the input columns
+    and folded into t. The shifted X and Y are then exactly the values the separate
+    to_origin pass gives.
+
+    Args:
+        matrix (array-like): 4 x 4 homogeneous matrix; identity by default.
+        to_origin (bool): Shift X and Y after the transform so that their minimum is zero.
+            The X/Y offsets of the matrix then have no effect.
+    """
+    def __init__(self, matrix=None, to_origin: bool = False):
+        self.matrix = np.eye(4) if matrix is None else np.asarray(matrix, dtype=np.float64)
+        if self.matrix.shape != (4, 4):
+            raise ValueError(f"Calibration matrix must be 4 x 4, got {self.matrix.shape}")
+        self.to_origin = to_origin
+
+    @classmethod
+    def rotation_z(cls, angle_degrees: float, offset=(0.0, 0.0, 0.0), to_origin: bool = False):
+        """Rotation about Z as JaguarScanner.rotate_point_cloud, then offset; quarter turns are exact."""
+        if angle_degrees % 90 == 0:
+            cos, sin = ((1, 0), (0, 1), (-1, 0), (0, -1))[int(angle_degrees // 90) % 4]
+        else:
+            cos, sin = np.cos(np.radians(angle_degrees)), np.sin(np.radians(angle_degrees))
+        matrix = np.eye(4)
+        matrix[:2, :2] = [[cos, -sin], [sin, cos]]
+        matrix[:3, 3] = offset
+        return cls(matrix, to_origin)
+
+    @property
+    def rotation(self) -> np.ndarray:
+        return self.matrix[:3, :3]
+
+    @property
+    def translation(self) -> np.ndarray:
+        return self.matrix[:3, 3]
+
+    @property
+    def is_permutation(self) -> bool:
+        """True if R only permutes and negates axes."""
+        rotation = self.rotation
+        return (np.isin(rotation, (-1, 0, 1)).all() and (np.abs(rotation).sum(axis=0) == 1).all()
+                and (np.abs(rotation).sum(axis=1) == 1).all())
+
+    def apply(self, points: np.ndarray, chunk_rows: int = 65536, inplace: bool = False) -> np.ndarray:
+        """
+        Transforms N x 3 points and returns them as float32. The result is a new array and
+        points is left as it is, so converter buffers and other shared arrays can be passed.
+
+        With inplace, the result is written into points and points is returned: only for an
+        array the caller owns, which must be writable, C-contiguous float32 (ValueError otherwise).
+        """
+        points = np.asarray(points)
+        if inplace:
+            if points.dtype != np.float32 or not points.flags.writeable or not points.flags.c_contiguous:
+                raise ValueError("In-place calibration needs a writable, C-contiguous float32 array")
+            out = points
+        else:
+            out = np.empty(points.shape, dtype=np.float32)
+        rotation, translation = self.rotation, self.translation.copy()
+
+        shift_after = self.to_origin and len(points) > 0
+        if shift_after and self.is_permutation:
+            # Rotated X/Y are signed input columns, so their minimum is known before the pass
+            for axis in (0, 1):
+                column = int(np.flatnonzero(rotation[axis])[0])
+                values = points[:, column]
+                translation[axis] = -values.min() if rotation[axis, column] > 0 else values.max()
+            shift_after = False
+
+        identity = np.array_equal(rotation, np.eye(3))
+        rotation_t, translation = rotation.T.astype(np.float32), translation.astype(np.float32)
+        if not identity or translation.any():
+            for start in range(0, len(points), chunk_rows):
+                block, target = points[start:start + chunk_rows], out[start:start + chunk_rows]
+                if identity:
+                    np.add(block, translation, out=target)
+                else:
+                    np.add(block @ rotation_t, translation, out=target)
+        elif not inplace:
+            out[...] = points
+        if shift_after:
+            out[:, :2] -= out[:, :2].min(axis=0)
+        return out
+
+    def apply_scan(self, scan):
+        """The same transform on a DepthScan; only rotations about Z by quarter turns are supported."""
+        rotation = self.rotation
+        if not (self.is_permutation and rotation[2, 2] == 1):
+            raise ValueError("DepthScan calibration must be a quarter turn about Z")
+        scan = scan.rotated(np.degrees(np.arctan2(rotation[1, 0], rotation[0, 0]))).translated(*self.translation)
+        return scan.to_origin() if self.to_origin else scan
+
+
+def load_calibration(path: str) -> dict:
+    """
+    Reads the per-view calibration file: one entry per view name (lua file without the
+    extension) with a 4 x 4 "matrix" and an optional "to_origin" flag.
+    """
+    with open(path, "r") as f:
+        views = json.load(f)
+    return {name: ViewCalibration(view["matrix"], view.get("to_origin", False)) for name, view in views.items()}
@@ -0,0 +1,161 @@
+import time
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+pitch = 1e-3
+
+
+class DepthToPointsConverter(object):
+    """
+    Converts organized depth maps to N x 3 float32 point arrays without temporaries.
+
+    The scaled X/Y coordinate grids are cached per (width, line count, x_unit, y_unit),
+    and valid points are compressed straight into a pooled output buffer, so a scan
+    costs one pass over the depth map and no large allocation once the shapes repeat.
+
+    Results are views into the pooled buffers. The caller owns a result until it hands
+    the buffer back with release(); only released buffers are reused, and a result is
+    started in a new buffer while none is free, so a result still in use is never
+    overwritten. held_buffers counts those allocations. With buffers=0 nothing is
+    pooled: every result is an array of its own and only the grids are cached.
+    """
+    def __init__(self, buffers: int = 2):
+        self._grids = {}
+        self._free = [np.empty((0, 3), dtype=np.float32) for _ in range(buffers)]
+        self._held = []
+        self._buffer = None
+        self._mask = np.empty(0, dtype=bool)
+        self._count = 0
+        self.pooled = buffers > 0
+        self.held_buffers = 0
+
+    def grids(self, width: int, line_count: int, x_unit: float, y_unit: float):
+        """Returns the flattened X and Y coordinate grids (mm) for the given scan shape."""
+        key = (width, line_count, x_unit, y_unit)
+        if key not in self._grids:
+            y, x = np.indices((line_count, width), dtype=np.uint16)
+            self._grids[key] = (
+                (x * x_unit * pitch).astype(np.float32).ravel(),
+                (y * y_unit * pitch).astype(np.float32).ravel(),
+            )
+        return self._grids[key]
+
+    def begin(self):
+        """Starts a new result in a free buffer, or in a new one if every buffer is still held."""
+        if self.pooled and self._buffer is not None and not self._is_held(self._buffer):
+            # The previous result was never handed out
+            self._free.append(self._buffer)
+        if self._free:
+            self._buffer = self._free.pop()
+        else:
+            self._buffer = np.empty((0, 3), dtype=np.float32)
+            if self.pooled:
+                self.held_buffers += 1
+                logger.warning(f"Every converter buffer is still held, allocated a new one ({self.held_buffers} so far).")
+        self._count = 0
+
+    def append(self, depth: np.ndarray, first_row: int, line_count: int, x_unit: float, y_unit: float) -> int:
+        """
+        Appends the valid points of depth rows [first_row, first_row + len(depth)) of a
+        line_count x width scan to the current result.
+
+        Returns:
+            int: Number of points appended.
+        """
+        rows, width = depth.shape
+        x_grid, y_grid = self.grids(width, line_count, x_unit, y_unit)
+        cells = slice(first_row * width, (first_row + rows) * width)
+
+        depth = depth.reshape(-1)
+        if self._mask.size < depth.size:
+            self._mask = np.empty(depth.size, dtype=bool)
+        mask = self._mask[:depth.size]
+        np.isnan(depth, out=mask)
+        np.logical_not(mask, out=mask)
+        count = np.count_nonzero(mask)
+
+        out = self._reserve(self._count + count)[self._count:self._count + count]
+        np.compress(mask, x_grid[cells], out=out[:, 0])
+        np.compress(mask, y_grid[cells], out=out[:, 1])
+        np.compress(mask, depth, out=out[:, 2])
+        self._count += count
+        return count
+
+    def result(self) -> np.ndarray:
+        """Returns the points converted since begin(); the caller holds their buffer until release()."""
+        if self.pooled and not self._is_held(self._buffer):
+            self._held.append(self._buffer)
+        return self._buffer[:self._count]
+
+    def release(self, points: np.ndarray = None):
+        """
+        Hands the buffer of points, or of every held result if None, back for reuse.
+        The released results must not be used afterwards.
+        """
+        released = [buffer for buffer in self._held if points is None or np.may_share_memory(buffer, points)]
+        self._held = [buffer for buffer in self._held if not any(buffer is other for other in released)]
+        if self.pooled:
+            self._free.extend(released)
+
+    def _is_held(self, buffer: np.ndarray) -> bool:
+        return any(buffer is held for held in self._held)
+
+    def convert(self, depth: np.ndarray, x_unit: float, y_unit: float) -> np.ndarray:
+        """Converts a whole depth map; same output as save_data_to_np()."""
+        self.begin()
+        self.append(depth, 0, depth.shape[0], x_unit, y_unit)
+        return self.result()
+
+    def _reserve(self, size: int) -> np.ndarray:
+        buffer = self._buffer
+        if buffer.shape[0] < size:
+            grown = np.empty((size + size // 4, 3), dtype=np.float32)
+            grown[:self._count] = buffer[:self._count]
+            self._buffer = buffer = grown
+        return buffer
+
+
+class StreamingCloudAssembler(object):
+    """
+    Builds the point cloud of one acquisition while its profiles arrive.
+
+    The acquisition callback hands the depth map of every delivered batch to add(),
+    which converts it in chunks of chunk_lines straight from the batch memory, so
+    conversion runs while the laser is still sweeping and the depth map is not copied.
+    The result is the same N x 3 float32 array save_data_to_np() produces.
+    """
+    def __init__(self, width: int, line_count: int, x_unit: float, y_unit: float, chunk_lines: int = 500,
+                 converter: DepthToPointsConverter = None):
+        self.width = width
+        self.line_count = line_count
+        self.x_unit = x_unit
+        self.y_unit = y_unit
+        self.chunk_lines = chunk_lines
+        self.height = 0
+        self.convert_ms = 0.0
+        self.converter = converter if converter is not None else DepthToPointsConverter()
+        self.converter.begin()
+        self._lock = threading.Lock()
+
+    @property
+    def complete(self) -> bool:
+        return self.height >= self.line_count
+
+    def add(self, depth: np.ndarray):
+        """Converts the rows of one delivered batch. Rows beyond line_count are ignored."""
+        with self._lock:
+            start_time = time.perf_counter()
+            rows = min(depth.shape[0], self.line_count - self.height)
+            for start in range(0, rows, self.chunk_lines):
+                stop = min(start + self.chunk_lines, rows)
+                self.converter.append(depth[start:stop], self.height + start, self.line_count, self.x_unit, self.y_unit)
+            self.height += rows
+            self.convert_ms += (time.perf_counter() - start_time) * 1000
+
+    def finish(self) -> np.ndarray:
+        """Returns the points converted so far as one N x 3 float32 array."""
+        with self._lock:
+            return self.converter.result()
@@ -0,0 +1,176 @@
+import numpy as np
+
+from depth_conversion import pitch
+
+# (cos, sin) of 0, 90, 180 and 270 degrees
+_QUARTER_TURNS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+
+
+class DepthScan(object):
+    """
+    Organized depth map of one scan view together with the planar transform scan.py applies
+    to its points.
+
+    Cell (row, col) holds the depth (Z, mm) of the point at grid X = col * x_unit and
+    Y = row * y_unit (um, as in DepthToPointsConverter); NaN marks cells without data.
+    Rotations about Z by quarter turns and translations keep every world axis a function of
+    either the row or the column, so X/Y ROI queries are slices of the grid and cost in
+    proportion to the ROI. N x 3 points are only built by points().
+
+    Scans are immutable: roi(), rotated(), translated() and to_origin() return new scans
+    that share the depth map; without() copies it.
+
+    Args:
+        depth (np.ndarray): line_count x width depth map.
+        x_unit, y_unit (float): XAxisResolution and YResolution in um.
+        quarter_turns (int): Rotation about Z in multiples of 90 degrees.
+        offset (tuple): (X, Y, Z) translation in mm applied after the rotation.
+        origin (tuple): (row, col) of depth[0, 0] in the full depth map.
+    """
+    def __init__(self, depth: np.ndarray, x_unit: float, y_unit: float, quarter_turns: int = 0, offset=(0.0, 0.0, 0.0),
+                 origin=(0, 0)):
+        self.depth = depth
+        self.x_unit = x_unit
+        self.y_unit = y_unit
+        self.quarter_turns = quarter_turns % 4
+        self.offset = tuple(float(value) for value in offset)
+        self.origin = tuple(int(value) for value in origin)
+        self._valid = None
+
+    def _derive(self, valid=None, **changes):
+        fields = dict(depth=self.depth, x_unit=self.x_unit, y_unit=self.y_unit, quarter_turns=self.quarter_turns,
+                      offset=self.offset, origin=self.origin)
+        fields.update(changes)
+        scan = DepthScan(**fields)
+        if "depth" not in changes:
+            valid = self._valid
+        scan._valid = valid
+        return scan
+
+    @property
+    def shape(self) -> tuple:
+        return self.depth.shape
+
+    @property
+    def transformed(self) -> bool:
+        return self.quarter_turns != 0 or any(self.offset)
+
+    def _axis(self, axis: int):
+        """
+        Returns which grid axis (0 = rows, 1 = columns) world axis (0 = X, 1 = Y) follows and
+        the world coordinate of every row or column of it.
+        """
+        cos, sin = _QUARTER_TURNS[self.quarter_turns]
+        # Same float32 grid values as DepthToPointsConverter.grids()
+        if (axis == 0) == (cos != 0):
+            cols = np.arange(self.origin[1], self.origin[1] + self.depth.shape[1]).astype(np.uint16)
+            grid_axis, values = 1, (cols * self.x_unit * pitch).astype(np.float32)
+            sign = cos if axis == 0 else sin
+        else:
+            rows = np.arange(self.origin[0], self.origin[0] + self.depth.shape[0]).astype(np.uint16)
+            grid_axis, values = 0, (rows * self.y_unit * pitch).astype(np.float32)
+            sign = -sin if axis == 0 else cos
+        if not self.transformed:
+            return grid_axis, values
+        return grid_axis, sign * values.astype(np.float64) + self.offset[axis]
+
+    def valid(self) -> np.ndarray:
+        """Mask of the cells with data, computed once per scan."""
+        if self._valid is None:
+            self._valid = ~np.isnan(self.depth)
+        return self._valid
+
+    def count(self) -> int:
+        return int(np.count_nonzero(self.valid()))
+
+    def roi(self, x=None, y=None, closed: bool = False):
+        """
+        Sub-scan of the cells with x[0] < X < x[1] and y[0] < Y < y[1] (<= with closed),
+        as a view of the depth map. A bound of None is open.
+        """
+        bounds = [slice(None), slice(None)]
+        for axis, limits in ((0, x), (1, y)):
+            if limits is None:
+                continue
+            low = -np.inf if limits[0] is None else limits[0]
+            high = np.inf if limits[1] is None else limits[1]
+            grid_axis, values = self._axis(axis)
+            inside = (values >= low) & (values <= high) if closed else (values > low) & (values < high)
+            index = np.flatnonzero(inside)
+            # World coordinates are monotonic along the grid, so the ROI is one slice
+            bounds[grid_axis] = slice(index[0], index[-1] + 1) if index.size else slice(0, 0)
+        rows, cols = bounds
+        origin = (self.origin[0] + (rows.start or 0), self.origin[1] + (cols.start or 0))
+        valid = None if self._valid is None else self._valid[rows, cols]
+        return self._derive(depth=self.depth[rows, cols], origin=origin, valid=valid)
+
+    def without(self, x=None, y=None, closed: bool = False):
+        """Copy of the scan with the cells of roi(x, y, closed) set to NaN."""
+        region = self.roi(x, y, closed)
+        depth = self.depth.copy()
+        rows = slice(region.origin[0] - self.origin[0], region.origin[0] - self.origin[0] + region.shape[0])
+        cols = slice(region.origin[1] - self.origin[1], region.origin[1] - self.origin[1] + region.shape[1])
+        depth[rows, cols] = np.nan
+        return self._derive(depth=depth)
+
+    def rotated(self, angle_degrees: float):
+        """Scan rotated about Z like JaguarScanner.rotate_point_cloud(points, angle_degrees, "z")."""
+        turns, remainder = divmod(angle_degrees, 90)
+        if remainder:
+            raise ValueError(f"DepthScan can only be rotated by multiples of 90 degrees, not {angle_degrees}")
+        cos, sin = _QUARTER_TURNS[int(turns) % 4]
+        x, y, z = self.offset
+        return self._derive(quarter_turns=self.quarter_turns + int(turns), offset=(cos * x - sin * y, sin * x + cos * y, z))
+
+    def translated(self, dx: float = 0.0, dy: float = 0.0, dz: float = 0.0):
+        x, y, z = self.offset
+        return self._derive(offset=(x + dx, y + dy, z + dz))
+
+    def bounds(self) -> tuple:
+        """(x_min, x_max, y_min, y_max) of the valid cells."""
+        valid = self.valid()
+        extent = []
+        for axis in (0, 1):
+            grid_axis, values = self._axis(axis)
+            values = values[valid.any(axis=1 - grid_axis)]
+            if values.size == 0:
+                raise ValueError("DepthScan has no valid cells")
+            extent += [values.min(), values.max()]
+        return tuple(extent)
+
+    def to_origin(self):
+        """Scan translated so that its minimum X and Y are zero, like JaguarScanner.to_origin."""
+        x_min, _, y_min, _ = self.bounds()
+        return self.translated(-x_min, -y_min)
+
+    def median(self, axis: int) -> float:
+        """Median X (axis=0) or Y (axis=1) of the valid cells, as np.median over points() would give."""
+        grid_axis, values = self._axis(axis)
+        counts = np.count_nonzero(self.valid(), axis=1 - grid_axis)
+        order = np.argsort(values)
+        values, cumulative = values[order], np.cumsum(counts[order])
+        n = cumulative[-1]
+        lower = values[np.searchsorted(cumulative, (n - 1) // 2, side="right")]
+        upper = values[np.searchsorted(cumulative, n // 2, side="right")]
+        return (lower + upper) / 2
+
+    def points(self, z=None) -> np.ndarray:
+        """
+        N x 3 float32 points of the valid cells in row-major order, optionally only those
+        with z[0] < Z < z[1]. An untransformed scan gives the same array as
+        DepthToPointsConverter, a transformed one the same as ViewCalibration.apply() on it.
+        """
+        valid = self.valid()
+        if z is not None:
+            depth = self.depth + self.offset[2]
+            valid = valid & (depth > z[0]) & (depth < z[1])
+        count = np.count_nonzero(valid)
+        points = np.empty((count, 3), dtype=np.float32)
+        for axis in (0, 1):
+            grid_axis, values = self._axis(axis)
+            grid = values[None, :] if grid_axis == 1 else values[:, None]
+            points[:, axis] = np.broadcast_to(grid, self.depth.shape)[valid]
+        points[:, 2] = self.depth[valid]
+        if self.offset[2]:
+            points[:, 2] += self.offset[2]
+        return points
@@ -0,0 +1,136 @@
+import os
+import time
+import queue
+import logging
+import multiprocessing
+
+logger = logging.getLogger(__name__)
+
+_NEW_CYCLE = "new_cycle"
+
+
+def _render_jobs(jobs, reports, dpi: int, cycle_budget: float, density_above: int, density_bins: int):
+    """
+    Worker loop: renders (artifact, path) jobs with the object-oriented Figure API until None.
+
+    Figures of a cycle are skipped once the time spent rendering that cycle exceeds
+    cycle_budget seconds; a report of the finished cycle, with the render time and file
+    size of every figure, is put on reports at every cycle marker.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+
+    cycle = {"rendered": 0, "skipped": 0, "failed": 0, "render_ms": 0.0, "figures": []}
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        if job == _NEW_CYCLE:
+            cycle["render_ms"] = round(cycle["render_ms"], 1)
+            reports.put(cycle)
+            cycle = {"rendered": 0, "skipped": 0, "failed": 0, "render_ms": 0.0, "figures": []}
+            continue
+
+        artifact, path = job
+        if cycle_budget is not None and cycle["render_ms"] >= cycle_budget * 1000:
+            cycle["skipped"] += 1
+            continue
+        start = time.perf_counter()
+        try:
+            figure = Figure(figsize=artifact.figsize)
+            artifact.render(figure.add_subplot(), density_above=density_above, density_bins=density_bins)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            figure.savefig(path, dpi=dpi, bbox_inches="tight")
+        except Exception as e:
+            logger.error(f"Rendering {path} failed: {e}")
+            cycle["failed"] += 1
+            path = None
+        ms = (time.perf_counter() - start) * 1000
+        cycle["render_ms"] += ms
+        if path is not None:
+            cycle["rendered"] += 1
+            cycle["figures"].append({"name": os.path.basename(path), "ms": round(ms, 1),
+                                     "kb": round(os.path.getsize(path) / 1024, 1)})
+
+
+class FigureWorker(object):
+    """
+    Renders plot artifacts (Scripts.plot_artifact.PlotArtifact) to PNG files in a separate process.
+
+    submit() only enqueues; when max_queue figures are already waiting the new one is
+    dropped, so a measurement never waits on rendering. The worker draws on its own
+    Figure objects and never touches pyplot state of the measurement process.
+
+    The process is forked by default, which starts it without re-importing the main module;
+    the child only imports matplotlib and reads its queue. Create a forked worker before
+    the process starts any thread or connection, as scan.main() does: a fork copies only
+    the calling thread, with every lock the other threads held, and every open socket.
+    "spawn" starts a fresh interpreter that re-imports the main module instead, which is
+    possible as long as importing it does not connect to anything (scan.py does not).
+
+    Args:
+        figures_dir (str): Directory the PNG files are written to.
+        dpi (int): Resolution of the saved figures.
+        cycle_budget (float, optional): Seconds of rendering per scan cycle; later figures of
+            the cycle are skipped. None renders every figure.
+        max_queue (int): Figures that may wait for the worker before new ones are dropped.
+        density_above (int, optional): Scatter layers with more points are drawn as a density
+            image (see PlotArtifact.render); None draws every point.
+        density_bins (int): Density grid cells along the longer side of such a layer.
+        start_method (str): multiprocessing start method of the worker, "fork" or "spawn".
+    """
+    def __init__(self, figures_dir: str, dpi: int = 300, cycle_budget: float = None, max_queue: int = 32,
+                 density_above: int = 20000, density_bins: int = 800, start_method: str = "fork"):
+        self.figures_dir = figures_dir
+        self.dpi = dpi
+        self.cycle_budget = cycle_budget
+        self.dropped = 0
+        context = multiprocessing.get_context(start_method)
+        self._jobs = context.Queue(maxsize=max_queue)
+        self._reports = context.Queue()
+        self._process = context.Process(target=_render_jobs,
+                                        args=(self._jobs, self._reports, dpi, cycle_budget, density_above, density_bins),
+                                        name="figure-worker", daemon=True)
+        self._process.start()
+
+    @classmethod
+    def from_config(cls, config: dict, figures_dir: str):
+        """Builds the worker from the "figure_worker" section of config.json, or None if it is disabled."""
+        section = dict(config.get("figure_worker", {}))
+        if not section.pop("enabled", True):
+            return None
+        return cls(figures_dir, **section)
+
+    def submit(self, artifact, filename: str) -> bool:
+        """Queues artifact to be saved as filename in figures_dir; returns False if it was dropped."""
+        try:
+            self._jobs.put_nowait((artifact, os.path.join(self.figures_dir, filename)))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Figure worker is behind, {filename} dropped ({self.dropped} so far).")
+            return False
+
+    def new_cycle(self) -> list:
+        """Starts a budget cycle; returns the reports of the cycles the worker has finished since the last call."""
+        try:
+            self._jobs.put_nowait(_NEW_CYCLE)
+        except queue.Full:
+            pass
+        reports = []
+        while True:
+            try:
+                reports.append(self._reports.get_nowait())
+            except queue.Empty:
+                return reports
+
+    def close(self, timeout: float = 5.0):
+        """Lets the worker finish the queued figures for up to timeout seconds, then stops it."""
+        try:
+            self._jobs.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
@@ -0,0 +1,151 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class MeasurementGraph(object):
+    """
+    Runs the measurement steps of one scan cycle as soon as their inputs exist.
+
+    Steps are declared with add(name, func, inputs): func is called with the values of
+    inputs as positional arguments and its return value becomes the value of name. Raw
+    values, such as the point clouds of the scan views, are handed in with provide() as
+    the acquisitions finish, so a step never waits for anything but its own inputs.
+
+    With workers > 0 steps run on a thread pool. With workers=0 they run in the thread
+    that calls provide(), in declaration order, for interactive pyplot windows that must
+    be opened from the main thread.
+
+    A step that raises is reported to on_error(name, exception); the steps that depend on
+    it are skipped. wait() returns once nothing more can run.
+
+    Args:
+        workers (int): Threads that run steps; 0 runs them in the calling thread.
+        on_error (callable, optional): Called with the name and exception of a failed step.
+    """
+    def __init__(self, workers: int = 4, on_error=None):
+        self.on_error = on_error
+        self._steps = {}
+        self._values = {}
+        self._times = {}
+        self._started = set()
+        self._failed = set()
+        self._running = 0
+        self._inline = []
+        self._t0 = time.perf_counter()
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="measurement") if workers else None
+
+    def add(self, name: str, func, inputs=()):
+        self._steps[name] = (func, tuple(inputs))
+        return self
+
+    def provide(self, name: str, value):
+        """Makes a raw input available and starts every step it completes."""
+        now = time.perf_counter() - self._t0
+        with self._condition:
+            self._values[name] = value
+            self._times[name] = (now, now)
+            self._schedule()
+        self._run_inline()
+
+    def _schedule(self):
+        # Called with the condition held; repeats until skipped steps have propagated
+        changed = True
+        while changed:
+            changed = False
+            for name, (_, inputs) in self._steps.items():
+                if name in self._started:
+                    continue
+                if any(value in self._failed for value in inputs):
+                    self._started.add(name)
+                    self._failed.add(name)
+                    changed = True
+                    logger.warning(f"Measurement step {name} skipped, an input failed.")
+                elif all(value in self._values for value in inputs):
+                    self._start(name)
+
+    def _start(self, name: str):
+        self._started.add(name)
+        self._running += 1
+        if self._executor is None:
+            self._inline.append(name)
+        else:
+            self._executor.submit(self._run, name)
+
+    def _run_inline(self):
+        while self._executor is None and self._inline:
+            self._run(self._inline.pop(0))
+
+    def _run(self, name: str):
+        func, inputs = self._steps[name]
+        start = time.perf_counter() - self._t0
+        try:
+            value, error = func(*(self._values[value] for value in inputs)), None
+        except Exception as e:
+            value, error = None, e
+            logger.exception(f"Measurement step {name} failed: {e}")
+        end = time.perf_counter() - self._t0
+        with self._condition:
+            self._times[name] = (start, end)
+            if error is None:
+                self._values[name] = value
+            else:
+                self._failed.add(name)
+            self._running -= 1
+            self._schedule()
+            self._condition.notify_all()
+        if error is not None and self.on_error is not None:
+            self.on_error(name, error)
+
+    def wait(self, timeout: float = None) -> dict:
+        """Waits until no step is running or can start; returns the values of all inputs and steps."""
+        self._run_inline()
+        with self._condition:
+            self._condition.wait_for(lambda: self._running == 0, timeout)
+            return dict(self._values)
+
+    @property
+    def failed(self) -> set:
+        return set(self._failed)
+
+    def critical_path(self, target: str = None) -> list:
+        """
+        Achieved critical path to target (by default the step that finished last), as
+        (name, start_ms, end_ms) from the start of the graph. Each step is preceded by the
+        input that became available last, i.e. the one it actually waited for.
+        """
+        with self._condition:
+            times = dict(self._times)
+        if target is None:
+            finished = [name for name in times if name in self._steps]
+            if not finished:
+                return []
+            target = max(finished, key=lambda name: times[name][1])
+        path = []
+        while target is not None:
+            start, end = times[target]
+            path.append((target, round(start * 1000, 1), round(end * 1000, 1)))
+            inputs = [value for value in self._steps.get(target, (None, ()))[1] if value in times]
+            target = max(inputs, key=lambda value: times[value][1]) if inputs else None
+        return path[::-1]
+
+    def report(self) -> dict:
+        """Per-step run time, the achieved critical path and its length in ms."""
+        with self._condition:
+            times = dict(self._times)
+        path = self.critical_path()
+        return {
+            "steps_ms": {name: round((end - start) * 1000, 1) for name, (start, end) in times.items()
+                         if name in self._steps},
+            "critical_path": [name for name, _, _ in path],
+            "critical_path_ms": path[-1][2] if path else 0.0,
+            "failed": sorted(self._failed),
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
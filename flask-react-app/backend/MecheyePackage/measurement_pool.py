@@ -0,0 +1,160 @@
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Object whose methods the worker runs; set once per worker by _init_worker
+_target = None
+# Blocks the worker has mapped, by slot; kept mapped across calls
+_mapped = {}
+
+
+def _init_worker(target):
+    global _target
+    _target = target
+
+
+def _ready() -> bool:
+    return True
+
+
+def _map(slot, name: str) -> shared_memory.SharedMemory:
+    block = _mapped.get(slot)
+    if block is None or block.name != name:
+        if block is not None:
+            try:
+                block.close()
+            except BufferError:
+                # An array of the replaced block is still referenced; it is unmapped with it
+                pass
+        block = _mapped[slot] = shared_memory.SharedMemory(name=name)
+    return block
+
+
+def _call(method: str, args: tuple, shared: list):
+    """Worker side of MeasurementPool.submit: maps the shared array arguments and runs method of the target."""
+    args = list(args)
+    for i, slot, name, shape, dtype in shared:
+        args[i] = np.ndarray(shape, dtype, buffer=_map(slot, name).buf)
+    return getattr(_target, method)(*args)
+
+
+class SharedBuffer(object):
+    """
+    multiprocessing.shared_memory block that the array arguments of one slot are copied
+    into, call after call. Only spec (block name, shape and dtype) is pickled to a worker.
+    """
+    def __init__(self, nbytes: int):
+        self._block = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        self.busy = False
+
+    @property
+    def capacity(self) -> int:
+        return self._block.size
+
+    def write(self, array: np.ndarray) -> tuple:
+        array = np.asarray(array)
+        np.ndarray(array.shape, array.dtype, buffer=self._block.buf)[...] = array
+        return self._block.name, array.shape, array.dtype.str
+
+    def release(self):
+        self._block.close()
+        self._block.unlink()
+
+
+class MeasurementPool(object):
+    """
+    Persistent pool of worker processes that run measurement methods of a target object, so
+    the GIL-bound parts of views measured at the same time (Python loops of the edge
+    tracing, leastsq callbacks) and their pyplot state do not contend.
+
+    Array arguments go through multiprocessing.shared_memory. Every (method, argument)
+    slot has a block that is allocated once, grown when a larger cloud arrives, and mapped
+    by the workers across calls; only its name, shape and dtype are pickled. The cloud is
+    still copied once into the block, as it arrives in a converter buffer of this process.
+    A slot whose previous call is still running gets a one-off block. Return values are
+    pickled back, so the methods should return small dicts of scalars.
+
+    The workers are forked here, once, and keep the copy of target they were forked with,
+    so make target an object without connections or per-cycle state: changes a method
+    makes to it stay in its worker. Create the pool before the process starts any thread
+    or connection, as scan.main() does: a fork copies only the calling thread, with every
+    lock the other threads held, and every open socket.
+
+    Args:
+        target: Object whose methods submit() runs, e.g. scan.ViewMeasurements.
+        processes (int): Worker processes.
+    """
+    # Headroom of a grown block, so clouds of slightly varying size reuse it
+    GROWTH = 1.25
+
+    def __init__(self, target, processes: int = 2):
+        # Workers must share the tracker of this process, or each would start its own and
+        # report the blocks unlinked here as leaked when it exits
+        resource_tracker.ensure_running()
+        self._slots = {}
+        self._lock = threading.Lock()
+        context = multiprocessing.get_context("fork")
+        self._executor = ProcessPoolExecutor(processes, mp_context=context, initializer=_init_worker,
+                                             initargs=(target,))
+        # Fork every worker now, from the calling thread, rather than on the first measurement
+        for future in [self._executor.submit(_ready) for _ in range(processes)]:
+            future.result()
+
+    def _lease(self, slot, nbytes: int):
+        """Buffer of slot for nbytes, marked busy, and whether it is a one-off block."""
+        with self._lock:
+            buffer = self._slots.get(slot)
+            if buffer is not None and buffer.busy:
+                logger.debug(f"Shared buffer of {slot} in use, allocating a one-off block.")
+                buffer = SharedBuffer(nbytes)
+                buffer.busy = True
+                return buffer, True
+            if buffer is None or buffer.capacity < nbytes:
+                if buffer is not None:
+                    buffer.release()
+                buffer = self._slots[slot] = SharedBuffer(int(nbytes * self.GROWTH))
+            buffer.busy = True
+            return buffer, False
+
+    def _return(self, leases):
+        with self._lock:
+            for buffer, one_off in leases:
+                buffer.busy = False
+                if one_off:
+                    buffer.release()
+
+    def submit(self, method: str, *args):
+        """Runs target.method(*args) in a worker; returns a Future of its result."""
+        leases, shared = [], []
+        try:
+            for i, arg in enumerate(args):
+                if isinstance(arg, np.ndarray):
+                    buffer, one_off = self._lease((method, i), arg.nbytes)
+                    leases.append((buffer, one_off))
+                    # A one-off block gets its own slot in the worker, so the slot's block stays mapped
+                    slot = (method, i, "one-off") if one_off else (method, i)
+                    shared.append((i, slot) + buffer.write(arg))
+            args = tuple(None if isinstance(arg, np.ndarray) else arg for arg in args)
+            future = self._executor.submit(_call, method, args, shared)
+        except Exception:
+            self._return(leases)
+            raise
+        future.add_done_callback(lambda _: self._return(leases))
+        return future
+
+    def call(self, method: str, *args):
+        """submit() and wait for the result; exceptions of the method are raised here."""
+        return self.submit(method, *args).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            for buffer in self._slots.values():
+                buffer.release()
+            self._slots.clear()
@@ -4,143 +4,383 @@ from mecheye.profiler import *
 from mecheye.profiler_utils import *
 import cv2
 import numpy as np
-from time import sleep
-from multiprocessing import Lock
 import threading
 import sys
 from pathlib import Path
 from fair_api import Robot
 import logging
 
+sys.path.append(str(Path(__file__).resolve().parent))
+from depth_conversion import DepthToPointsConverter, StreamingCloudAssembler
+from depth_scan import DepthScan
+from scan_timing import PhaseTimer
+from scan_sizing import MotionScanSizing, sweep_length
+
 logger = logging.getLogger(__name__)
 
-robot = Robot.RPC('192.168.58.2')
-mutex = Lock()
+ROBOT_IP = '192.168.58.2'
+_robot = None
+_robot_lock = threading.Lock()
+
+
+def get_robot():
+    """
+    RPC connection to the robot controller, opened on first use and shared by the process.
+
+    Importing this module does not connect, so a process can start its worker processes
+    before any connection exists.
+    """
+    global _robot
+    with _robot_lock:
+        if _robot is None:
+            _robot = Robot.RPC(ROBOT_IP)
+        return _robot
+
+
+class AcquisitionTimeoutError(RuntimeError):
+    """Raised when the acquisition callback does not deliver any profile within the timeout."""
+
+
+class MotionError(RuntimeError):
+    """Raised when a robot move is not confirmed done, so the next sweep must not start."""
+
 
 class CustomAcquisitionCallback(AcquisitionCallbackBase):
-    def __init__(self, width):
+    """
+    Collects the delivered profiles and converts them on arrival.
+
+    The callback's ProfileBatch is handed to the consumer by reference once the
+    acquisition is stopped, so the only copy of the data is the append below. Only
+    threads of this process touch it, so a threading.Lock guards it.
+    """
+    def __init__(self, width, assembler: StreamingCloudAssembler = None):
         AcquisitionCallbackBase.__init__(self)
         self.profile_batch = ProfileBatch(width)
+        self.lock = threading.Lock()
+        self.assembler = assembler
+        self.error = None
+        self.done = threading.Event()
+        self.first_batch_at = None
 
     def run(self, batch):
-        mutex.acquire()
-        self.profile_batch.append(batch)
-        mutex.release()
+        if self.first_batch_at is None:
+            self.first_batch_at = time.perf_counter()
+        with self.lock:
+            self.profile_batch.append(batch)
+        if self.assembler is None:
+            self.done.set()
+            return
+
+        try:
+            self.assembler.add(batch.get_depth_map().data())
+        except Exception as e:
+            logger.exception(f"Profile conversion failed: {e}")
+            self.error = e
+            self.done.set()
+            return
+        # An incomplete batch means no more profiles will follow for this acquisition.
+        if self.assembler.complete or batch.check_flag(ProfileBatch.BatchFlag_Incomplete):
+            self.done.set()
+
+class ProfilerSession(object):
+    """
+    Long-lived connection to the laser profiler, shared by every scan view of the process.
+
+    The profiler is discovered and connected once and only reconnected after an error
+    (see invalidate()). Parameters are cached per name, so each view only pushes the
+    values that differ from the last applied set. Skipped work is counted and converted
+    into an estimated saving per cycle using the measured connect and push timings.
+    """
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.user_set = None
+        self.connected = False
+        self.applied = {}
+        self.data_width = None
+        self._connect_ms = []
+        self._push_ms = []
+        self._reset_cycle_counters()
+
+    def _reset_cycle_counters(self):
+        self.cycle_connects = 0
+        self.cycle_skipped_connects = 0
+        self.cycle_pushed = 0
+        self.cycle_skipped = 0
+
+    def ensure_connected(self) -> bool:
+        if self.connected:
+            self.cycle_skipped_connects += 1
+            return True
+
+        start = time.perf_counter()
+        if not find_and_connect(self.profiler):
+            logger.error("Profiler connection failed.")
+            return False
+        self.user_set = self.profiler.current_user_set()
+        error, self.data_width = self.user_set.get_int_value(DataPointsPerProfile.name)
+        show_error(error)
+        self._connect_ms.append((time.perf_counter() - start) * 1000)
+
+        self.connected = True
+        self.applied = {}
+        self.cycle_connects += 1
+        logger.info(f"Profiler connected in {self._connect_ms[-1]:.1f} ms")
+        return True
+
+    def get(self, kind: str, name: str):
+        """Reads a parameter, answering from the applied values when possible."""
+        if name in self.applied:
+            return self.applied[name][1]
+        error, value = getattr(self.user_set, f"get_{kind}_value")(name)
+        if not error.is_ok():
+            show_error(error)
+            return None
+        self.applied[name] = (kind, value)
+        return value
+
+    def apply(self, parameters: dict) -> bool:
+        """
+        Pushes the parameters that differ from the last applied values.
+
+        Args:
+            parameters (dict): Parameter name -> (kind, value), kind is one of "enum", "int", "float", "bool".
+
+        Returns:
+            bool: False if any parameter could not be set; the session is then invalidated.
+        """
+        for name, (kind, value) in parameters.items():
+            if self.applied.get(name) == (kind, value):
+                self.cycle_skipped += 1
+                continue
+
+            start = time.perf_counter()
+            status = getattr(self.user_set, f"set_{kind}_value")(name, value)
+            self._push_ms.append((time.perf_counter() - start) * 1000)
+            if not status.is_ok():
+                show_error(status)
+                self.invalidate()
+                return False
+            self.applied[name] = (kind, value)
+            self.cycle_pushed += 1
+        return True
+
+    def invalidate(self):
+        """Forgets the connection so the next view reconnects and pushes every parameter."""
+        if self.connected:
+            logger.warning("Profiler session invalidated, reconnecting on next scan.")
+            try:
+                self.profiler.disconnect()
+            except Exception as e:
+                logger.error(f"Profiler disconnect error: {e}")
+        self.connected = False
+        self.user_set = None
+        self.applied = {}
+
+    def close(self):
+        if self.connected:
+            self.profiler.disconnect()
+        self.connected = False
+        self.user_set = None
+        self.applied = {}
+
+    def cycle_report(self) -> dict:
+        """Returns the session statistics of the current cycle and starts a new one."""
+        connect_ms = np.mean(self._connect_ms) if self._connect_ms else 0.0
+        push_ms = np.mean(self._push_ms) if self._push_ms else 0.0
+        report = {
+            "connects": self.cycle_connects,
+            "skipped_connects": self.cycle_skipped_connects,
+            "pushed_parameters": self.cycle_pushed,
+            "skipped_parameters": self.cycle_skipped,
+            "saved_ms": round(self.cycle_skipped_connects * connect_ms + self.cycle_skipped * push_ms, 1),
+        }
+        self._reset_cycle_counters()
+        return report
+
 
 class TriggerWithExternalDeviceAndFixedRate(object):
-    def __init__(self, vel_mul=1):
+    SOFTWARE_TRIGGER_RATE = 907
+    ACQUISITION_TIMEOUT_MARGIN = 10
+    SWEEP_VELOCITY = 54
+
+    scrc = [-450, -130, 470, 82.80, 89.93, -7.30]
+    scrc2 = [-450, 130, 470, 82.80, 89.93, -7.30]
+    p90 = [-335, -400, 450, -90, -0.7, 90]
+    p91 = [-337, 250, 450, -90, -0.7, 90]
+    h1 = [-382, -120, 580, -90, -91, 180]
+    h2 = [-382, 200, 580, -90, -91, 180]
+    h1_alt = [-432, -120, 510, -90, -91, 180]
+    h2_alt = [-432, 200, 510, -90, -91, 180]
+
+    # lua_name: (sweep start, pre_move during the acquisition, post_move to the next view's start)
+    VIEW_MOVES = {
+        "small.lua": (scrc, ("MoveL", scrc2), ("MoveCart", h2)),
+        "horizontal.lua": (h2, ("MoveL", h1), ("MoveCart", h1_alt)),
+        "horizontal2.lua": (h1_alt, ("MoveL", h2_alt), ("MoveCart", p91)),
+        "vertical.lua": (p91, ("MoveL", p90), None),
+    }
+
+    def __init__(self, vel_mul=1, acquisition_timeout=None, scan_sizing: MotionScanSizing = None, robot=None):
+        """
+        Args:
+            vel_mul (float): Velocity multiplier of the robot moves.
+            acquisition_timeout (float, optional): Seconds to wait for the acquisition callback.
+                If None, the expected sweep time plus ACQUISITION_TIMEOUT_MARGIN is used.
+            scan_sizing (MotionScanSizing, optional): Derives the trigger rate and line count of
+                each view from its sweep. If None, SOFTWARE_TRIGGER_RATE and the caller's
+                scan_line_count are used.
+            robot (optional): Robot the views are swept with. If None, get_robot() connects on first use.
+        """
         self.profiler = Profiler()
+        self.session = ProfilerSession(self.profiler)
         self.vel_mul = vel_mul
-        self.robot = robot
+        self.acquisition_timeout = acquisition_timeout
+        self.scan_sizing = scan_sizing
+        self.trigger_rate = self.SOFTWARE_TRIGGER_RATE
+        self.converters = {}
+        self.recorder = None
+        self.timers = []
+        self.timer = PhaseTimer("")
+        self.motion = None
+        self.motion_error = None
+        self._robot = robot
         self.current_di0_value = (0, 0)
 
+    @property
+    def robot(self):
+        if self._robot is None:
+            self._robot = get_robot()
+        return self._robot
+
+    @property
+    def user_set(self):
+        return self.session.user_set
+
     def set_timed_exposure(self, exposure_time: int):
-        show_error(self.user_set.set_enum_value(ExposureMode.name, ExposureMode.Value_Timed))
-        show_error(self.user_set.set_int_value(ExposureTime.name, exposure_time))
+        return self.session.apply({
+            ExposureMode.name: ("enum", ExposureMode.Value_Timed),
+            ExposureTime.name: ("int", exposure_time),
+        })
 
     def set_hdr_exposure(self, exposure_time: int, proportion1: float, proportion2: float, first_threshold: float, second_threshold: float):
-        show_error(self.user_set.set_enum_value(ExposureMode.name, ExposureMode.Value_HDR))
-        show_error(self.user_set.set_int_value(ExposureTime.name, exposure_time))
-        show_error(self.user_set.set_float_value(HdrExposureTimeProportion1.name, proportion1))
-        show_error(self.user_set.set_float_value(HdrExposureTimeProportion2.name, proportion2))
-        show_error(self.user_set.set_float_value(HdrFirstThreshold.name, first_threshold))
-        show_error(self.user_set.set_float_value(HdrSecondThreshold.name, second_threshold))
-
-    def set_parameters(self, scan_line_count):
-        self.user_set = self.profiler.current_user_set()
-
-        show_error(self.user_set.set_enum_value(DataAcquisitionTriggerSource.name, DataAcquisitionTriggerSource.Value_Software))
-        show_error(self.user_set.set_enum_value(LineScanTriggerSource.name, LineScanTriggerSource.Value_FixedRate))
-        show_error(self.user_set.set_float_value(SoftwareTriggerRate.name, 907))
-        show_error(self.user_set.set_int_value(ScanLineCount.name, scan_line_count))
-        show_error(self.user_set.set_int_value(CallbackRetrievalTimeout.name, 60000))
-
-        show_error(self.user_set.set_int_value(LaserPower.name, 100))
-        show_error(self.user_set.set_int_value(MinLaserLineWidth.name, 2))
-        show_error(self.user_set.set_int_value(MaxLaserLineWidth.name, 30))
-        show_error(self.user_set.set_enum_value(AnalogGain.name, AnalogGain.Value_Gain_2))
-        show_error(self.user_set.set_int_value(DigitalGain.name, 0))
-        show_error(self.user_set.set_int_value(MinGrayscaleValue.name, 50))
-        show_error(self.user_set.set_enum_value(SpotSelection.name, SpotSelection.Value_Strongest))
-        show_error(self.user_set.set_int_value(MinSpotIntensity.name, 51))
-        show_error(self.user_set.set_int_value(MaxSpotIntensity.name, 205))
-        show_error(self.user_set.set_enum_value(Filter.name, Filter.Value_Mean))
-        show_error(self.user_set.set_enum_value(MeanFilterWindowSize.name, MeanFilterWindowSize.Value_WindowSize_2))
-        show_error(self.user_set.set_bool_value(EnableBlindSpotFiltering.name, False))
-        show_error(self.user_set.set_bool_value(EnableXAxisAlignment.name, False))
-        show_error(self.user_set.set_enum_value(ExposureMode.name, ExposureMode.Value_Timed))
-        show_error(self.user_set.set_int_value(ExposureTime.name, 1000))
+        return self.session.apply({
+            ExposureMode.name: ("enum", ExposureMode.Value_HDR),
+            ExposureTime.name: ("int", exposure_time),
+            HdrExposureTimeProportion1.name: ("float", proportion1),
+            HdrExposureTimeProportion2.name: ("float", proportion2),
+            HdrFirstThreshold.name: ("float", first_threshold),
+            HdrSecondThreshold.name: ("float", second_threshold),
+        })
+
+    @staticmethod
+    def scan_parameters(scan_line_count, trigger_rate=None) -> dict:
+        if trigger_rate is None:
+            trigger_rate = TriggerWithExternalDeviceAndFixedRate.SOFTWARE_TRIGGER_RATE
+        return {
+            DataAcquisitionTriggerSource.name: ("enum", DataAcquisitionTriggerSource.Value_Software),
+            LineScanTriggerSource.name: ("enum", LineScanTriggerSource.Value_FixedRate),
+            SoftwareTriggerRate.name: ("float", trigger_rate),
+            ScanLineCount.name: ("int", scan_line_count),
+            CallbackRetrievalTimeout.name: ("int", 60000),
+
+            LaserPower.name: ("int", 100),
+            MinLaserLineWidth.name: ("int", 2),
+            MaxLaserLineWidth.name: ("int", 30),
+            AnalogGain.name: ("enum", AnalogGain.Value_Gain_2),
+            DigitalGain.name: ("int", 0),
+            MinGrayscaleValue.name: ("int", 50),
+            SpotSelection.name: ("enum", SpotSelection.Value_Strongest),
+            MinSpotIntensity.name: ("int", 51),
+            MaxSpotIntensity.name: ("int", 205),
+            Filter.name: ("enum", Filter.Value_Mean),
+            MeanFilterWindowSize.name: ("enum", MeanFilterWindowSize.Value_WindowSize_2),
+            EnableBlindSpotFiltering.name: ("bool", False),
+            EnableXAxisAlignment.name: ("bool", False),
+            ExposureMode.name: ("enum", ExposureMode.Value_Timed),
+            ExposureTime.name: ("int", 1000),
+        }
+
+    def set_parameters(self, scan_line_count, trigger_rate=None) -> bool:
+        parameters = self.scan_parameters(scan_line_count, trigger_rate)
+        if not self.session.apply(parameters):
+            return False
 
-        error, self.data_width = self.user_set.get_int_value(DataPointsPerProfile.name)
-        show_error(error)
-        error, self.capture_line_count = self.user_set.get_int_value(ScanLineCount.name)
-        show_error(error)
-        error, data_acquisition_trigger_source = self.user_set.get_enum_value(DataAcquisitionTriggerSource.name)
-        show_error(error)
-        self.is_software_trigger = data_acquisition_trigger_source == DataAcquisitionTriggerSource.Value_Software
+        self.data_width = self.session.data_width
+        self.capture_line_count = scan_line_count
+        self.trigger_rate = parameters[SoftwareTriggerRate.name][1]
+        self.x_unit = self.session.get("float", XAxisResolution.name)
+        self.y_unit = self.session.get("float", YResolution.name)
+        if self.x_unit is None or self.y_unit is None:
+            return False
+        self.is_software_trigger = parameters[DataAcquisitionTriggerSource.name][1] == DataAcquisitionTriggerSource.Value_Software
+        return True
 
     def acquire_profile_data_using_callback(self, lua_name) -> bool:
-        self.profile_batch.clear()
-        show_error(self.user_set.set_int_value(CallbackRetrievalTimeout.name, 60000))
-        self.callback = CustomAcquisitionCallback(self.data_width).__disown__()
+        converter = self.converters.setdefault(lua_name, DepthToPointsConverter())
+        self.assembler = StreamingCloudAssembler(self.data_width, self.capture_line_count, self.x_unit, self.y_unit, converter=converter)
+        self.callback = CustomAcquisitionCallback(self.data_width, self.assembler).__disown__()
 
         status = self.profiler.register_acquisition_callback(self.callback)
         if not status.is_ok():
             show_error(status)
+            self.session.invalidate()
             return False
 
         extra_commands = [{"cmd": 303, "data": {"mode": "1"}}]
-        pre_move = None
-        post_move = None
-
-        scrc2 = [-450, 130, 470, 82.80, 89.93, -7.30]
-        p90 = [-335, -400, 450, -90, -0.7, 90]
-        p91 = [-337, 250, 450, -90, -0.7, 90]
-        h1 = [-382, -120, 580, -90, -91, 180]
-        h2 = [-382, 200, 580, -90, -91, 180]
-        h1_alt = [-432, -120, 510, -90, -91, 180]
-        h2_alt = [-432, 200, 510, -90, -91, 180]
-
-        if lua_name == "small.lua":
-            pre_move = ("MoveL", scrc2)
-            post_move = ("MoveCart", h2)
-        elif lua_name == "horizontal.lua":
-            pre_move = ("MoveL", h1)
-            post_move = ("MoveCart", h1_alt)
-        elif lua_name == "horizontal2.lua":
-            pre_move = ("MoveL", h2_alt)
-            post_move = ("MoveCart", p91)
-        elif lua_name == "vertical.lua":
-            pre_move = ("MoveL", p90)
+        _, pre_move, post_move = self.VIEW_MOVES.get(lua_name, (None, None, None))
+
+        with self.timer.phase("motion_wait"):
+            self.wait_for_motion()
 
         if pre_move:
-            threading.Thread(target=self._move_robot, args=pre_move).start()
+            self.motion = threading.Thread(target=self._timed_move, args=(self.timer, "pre_move", *pre_move))
+            self.motion.start()
 
+        acquisition_start = time.perf_counter()
         status = self.profiler.start_acquisition()
         if not status.is_ok():
             show_error(status)
+            self.session.invalidate()
             return False
 
         if self.is_software_trigger:
             status = self.profiler.trigger_software()
             if not status.is_ok():
                 show_error(status)
+                self.profiler.stop_acquisition()
+                self.session.invalidate()
                 return False
 
-        self._wait_for_profile_data()
-
-        status = self.profiler.stop_acquisition()
+        try:
+            self._wait_for_profile_data()
+        except AcquisitionTimeoutError:
+            self.profiler.stop_acquisition()
+            self.session.invalidate()
+            raise
+        finally:
+            self.timer.add("acquisition", (time.perf_counter() - acquisition_start) * 1000)
+            if self.callback.first_batch_at is not None:
+                self.timer.add("first_profile", (self.callback.first_batch_at - acquisition_start) * 1000)
+
+        with self.timer.phase("stop_acquisition"):
+            status = self.profiler.stop_acquisition()
         if not status.is_ok():
             show_error(status)
+        if self.callback.error is not None:
+            raise self.callback.error
 
+        # The post move runs in the background while the points are handed off;
+        # the next view's acquisition waits for it in wait_for_motion().
         if post_move:
-            self._move_robot(*post_move)
-            time.sleep(1)
+            self.motion = threading.Thread(target=self._timed_move, args=(self.timer, "post_move", *post_move, self.motion))
+            self.motion.start()
 
-        self.profile_batch.append(self.callback.profile_batch)
+        # Zero-copy hand-off: take over the callback's batch instead of appending it again.
+        with self.callback.lock:
+            self.profile_batch = self.callback.profile_batch
         return True
 
-    def _move_robot(self, move_type: str, coordinates: list, vel_cart=54, vel_l=54):
+    def _move_robot(self, move_type: str, coordinates: list, vel_cart=54, vel_l=SWEEP_VELOCITY):
         if move_type == "MoveCart":
             self.robot.MoveCart(coordinates, 0, 0, vel=self.vel_mul * vel_cart)
         elif move_type == "MoveL":
@@ -150,28 +390,149 @@ class TriggerWithExternalDeviceAndFixedRate(object):
         else:
             raise ValueError(f"Unsupported move type: {move_type}")
 
+    def _timed_move(self, timer: PhaseTimer, phase: str, move_type: str, coordinates: list, after: threading.Thread = None):
+        if after is not None:
+            after.join()
+        if self.motion_error is not None:
+            # An earlier move failed, the robot is not where this one expects it
+            return
+        try:
+            with timer.phase(phase):
+                self._move_robot(move_type, coordinates)
+        except Exception as e:
+            logger.error(f"Robot {phase} failed: {e}")
+            self.motion_error = e
+
+    def wait_for_motion(self, timeout=60, poll_interval=0.01):
+        """
+        Blocks until the dispatched robot moves are finished and the controller reports
+        the motion as done, instead of sleeping for a fixed time.
+
+        The error of a failed background move is raised here, as the move itself would have
+        raised when it ran synchronously. MotionError is raised if the moves or the motion
+        do not finish within timeout or the motion state cannot be read.
+        """
+        deadline = time.monotonic() + timeout
+        if self.motion is not None:
+            self.motion.join(timeout)
+            if self.motion.is_alive():
+                raise MotionError(f"Robot move still running after {timeout} s")
+            self.motion = None
+        if self.motion_error is not None:
+            error, self.motion_error = self.motion_error, None
+            raise error
+        while time.monotonic() < deadline:
+            try:
+                error, done = self.robot.GetRobotMotionDone()
+            except Exception as e:
+                raise MotionError(f"Motion state could not be read: {e}") from e
+            if error != 0:
+                raise MotionError(f"Motion state could not be read, error code {error}")
+            if done == 1:
+                return
+            time.sleep(poll_interval)
+        raise MotionError(f"Robot motion not done after {timeout} s")
+
+    def _acquisition_timeout(self) -> float:
+        if self.acquisition_timeout is not None:
+            return self.acquisition_timeout
+        return self.capture_line_count / self.trigger_rate + self.ACQUISITION_TIMEOUT_MARGIN
+
     def _wait_for_profile_data(self):
-        while True:
-            with mutex:
+        """
+        Blocks until the acquisition callback has delivered all profiles.
+
+        Acts as the acquisition watchdog: if the timeout expires with part of the profiles
+        delivered, the acquisition continues with those; if nothing arrived,
+        AcquisitionTimeoutError is raised instead of waiting forever. The caller stops
+        the acquisition and invalidates the session so the next view reconnects.
+        """
+        timeout = self._acquisition_timeout()
+        if not self.callback.done.wait(timeout):
+            with self.callback.lock:
                 empty = self.callback.profile_batch.is_empty()
             if empty:
-                sleep(0.5)
-            else:
-                break
+                logger.error(f"No profile data received within {timeout:.1f} s.")
+                raise AcquisitionTimeoutError(f"Profiler acquisition timed out after {timeout:.1f} s")
+            logger.warning(f"Only {self.assembler.height}/{self.capture_line_count} profiles received within {timeout:.1f} s.")
 
     def save_depth_and_intensity(self, depth_file_name, intensity_file_name):
         cv2.imwrite(depth_file_name, self.profile_batch.get_depth_map().data())
         cv2.imwrite(intensity_file_name, self.profile_batch.get_intensity_image().data())
 
+    def plan_scan(self, lua_name, scan_line_count):
+        """
+        Returns the (scan_line_count, trigger_rate) of the view: derived from its sweep with
+        scan_sizing, or the caller's count at SOFTWARE_TRIGGER_RATE otherwise.
+        """
+        moves = self.VIEW_MOVES.get(lua_name)
+        if self.scan_sizing is None or moves is None:
+            return scan_line_count, self.SOFTWARE_TRIGGER_RATE
+        y_resolution = self.session.get("float", YResolution.name)
+        if y_resolution is None:
+            return scan_line_count, self.SOFTWARE_TRIGGER_RATE
+
+        start, (_, end), _ = moves
+        plan = self.scan_sizing.plan(sweep_length(start, end), self.vel_mul * self.SWEEP_VELOCITY, y_resolution)
+        logger.info(f"{lua_name}: {plan.sweep_length:.0f} mm at {plan.speed:.0f} mm/s -> "
+                    f"{plan.line_count} lines at {plan.trigger_rate:.0f} Hz (fixed: {scan_line_count} lines)")
+        return plan.line_count, plan.trigger_rate
+
+    def prepare(self, scan_line_count, lua_name=None) -> bool:
+        """Connects if needed and applies the view's parameters, retrying once on a fresh connection."""
+        for _ in range(2):
+            with self.timer.phase("connect"):
+                connected = self.session.ensure_connected()
+            if connected:
+                with self.timer.phase("set_parameters"):
+                    applied = self.set_parameters(*self.plan_scan(lua_name, scan_line_count))
+                if applied:
+                    return True
+            self.session.invalidate()
+        return False
+
+    def close(self):
+        try:
+            self.wait_for_motion()
+        finally:
+            self.session.close()
+
+    def cycle_report(self) -> dict:
+        return self.session.cycle_report()
+
+    def pop_timings(self) -> list:
+        """Returns the phase records of the views acquired since the last call."""
+        timers, self.timers = self.timers, []
+        return [timer.record() for timer in timers]
+
+    def release_points(self):
+        """Hands the buffers of the points main() returned back for reuse; those points must not be used afterwards."""
+        for converter in self.converters.values():
+            converter.release()
+
+    def set_tray_index(self, index: int):
+        """Tags the following acquisitions with the tray index when recording."""
+        if self.recorder is not None:
+            self.recorder.tray_index = index
+
+    def _record(self, lua_name):
+        trigger_source = self.session.applied[LineScanTriggerSource.name][1]
+        self.recorder.record(lua_name, self.profile_batch.get_depth_map().data().copy(),
+                             self.profile_batch.get_encoder_array().data().copy(),
+                             self.x_unit, self.y_unit, trigger_source, self.capture_line_count)
+
+    def depth_scan(self) -> DepthScan:
+        """Organized depth map of the last acquisition; it shares the batch memory until the next acquisition."""
+        depth = self.profile_batch.get_depth_map().data()[:self.assembler.height]
+        return DepthScan(depth, self.x_unit, self.y_unit)
+
     def main(self, lua_name, scan_line_count=4000):
+        self.timer = PhaseTimer(lua_name)
+        self.timers.append(self.timer)
 
-        if not find_and_connect(self.profiler):
+        if not self.prepare(scan_line_count, lua_name):
             return -1
 
-        self.set_parameters(scan_line_count)
-
-        self.profile_batch = ProfileBatch(self.data_width)
-
         if not self.acquire_profile_data_using_callback(lua_name):
             return -1
 
@@ -179,7 +540,11 @@ class TriggerWithExternalDeviceAndFixedRate(object):
             print("Part of the batch's data is lost, the number of valid profiles is:",
                   self.profile_batch.valid_height())
 
-        points = save_point_cloud(profile_batch=self.profile_batch, user_set=self.user_set, save_csv=False, save_ply=False, save_np=True)
-        
-        self.profiler.disconnect()
+        if self.recorder is not None:
+            self._record(lua_name)
+
+        # Profiles were converted by the callback while they arrived.
+        points = self.assembler.finish()
+        self.timer.add("conversion", self.assembler.convert_ms)
+        self.timer.stop()
         return points
@@ -0,0 +1,140 @@
+import numpy as np
+
+
+class PointCloudView(object):
+    """
+    Read-only N x 3 point cloud with cached axis statistics and per-axis range indexes.
+
+    Range queries bisect the sorted values of an indexed axis, so they cost O(log n + k) for
+    the k points in range, plus checking the other bounds of the query on those k points,
+    instead of a mask over the whole cloud. An axis is indexed on its first range query.
+    Build one view per cloud and pass it to every Scripts function, so a part's analysis
+    indexes each cloud once.
+
+    Clouds converted from a depth map list their points row by row, so the row axis is
+    already monotonic (descending after a 180 degree rotation). Such an axis is indexed by
+    its own order without sorting, and its ranges are contiguous slices of the cloud.
+    Other axes are argsorted only with sort=True: an argsort costs about five band masks
+    of the same cloud, more than the few queries per axis of one part's measurements.
+
+    Views made by of() from a plain array are not indexed. They cache statistics but answer
+    range queries with masks. Query results keep the original point order, so they equal
+    the masked arrays. Caches are filled idempotently, so measurement steps on different
+    threads can share one view.
+
+    Args:
+        points (np.ndarray): N x 3 points; must not be modified while the view is used.
+        index_axes (tuple): Axes that range queries may use an index for; bounds on other
+            axes are checked on the candidates of the narrowest indexed bound.
+        sort (bool): Argsort index axes that are not monotonic instead of masking them.
+    """
+    def __init__(self, points: np.ndarray, index_axes=(0, 1), sort: bool = False):
+        self.points = np.asarray(points)
+        self.index_axes = tuple(index_axes)
+        self.sort = sort
+        self._order = {}
+        self._sorted = {}
+        self._direction = {}
+        self._stats = {}
+
+    @classmethod
+    def of(cls, points):
+        """points itself if it already is a view, otherwise an unindexed view of the array."""
+        return points if isinstance(points, cls) else cls(points, index_axes=())
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _index(self, axis: int) -> bool:
+        """Indexes axis on first use; False if it is neither monotonic nor sorted."""
+        if axis not in self._direction:
+            values = np.ascontiguousarray(self.points[:, axis])
+            direction = None
+            if np.all(values[1:] >= values[:-1]):
+                direction, self._sorted[axis] = 1, values
+            elif np.all(values[1:] <= values[:-1]):
+                direction, self._sorted[axis] = -1, values[::-1]
+            elif self.sort:
+                order = np.argsort(values)
+                direction, self._order[axis], self._sorted[axis] = 0, order, values[order]
+            self._direction[axis] = direction
+        return self._direction[axis] is not None
+
+    def _stat(self, name: str, axis: int, func):
+        key = (name, axis)
+        if key not in self._stats:
+            self._stats[key] = func(self.points[:, axis])
+        return self._stats[key]
+
+    def min(self, axis: int) -> float:
+        if axis in self._sorted:
+            return self._sorted[axis][0]
+        return self._stat("min", axis, np.min)
+
+    def max(self, axis: int) -> float:
+        if axis in self._sorted:
+            return self._sorted[axis][-1]
+        return self._stat("max", axis, np.max)
+
+    def median(self, axis: int) -> float:
+        if axis in self._sorted:
+            values, n = self._sorted[axis], len(self)
+            return values[n // 2] if n % 2 else (values[n // 2 - 1] + values[n // 2]) / 2
+        return self._stat("median", axis, np.median)
+
+    def indices(self, x=None, y=None, z=None, closed: bool = False) -> np.ndarray:
+        """
+        Ascending indices of the points with x[0] < X < x[1], y[0] < Y < y[1] and
+        z[0] < Z < z[1] (<= with closed). A bound of None is open.
+        """
+        limits = []
+        for axis, bounds in enumerate((x, y, z)):
+            if bounds is not None:
+                limits.append((axis, -np.inf if bounds[0] is None else bounds[0],
+                               np.inf if bounds[1] is None else bounds[1]))
+
+        # Bisect every indexed bound and start from the narrowest range
+        best = None
+        for axis, low, high in limits:
+            if axis not in self.index_axes or not self._index(axis):
+                continue
+            values = self._sorted[axis]
+            start = np.searchsorted(values, low, side="left" if closed else "right")
+            stop = max(np.searchsorted(values, high, side="right" if closed else "left"), start)
+            if best is None or stop - start < best[0]:
+                best = (stop - start, axis, start, stop)
+
+        points, offset, candidates = self.points, 0, None
+        if best is not None:
+            _, axis, start, stop = best
+            limits = [limit for limit in limits if limit[0] != axis]
+            direction = self._direction[axis]
+            if direction:
+                # A monotonic axis: the range is a slice of the cloud in its original order
+                if direction < 0:
+                    start, stop = len(self) - stop, len(self) - start
+                points, offset = self.points[start:stop], start
+            else:
+                candidates = self._order[axis][start:stop]
+                points = self.points[candidates]
+
+        mask = None
+        for axis, low, high in limits:
+            values = points[:, axis]
+            inside = (values >= low) & (values <= high) if closed else (values > low) & (values < high)
+            mask = inside if mask is None else mask & inside
+
+        if candidates is None:
+            return offset + (np.arange(len(points)) if mask is None else np.flatnonzero(mask))
+        if mask is not None:
+            candidates = candidates[mask]
+        # Back to the original order: sort small selections, flag large ones
+        if len(candidates) * 16 < len(self):
+            return np.sort(candidates)
+        selected = np.zeros(len(self), dtype=bool)
+        selected[candidates] = True
+        return np.flatnonzero(selected)
+
+    def query(self, x=None, y=None, z=None, closed: bool = False) -> np.ndarray:
+        """Points selected by indices(x, y, z, closed)."""
+        return self.points[self.indices(x, y, z, closed)]
@@ -0,0 +1,87 @@
+import numpy as np
+
+from depth_conversion import pitch
+
+
+def organize_points(depth: np.ndarray, x_unit: float, y_unit: float, y_values: np.ndarray = None) -> np.ndarray:
+    """
+    Builds an organized (H, W, 3) float32 point grid from a depth map; invalid cells stay NaN.
+
+    Args:
+        depth (np.ndarray): (H, W) depth map in mm, NaN where no point was measured.
+        x_unit, y_unit (float): Profiler X-axis and Y resolutions in um.
+        y_values (np.ndarray, optional): Per-profile Y index (e.g. encoder values). Defaults to the row index.
+    """
+    height, width = depth.shape
+    if y_values is None:
+        y_values = np.arange(height)
+    points = np.empty((height, width, 3), dtype=np.float32)
+    points[:, :, 0] = np.arange(width) * x_unit * pitch
+    points[:, :, 1] = (np.asarray(y_values) * y_unit * pitch)[:, None]
+    points[:, :, 2] = depth
+    invalid = np.isnan(depth)
+    points[invalid, 0] = np.nan
+    points[invalid, 1] = np.nan
+    return points
+
+
+def _as_vertices(points: np.ndarray, is_organized: bool = True) -> np.ndarray:
+    vertices = np.ascontiguousarray(np.asarray(points, dtype=np.float32).reshape(-1, 3))
+    if not is_organized:
+        vertices = vertices[~np.isnan(vertices).any(axis=1)]
+    return vertices
+
+
+def write_ply(file_name: str, points: np.ndarray, is_organized: bool = True):
+    """
+    Writes points as a binary little-endian PLY with float32 x, y, z.
+
+    Accepts unorganized (N, 3) or organized (H, W, 3) arrays. Organized grids keep their
+    NaN cells unless is_organized is False.
+    """
+    vertices = _as_vertices(points, is_organized).astype('<f4', copy=False)
+    header = (
+        "ply\n"
+        "format binary_little_endian 1.0\n"
+        "comment File generated\n"
+        "comment x y z data unit in mm\n"
+        f"element vertex {len(vertices)}\n"
+        "property float x\n"
+        "property float y\n"
+        "property float z\n"
+        "end_header\n"
+    )
+    with open(file_name, 'wb') as file:
+        file.write(header.encode('ascii'))
+        file.write(vertices.tobytes())
+
+
+def write_csv(file_name: str, points: np.ndarray, is_organized: bool = True):
+    """Writes points as X,Y,Z text rows, formatted as a whole array."""
+    np.savetxt(file_name, _as_vertices(points, is_organized), fmt="%.6f", delimiter=",", header="X,Y,Z", comments="")
+
+
+def write_npy(file_name: str, points: np.ndarray):
+    """Writes points with their shape (organized or not) as a .npy file."""
+    np.save(file_name, np.asarray(points, dtype=np.float32))
+
+
+def write_npz(file_name: str, compressed: bool = True, **arrays):
+    """Writes named arrays to a .npz archive, compressed by default."""
+    if compressed:
+        np.savez_compressed(file_name, **arrays)
+    else:
+        np.savez(file_name, **arrays)
+
+
+def read_ply(file_name: str) -> np.ndarray:
+    """Reads a binary little-endian PLY written by write_ply() back as an (N, 3) float32 array."""
+    with open(file_name, 'rb') as file:
+        vertex_count = 0
+        while True:
+            line = file.readline().decode('ascii').strip()
+            if line.startswith("element vertex"):
+                vertex_count = int(line.split()[-1])
+            if line == "end_header":
+                break
+        return np.fromfile(file, dtype='<f4', count=vertex_count * 3).reshape(-1, 3)
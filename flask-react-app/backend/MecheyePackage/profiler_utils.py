@@ -2,8 +2,13 @@ from mecheye.profiler import *
 from mecheye.shared import *
 import numpy as np
 import time
-pitch = 1e-3
+import threading
+from depth_conversion import DepthToPointsConverter, pitch
+from pointcloud_io import organize_points, write_ply, write_csv, write_npy, write_npz
 
+# Tampon havuzu olmayan converter: gridleri çağrılar arasında saklanır, dönen diziler çağıranındır.
+default_converter = DepthToPointsConverter(buffers=0)
+default_converter_lock = threading.Lock()
 
 def print_profiler_info(profiler_info: ProfilerInfo):
     print("Device Firmware Version:", profiler_info.firmware_version)
@@ -89,52 +94,29 @@ def print_profiler_status(profiler_status: ProfilerStatus):
     print()
 
 
+def _organized_points(profile_batch: ProfileBatch, x_unit: float, y_unit: float, use_encoder_values: bool, encoder_vals: np.array) -> np.ndarray:
+    depth = profile_batch.get_depth_map().data()
+    return organize_points(depth, x_unit, y_unit, encoder_vals if use_encoder_values else None)
+
+
 def save_data_to_ply(file_name: str, profile_batch: ProfileBatch, x_unit: float, y_unit: float, use_encoder_values: bool, encoder_vals: np.array, is_organized: bool = True):
-    data_width = profile_batch.width()
-    with open(file_name, 'w') as file:
-        depth = profile_batch.get_depth_map().data()
-        vertex_count = depth.size if is_organized else depth[~np.isnan(
-            depth)].size
-        y, x = np.indices(depth.shape, dtype=np.uint16)
-
-        file.write(f"""ply
-format ascii 1.0
-comment File generated
-comment x y z data unit in mm
-element vertex {vertex_count}
-property float x
-property float y
-property float z
-end_header
-"""
-                   )
-
-        def depth_to_point(x, y, depth):
-            if not np.isnan(depth):
-                file.write("{} {} {}\n".format(
-                    x * x_unit * pitch, y * y_unit * pitch, depth))
-            elif is_organized:
-                file.write("nan nan nan\n")
-        
-        np.vectorize(depth_to_point)(x, np.repeat(encoder_vals, data_width).reshape(depth.shape) if use_encoder_values else y, depth)
+    points = _organized_points(profile_batch, x_unit, y_unit, use_encoder_values, encoder_vals)
+    write_ply(file_name, points, is_organized)
 
 
 def save_data_to_csv(file_name: str, profile_batch: ProfileBatch, x_unit: float, y_unit: float, use_encoder_values: bool, encoder_vals: np.array, is_organized: bool = True):
-    data_width = profile_batch.width()
-    with open(file_name, 'w') as file:
-        file.write("X,Y,Z\n")
-        depth = profile_batch.get_depth_map().data()
-        y, x = np.indices(depth.shape, np.uint16)
+    points = _organized_points(profile_batch, x_unit, y_unit, use_encoder_values, encoder_vals)
+    write_csv(file_name, points, is_organized)
 
-        def depth_to_point(x, y, depth):
-            if not np.isnan(depth):
-                file.write("{},{},{}\n".format(x * x_unit *
-                           pitch, y * y_unit * pitch, depth))
-            elif is_organized:
-                file.write("nan,nan,nan\n")
 
-        np.vectorize(depth_to_point)(x, np.repeat(encoder_vals, data_width).reshape(
-            depth.shape) if use_encoder_values else y, depth)
+def save_data_to_npy(file_name: str, profile_batch: ProfileBatch, x_unit: float, y_unit: float, use_encoder_values: bool, encoder_vals: np.array, is_organized: bool = True, compressed: bool = False):
+    points = _organized_points(profile_batch, x_unit, y_unit, use_encoder_values, encoder_vals)
+    if not is_organized:
+        points = points[~np.isnan(points[:, :, 2])]
+    if compressed:
+        write_npz(file_name, points=points)
+    else:
+        write_npy(file_name, points)
 
 
 def get_trigger_interval_distance() -> float:
@@ -146,24 +128,17 @@ def get_trigger_interval_distance() -> float:
         print("Input invalid!")
 
 
-def save_data_to_np(profile_batch: ProfileBatch, x_unit: float, y_unit: float, use_encoder_values: bool, encoder_vals: np.array, is_organized: bool = True):
-    depth = profile_batch.get_depth_map().data()
-    y, x = np.indices(depth.shape, dtype=np.uint16)
-        
-    # Geçerli depth değerlerini al
-    valid_mask = ~np.isnan(depth)
-
-    # Geçerli verileri filtrele
-    valid_x = x[valid_mask]
-    valid_y = y[valid_mask]
-    valid_depth = depth[valid_mask]
-
-    valid_points_array = np.stack([valid_x * x_unit * pitch, valid_y * y_unit * pitch, valid_depth], axis=-1, dtype=np.float32)
-    
-    return valid_points_array  
+def save_data_to_np(profile_batch: ProfileBatch, x_unit: float, y_unit: float, use_encoder_values: bool, encoder_vals: np.array, is_organized: bool = True, converter: DepthToPointsConverter = None):
+    # converter verilirse dönen dizi onun tamponunun bir görünümüdür ve çağıran işi bitince
+    # converter.release() ile tamponu geri vermelidir. converter verilmezse dönen dizi çağıranındır.
+    if converter is None:
+        with default_converter_lock:
+            return default_converter.convert(profile_batch.get_depth_map().data(), x_unit, y_unit)
+    return converter.convert(profile_batch.get_depth_map().data(), x_unit, y_unit)
 
 
-def save_point_cloud(profile_batch: ProfileBatch, user_set: UserSet, save_ply: bool = True, save_csv: bool = False, is_organized: bool = True, save_np=False):
+def save_point_cloud(profile_batch: ProfileBatch, user_set: UserSet, save_ply: bool = True, save_csv: bool = False, is_organized: bool = True, save_np=False, converter: DepthToPointsConverter = None,
+                     save_npy: bool = False, compressed: bool = False):
     if profile_batch.is_empty():
         return
 
@@ -195,5 +170,8 @@ def save_point_cloud(profile_batch: ProfileBatch, user_set: UserSet, save_ply: b
         save_data_to_csv("PointCloud.csv", profile_batch, x_unit, y_unit, use_encoder_values, encoder_vals, is_organized)
     if save_ply:
         save_data_to_ply("PointCloud.ply", profile_batch, x_unit, y_unit, use_encoder_values, encoder_vals, is_organized)
+    if save_npy:
+        file_name = "PointCloud.npz" if compressed else "PointCloud.npy"
+        save_data_to_npy(file_name, profile_batch, x_unit, y_unit, use_encoder_values, encoder_vals, is_organized, compressed)
     if save_np:
-        return save_data_to_np(profile_batch, x_unit, y_unit, use_encoder_values, encoder_vals, is_organized)
+        return save_data_to_np(profile_batch, x_unit, y_unit, use_encoder_values, encoder_vals, is_organized, converter)
@@ -3,16 +3,21 @@ import threading
 import time
 import numpy as np
 import requests
-import open3d as o3d
 import matplotlib
 from Scripts import *
-from mecheye_trigger import TriggerWithExternalDeviceAndFixedRate
+from pointcloud_io import write_ply
 from points import *
 import json
 import mysql.connector
 import logging
 import socketio
 from ResultWriter import AppwriteDataWriter
+from figure_worker import FigureWorker
+from depth_scan import DepthScan
+from point_cloud_view import PointCloudView
+from calibration import load_calibration
+from measurement_graph import MeasurementGraph
+from measurement_pool import MeasurementPool
 
 DEVICE_IP = os.environ.get('IP_ADDRESS')
 PORT = os.environ.get('PORT')
@@ -30,32 +35,53 @@ config_path = os.path.join(base_dir, 'config.json')
 with open(config_path, "r") as f:
     config = json.load(f)
 
-mech_eye = TriggerWithExternalDeviceAndFixedRate(vel_mul=config["vel_mul"])
-robot = mech_eye.robot
-
-
-def handle_errors(func):
-    def wrapper(*args, **kwargs):
-        try:
-            return func(*args, **kwargs)
-        except Exception as e:
-            logger.exception(f"Error in '{func.__name__}': {e}")
-            # Move robot to safe position
-            if read_current_point_index()<=32:
-                robot.MoveCart(p90, 0, 0, vel=config["vel_mul"] * 50)
-            else:
-                robot.MoveCart(p91, 0, 0, vel=config["vel_mul"] * 50)
-            robot.WaitMs(500)
-            # mech_eye.profiler.disconnect()
-            # robot.WaitMs(500)
-            # robot.SetDO(7, 0)  # Set DO7 to 0 (vacuum off)
-            # robot.WaitMs(500)
-            logger.error("Robot moved to safe position due to error.")
-            # # Get the scanner instance and restart the cycle
-            # scanner = args[0]  # assuming first argument is self
-            # scanner.run_scan_cycle()  # restart the scanning cycle
-            
-    return wrapper
+def create_trigger(vel_mul: float):
+    """
+    Returns the acquisition backend: recorded scans when "replay_dir" is configured,
+    otherwise the Mech-Eye profiler (recording to "record_dir" if configured).
+    """
+    if config.get("replay_dir"):
+        from scan_replay import ReplayTrigger
+        return ReplayTrigger(os.path.join(base_dir, config["replay_dir"]), vel_mul)
+
+    from mecheye_trigger import TriggerWithExternalDeviceAndFixedRate
+    from scan_sizing import MotionScanSizing
+    trigger = TriggerWithExternalDeviceAndFixedRate(vel_mul, acquisition_timeout=config.get("acquisition_timeout"),
+                                                    scan_sizing=MotionScanSizing.from_config(config))
+    if config.get("record_dir"):
+        from scan_replay import AcquisitionRecorder
+        trigger.recorder = AcquisitionRecorder(os.path.join(base_dir, config["record_dir"]))
+    return trigger
+
+# Boundary extraction of the circle/slope/horn fits: "raster" (edges on a raster) or "envelope" (raster-free)
+EDGE_ENGINE = config.get("edge_engine", "raster")
+# Circle fits: "least_squares" or "robust" (RANSAC + Tukey); robust fits below min_inlier_ratio are repaired
+# from the same edge points (circle_fit.repair_circle_fit) and rejected only if that fails
+FIT_MODE = config.get("fit_mode", "least_squares")
+MIN_INLIER_RATIO = config.get("min_inlier_ratio", 0.0)
+# Per-view transforms from profiler to part coordinates, applied in float32 (see calibration.py); converter
+# buffers are transformed into new arrays, arrays built here in place
+CALIBRATION = load_calibration(os.path.join(base_dir, config.get("calibration_file", "calibration.json")))
+# Threads of the measurement graph; without Agg the steps run in the main thread for pyplot
+MEASUREMENT_WORKERS = config.get("measurement_workers", 4)
+# "threads" or "processes": the small and horizontal fits run in a pool of forked worker processes
+MEASUREMENT_MODE = config.get("measurement_mode", "threads")
+MEASUREMENT_PROCESSES = config.get("measurement_processes", 2)
+
+
+def move_to_safe_position(step: str, error: Exception):
+    """on_error of the measurement graph: a failed step moves the robot to a safe position."""
+    robot = mech_eye.robot
+    if read_current_point_index()<=32:
+        robot.MoveCart(p90, 0, 0, vel=config["vel_mul"] * 50)
+    else:
+        robot.MoveCart(p91, 0, 0, vel=config["vel_mul"] * 50)
+    robot.WaitMs(500)
+    # mech_eye.profiler.disconnect()
+    # robot.WaitMs(500)
+    # robot.SetDO(7, 0)  # Set DO7 to 0 (vacuum off)
+    # robot.WaitMs(500)
+    logger.error(f"Robot moved to safe position due to error in '{step}': {error}")
 
 
 def read_current_point_index() -> int:
@@ -91,14 +117,23 @@ if "save_figures" not in config:
     with open(config_path, "w") as f:
         json.dump(config, f, indent=4)
         
+FIGURES_DIR = os.path.join(os.path.dirname(__file__), "Scan_Outputs", "figures")
+
 def save_figure(plt, filename: str, dpi: int = 300):
-    """Helper function to save matplotlib figures"""
+    """Helper function to save matplotlib figures (pyplot or a Figure)"""
     if config["save_figures"]:
-        fig_path = os.path.join(os.path.dirname(__file__), "Scan_Outputs", "figures", filename)
+        fig_path = os.path.join(FIGURES_DIR, filename)
         os.makedirs(os.path.dirname(fig_path), exist_ok=True)
         plt.savefig(fig_path, dpi=dpi, bbox_inches='tight')
         logger.info(f"Plot saved to {fig_path}")
 
+def save_points(points: np.ndarray, filename: str):
+    """Helper function to save point clouds as binary PLY"""
+    out_path = os.path.join(os.path.dirname(__file__), "Scan_Outputs", filename)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    write_ply(out_path, points)
+    logger.info(f"Point cloud saved to {out_path}")
+
 # Backend configuration: Agg mode is non-interactive; TkAgg is interactive.
 if config["use_agg"]:
     matplotlib.use('Agg')
@@ -108,7 +143,157 @@ else:
     matplotlib.use('TkAgg')
     import matplotlib.pyplot as plt
 
-class JaguarScanner:
+def figure_artifacts(saved: bool = True):
+    """
+    Collector for the plot artifacts of a measurement step, or None when its figure would be
+    neither saved nor shown; the measurement functions then skip everything that only feeds a plot.
+    """
+    if (saved and config["save_figures"]) or not config["use_agg"]:
+        return []
+    return None
+
+class ViewMeasurements(object):
+    """
+    Measurements of the small and horizontal views and the publishing of their figures.
+
+    Holds no robot, profiler or socket and no per-cycle state, so the measurement pool
+    forks one as the target of its worker processes; JaguarScanner extends it with the
+    robot, the acquisitions and the vertical steps.
+
+    Args:
+        figure_worker (FigureWorker, optional): Worker the saved figures are queued to.
+    """
+    def __init__(self, figure_worker=None):
+        self.figure_worker = figure_worker
+
+    @staticmethod
+    def to_origin(points: np.ndarray) -> np.ndarray:
+        min_x, min_y = np.min(points[:, 0]), np.min(points[:, 1])
+        points[:, 0] -= min_x
+        points[:, 1] -= min_y
+        return points
+
+    def publish_figures(self, artifacts, filename: str = None):
+        """
+        Hands the first plot artifact of a measurement step to the figure worker to be saved as
+        filename. Without a worker the artifacts are rendered here with pyplot, the first one is
+        saved and all are shown in interactive mode.
+        """
+        if not artifacts:
+            return
+        if self.figure_worker is not None:
+            if filename:
+                self.figure_worker.submit(artifacts[0], filename)
+            return
+        figures = [artifact.render() for artifact in artifacts]
+        if filename:
+            save_figure(figures[0], filename)
+        if not config["use_agg"]:
+            plt.show()
+        for figure in figures:
+            plt.close(figure)
+
+    @staticmethod
+    def fit_inlier_ratios(name: str, fits: list) -> dict:
+        """Inlier ratio of each robust fit, e.g. horizontal_2."""
+        return {f"{name}_{i}": fit.inlier_ratio for i, fit in enumerate(fits, start=1) if fit.inlier_ratio is not None}
+
+    @staticmethod
+    def repaired_fit_ratios(name: str, fits: list) -> dict:
+        """Inlier ratio each repaired fit had before repair_circle_fit replaced it."""
+        return {f"{name}_{i}": fit.repaired_from for i, fit in enumerate(fits, start=1) if fit.repaired_from is not None}
+
+    def smol_calc(self, small_data: np.ndarray) -> dict:
+        # Rotate, filter, and move the point cloud to the origin reference
+        small = CALIBRATION["small"].apply(small_data)
+        small = small[small[:, 2] > np.min(small[:, 2]) + 37]
+        small = small[small[:, 0] < np.min(small[:, 0]) + 50]
+        small = self.to_origin(small)
+        if config["save_point_clouds"]:
+            save_points(small, "small.ply")
+        # raw_small = small.copy()
+        # self.l_40 = get_40(raw_small)
+        circle_fitter = CircleFitter(PointCloudView(small), fit_mode=FIT_MODE, min_inlier_ratio=MIN_INLIER_RATIO)
+        fit_artifacts = figure_artifacts()
+        # If needed, try/except can be used for parameters that may cause errors.
+        _, z_center_small, radius_small = circle_fitter.fit_circles_and_plot(
+            find_second_circle=False, val_x=0.20, val_z=0.2, delta_z=23,clc_metrics=False,name="SMALL",
+            edge_engine=EDGE_ENGINE, artifacts=fit_artifacts
+        )
+        self.publish_figures(fit_artifacts, "small_circles.png")
+        
+        s_datum = circle_fitter.get_datum()
+        distance_artifacts = figure_artifacts(saved=False)
+        dist_3mm_s, _ = circle_fitter.get_distance(second_crc=False, z_distance_to_datum=23.1,
+                                                   artifacts=distance_artifacts)
+        self.publish_figures(distance_artifacts)
+            
+        logger.debug("smol_calc completed successfully.")
+        return {"dist_3mm_s": dist_3mm_s, "feature_3": z_center_small - s_datum, "radius_small": radius_small,
+                "z_center_small": z_center_small, "fit_inliers": self.fit_inlier_ratios("small", circle_fitter.circle_fits),
+                "repaired_fits": self.repaired_fit_ratios("small", circle_fitter.circle_fits)}
+
+    def hor_calc(self, horizontal_data: np.ndarray, horizontal2_data: np.ndarray) -> dict:
+        # First, we make corrections on horizontal2_data
+        horizontal2_data = CALIBRATION["horizontal2"].apply(horizontal2_data)
+
+        if config["save_point_clouds"]:
+            save_points(horizontal2_data, "horizontal2.ply")
+            save_points(horizontal_data, "horizontal_pre.ply")
+
+        # Datum calculation
+        diff = np.abs(np.max(horizontal_data[:, 0]) - np.min(horizontal2_data[:, 0]))
+        datum_horizontal = np.max(horizontal_data[:, 0]) - diff
+
+        # Create line points and merge with point cloud, then rotate and move to the origin in place
+        count = len(horizontal_data)
+        horizontal = np.empty((count + 100, 3), dtype=np.float32)
+        horizontal[:count] = horizontal_data
+        horizontal[count:, 0] = datum_horizontal
+        horizontal[count:, 1] = np.linspace(np.min(horizontal_data[:, 1]), np.max(horizontal_data[:, 1]), num=100)
+        horizontal[count:, 2] = np.min(horizontal_data[:, 2])
+        horizontal = CALIBRATION["horizontal"].apply(horizontal, inplace=True)
+
+        if config["save_point_clouds"]:
+            save_points(horizontal, "horizontal_post.ply")
+
+        # One view per cloud: the fits, get_B and the projection reuse its statistics and indexes
+        horizontal = PointCloudView(horizontal)
+        circle_fitter = CircleFitter(horizontal, fit_mode=FIT_MODE, min_inlier_ratio=MIN_INLIER_RATIO)
+        fit_artifacts = figure_artifacts()
+        _, circle2 = circle_fitter.fit_circles_and_plot(clc_metrics=False,name="HORIZONTAL", edge_engine=EDGE_ENGINE,
+                                                        artifacts=fit_artifacts)
+        self.publish_figures(fit_artifacts, "horizontal_circles.png")
+        
+        distance_artifacts = figure_artifacts(saved=False)
+        dist_3mm_h = circle_fitter.get_distance(artifacts=distance_artifacts)[0]
+        self.publish_figures(distance_artifacts)
+            
+        logger.debug("hor_calc completed successfully.")
+        return {"horizontal": horizontal, "circle_fitter": circle_fitter, "dist_3mm_h": dist_3mm_h,
+                "height": horizontal.max(1) - circle_fitter.get_datum(), "feature_1": circle2[1], "feature_2": circle2[2],
+                "max_z": horizontal.max(2), "fit_inliers": self.fit_inlier_ratios("horizontal", circle_fitter.circle_fits),
+                "repaired_fits": self.repaired_fit_ratios("horizontal", circle_fitter.circle_fits)}
+
+    def horizontal_summary(self, horizontal_data: np.ndarray, horizontal2_data: np.ndarray) -> dict:
+        """
+        hor_calc together with get_B and the projection, without the cloud and the fitter,
+        for measurement workers that return only scalars.
+        """
+        horizontal = self.hor_calc(horizontal_data, horizontal2_data)
+        horizontal["B"] = horizontal["circle_fitter"].get_B()
+        horizontal["projection"] = self.horizontal_projection(horizontal)
+        del horizontal["horizontal"], horizontal["circle_fitter"]
+        return horizontal
+
+    def horizontal_projection(self, horizontal: dict) -> tuple:
+        artifacts = figure_artifacts()
+        result = filter_and_visualize_projection_with_ply(horizontal["horizontal"], artifacts=artifacts)
+        self.publish_figures(artifacts, "vertical_projection.png")
+        return result
+
+
+class JaguarScanner(ViewMeasurements):
     """
     JaguarScanner class; a professional application that manages self.robot control, scanning, and measurement operations.
     
@@ -117,18 +302,19 @@ class JaguarScanner:
       - Manages the robot's pick and put-back operations.
       - Increases performance with threaded computation.
     """
-    def __init__(self, vel_mul: float=1, use_agg: bool = config["use_agg"], put_back: bool = False):
+    def __init__(self, mech_eye, put_back: bool = False, figure_worker: FigureWorker = None,
+                 measurement_pool: MeasurementPool = None):
         """
         Initializes a JaguarScanner instance.
         
         Args:
-            vel_mul (float): Velocity multiplier.
-            use_agg (bool, optional): Use Agg mode. Default is True.
+            mech_eye: Trigger the views are acquired with (see create_trigger); its robot is the scanner's.
             put_back (bool, optional): Whether the part will be put back. If False, it is directed to the trash point.
+            figure_worker (FigureWorker, optional): Worker the saved figures are rendered in (see main).
+            measurement_pool (MeasurementPool, optional): Worker processes of the small and horizontal fits (see main).
         """
-        self.mech_eye = TriggerWithExternalDeviceAndFixedRate(vel_mul)
+        self.mech_eye = mech_eye
         self.robot = self.mech_eye.robot
-        self.pcd = o3d.geometry.PointCloud()
         self.results = []
         self.old_point = None
         self.excel_threads = []
@@ -141,7 +327,14 @@ class JaguarScanner:
         self.di0_thread = threading.Thread(target=self.read_di0_updates, daemon=True)
         self.di0_thread.start()
         self.rescan = 0
+        # Set from the pick until after_scan has placed the part, so rescans and failed cycles never pick again
+        self.part_held = False
+        self.fit_inliers = {}
+        self.repaired_fits = {}
         self.db_writer = AppwriteDataWriter()
+        # Saved figures are rendered in a separate process so measurements never wait on them
+        ViewMeasurements.__init__(self, figure_worker)
+        self.measurement_pool = measurement_pool
         
     def read_di0_updates(self):
         sio = self.sio
@@ -229,17 +422,16 @@ class JaguarScanner:
             raise ValueError("Desteklenmeyen eksen. 'x', 'y' veya 'z' girin.")
         return points @ rotation_matrix.T
 
-    @staticmethod
-    def to_origin(points: np.ndarray) -> np.ndarray:
-        min_x, min_y = np.min(points[:, 0]), np.min(points[:, 1])
-        points[:, 0] -= min_x
-        points[:, 1] -= min_y
-        return points
-
     @staticmethod
     def remove_gripper_points(points: np.ndarray) -> np.ndarray:
-        min_x = np.min(points[:, 0])
-        y_candidates = points[:, 1][points[:, 0] < min_x + 23]
+        if isinstance(points, DepthScan):
+            min_x = points.bounds()[0]
+            _, _, y_min, y_max = points.roi(x=(None, min_x + 23)).bounds()
+            return points.without(y=(y_min - 5, y_max + 5), closed=True)
+        view = PointCloudView.of(points)
+        points = view.points
+        min_x = view.min(0)
+        y_candidates = view.query(x=(None, min_x + 23))[:, 1]
         y_min, y_max = np.min(y_candidates), np.max(y_candidates)
         return points[(points[:, 1] < y_min-5) | (points[:, 1] > y_max+5)]
 
@@ -264,6 +456,14 @@ class JaguarScanner:
     def write_to_db(self, result: dict, iteration: int, group_number: int):
         self.db_writer.write_to_db(result, iteration, group_number)
 
+    def record_fit_inliers(self, name: str, fits: list):
+        """Keeps the inlier ratio of each robust fit of the current attempt, and which of them were repaired."""
+        self.fit_inliers.update(self.fit_inlier_ratios(name, fits))
+        self.repaired_fits.update(self.repaired_fit_ratios(name, fits))
+
+    def rejected_fits(self) -> dict:
+        return {name: ratio for name, ratio in self.fit_inliers.items() if ratio < MIN_INLIER_RATIO}
+
     def check_part_quality(self, results: dict) -> int:
         for feature, target_tolerance in config["tolerances"].items():
             target, tolerance = target_tolerance
@@ -385,163 +585,122 @@ class JaguarScanner:
         # Final movement: go to soft point
         self.robot.MoveCart(soft_point, 0, 0, vel=config["vel_mul"] * transit_vel)
     
-    @handle_errors
-    def smol_calc(self, small_data: np.ndarray):
-        # Rotate, filter, and move the point cloud to the origin reference
-        small = self.rotate_point_cloud(small_data, -90, "z")
-        small = small[small[:, 2] > np.min(small[:, 2]) + 37]
-        small = small[small[:, 0] < np.min(small[:, 0]) + 50]
-        small = self.to_origin(small)
-        if config["save_point_clouds"]:
-            self.pcd.points = o3d.utility.Vector3dVector(small)
-            out_path = os.path.join(os.path.dirname(__file__), "Scan_Outputs", "small.ply")
-            o3d.io.write_point_cloud(out_path, self.pcd)
-            logger.info(f"Small point cloud saved to {out_path}")
-        # raw_small = small.copy()
-        # self.l_40 = get_40(raw_small)
-        circle_fitter = CircleFitter(small)
-        # If needed, try/except can be used for parameters that may cause errors.
-        _, z_center_small, radius_small = circle_fitter.fit_circles_and_plot(
-            find_second_circle=False, val_x=0.20, val_z=0.2, delta_z=23,clc_metrics=False,name="SMALL"
-        )
-        # Save the plot before getting other measurements
-        save_figure(plt, "small_circles.png")
-        
-        s_datum = circle_fitter.get_datum()
-        self.dist_3mm_s, _ = circle_fitter.get_distance(second_crc=False, z_distance_to_datum=23.1)
-        self.feature_3 = z_center_small - s_datum
-        self.radius_small = radius_small
-        self.z_center_small = z_center_small
-        
-        if config["use_agg"]:
-            plt.close()
-        elif not config["use_agg"]:
-            plt.show()
-            
-        logger.debug("smol_calc completed successfully.")
-
-    @handle_errors
-    def hor_calc(self, horizontal_data: np.ndarray, horizontal2_data: np.ndarray):
-        # First, we make corrections on horizontal2_data
-        horizontal2_data[:, 2] -= 70
-        horizontal2_data[:, 0] -= 50.21
-
-        if config["save_point_clouds"]:
-            out_path2 = os.path.join(os.path.dirname(__file__), "Scan_Outputs", "horizontal2.ply")
-            self.pcd.points = o3d.utility.Vector3dVector(horizontal2_data)
-            o3d.io.write_point_cloud(out_path2, self.pcd)
-            logger.info(f"Horizontal2 point cloud saved to {out_path2}")
-
-            out_path_pre = os.path.join(os.path.dirname(__file__), "Scan_Outputs", "horizontal_pre.ply")
-            self.pcd.points = o3d.utility.Vector3dVector(horizontal_data)
-            o3d.io.write_point_cloud(out_path_pre, self.pcd)
-            logger.info(f"Horizontal pre point cloud saved to {out_path_pre}")
-
-        # Datum calculation
-        diff = np.abs(np.max(horizontal_data[:, 0]) - np.min(horizontal2_data[:, 0]))
-        datum_horizontal = np.max(horizontal_data[:, 0]) - diff
-
-        # Create line points and merge with point cloud
-        y_values = np.linspace(np.min(horizontal_data[:, 1]), np.max(horizontal_data[:, 1]), num=100)
-        line_points = np.array([[datum_horizontal, y, np.min(horizontal_data[:, 2])] for y in y_values])
-        augmented_pc = np.vstack((horizontal_data, line_points))
-        horizontal = self.rotate_point_cloud(augmented_pc, 90, "z")
-        horizontal = self.to_origin(horizontal)
-        self.horizontal = horizontal
-
-        if config["save_point_clouds"]:
-            out_path_post = os.path.join(os.path.dirname(__file__), "Scan_Outputs", "horizontal_post.ply")
-            self.pcd.points = o3d.utility.Vector3dVector(horizontal)
-            o3d.io.write_point_cloud(out_path_post, self.pcd)
-            logger.info(f"Horizontal post point cloud saved to {out_path_post}")
-
-        self.circle_fitter = CircleFitter(horizontal)
-        _, circle2 = self.circle_fitter.fit_circles_and_plot(clc_metrics=False,name="HORIZONTAL")
-        # Save the plot before getting other measurements
-        save_figure(plt, "horizontal_circles.png")
-        
-        self.dist_3mm_h = self.circle_fitter.get_distance()[0]
-        self.height = np.max(self.horizontal[:, 1]) - self.circle_fitter.get_datum()
-        self.feature_1 = circle2[1]
-        self.feature_2 = circle2[2]
-        
-        if config["use_agg"]:
-            plt.close()
-        elif not config["use_agg"]:
-            plt.show()
-            
-        logger.debug("hor_calc completed successfully.")
-
-    @handle_errors
-    def process_vertical_measurement(self, vertical_data: np.ndarray):
-        # Process vertical data
-        vertical = self.remove_gripper_points(vertical_data)
-        vertical = self.rotate_point_cloud(vertical, 180, "z")
+    def prepare_vertical(self, vertical_data: np.ndarray, vertical_scan: DepthScan = None) -> dict:
+        """
+        Gripper-free, calibrated vertical cloud ("points") and the same cloud moved to the
+        origin ("origin"); with the organized depth map "origin" is a DepthScan, so the ROI
+        queries of get_40 and horn_diff are grid slices.
+        """
+        if vertical_scan is not None:
+            vertical_scan = CALIBRATION["vertical"].apply_scan(self.remove_gripper_points(vertical_scan))
+            vertical = vertical_scan.points()
+        else:
+            vertical = CALIBRATION["vertical"].apply(self.remove_gripper_points(vertical_data), inplace=True)
 
         if config["save_point_clouds"]:
-            out_path_vertical = os.path.join(os.path.dirname(__file__), "Scan_Outputs", "vertical.ply")
-            pcd = o3d.geometry.PointCloud()
-            pcd.points = o3d.utility.Vector3dVector(vertical)
-            o3d.io.write_point_cloud(out_path_vertical, pcd)
-            logger.info(f"Vertical point cloud saved to {out_path_vertical}")
-        
-        vertical_copy = self.to_origin(vertical.copy())
-        self.l_40 = get_40(vertical_copy)
-        l_17_2, ok_17_2 = horn_diff(vertical_copy)
-        save_figure(plt, "vertical_horn_17_2.png")
-        if not config["use_agg"]:
-            plt.show()
-        plt.close()
+            save_points(vertical, "vertical.ply")
         
-        l_23_4, ok_23_4 = horn_diff(vertical_copy, 240, 280)
-        save_figure(plt, "vertical_horn_23_4.png")
-        if not config["use_agg"]:
-            plt.show()
-        plt.close()
-        
-        # Result calculations
-        B = self.circle_fitter.get_B()
-        b_trans_val = np.max(vertical[:, 1]) - np.max(self.horizontal[:, 2])
-        b_vertical = B + b_trans_val
-        _, _, r1, l_79_73 = slope(vertical, b_vertical)
-        save_figure(plt, "vertical_slope_1.png")
-        if not config["use_agg"]:
-            plt.show()
-        plt.close()
-        
-        _, _, r2, _ = slope(vertical, y_divisor=0.11, crc_l=28)
-        save_figure(plt, "vertical_slope_2.png")
-        if not config["use_agg"]:
-            plt.show()
-        plt.close()
-        
-        l_42 = np.max(vertical[:, 1]) - b_vertical
-        l_248 = arm_horn_lengths(vertical, b_vertical)
-        mean_3mm = np.mean([self.dist_3mm_h, self.dist_3mm_s])
-        
-        l_81_5,l_7_1 = filter_and_visualize_projection_with_ply(self.horizontal)
-        l_88_6 = l_81_5 + l_7_1
-        save_figure(plt, "vertical_projection.png")
-        if not config["use_agg"]:
-            plt.show()
-        plt.close()
-
-        vertical_results = {
+        if vertical_scan is not None:
+            vertical_copy = vertical_scan.to_origin()
+        else:
+            vertical_copy = PointCloudView(self.to_origin(vertical.copy()))
+        return {"points": PointCloudView(vertical), "origin": vertical_copy}
+
+    def vertical_horn(self, vertical: dict, y_offset_low: float, y_offset_high: float, filename: str):
+        artifacts = figure_artifacts()
+        result = horn_diff(vertical["origin"], y_offset_low, y_offset_high, edge_engine=EDGE_ENGINE, artifacts=artifacts)
+        self.publish_figures(artifacts, filename)
+        return result
+
+    def vertical_slope(self, vertical: dict, b_vertical: float, filename: str, **kwargs):
+        artifacts = figure_artifacts()
+        result = slope(vertical["points"], b_vertical, edge_engine=EDGE_ENGINE, fit_mode=FIT_MODE,
+                       min_inlier_ratio=MIN_INLIER_RATIO, return_fit=True,
+                       artifacts=artifacts, **kwargs)
+        self.publish_figures(artifacts, filename)
+        return result
+
+    def vertical_arm_horn(self, vertical: dict, b_vertical: float) -> float:
+        artifacts = figure_artifacts(saved=False)
+        l_248 = arm_horn_lengths(vertical["points"], b_vertical, artifacts=artifacts)
+        self.publish_figures(artifacts)
+        return l_248
+
+    def measurement_graph(self) -> MeasurementGraph:
+        """
+        Measurement steps of one scan with their explicit inputs. run_scan_cycle provides the
+        raw inputs small_data, horizontal_data, horizontal2_data, vertical_data and
+        vertical_scan as the acquisitions finish; every step starts as soon as its inputs
+        exist, e.g. get_40 and horn_diff of the vertical view while the horizontal circles
+        are still being fitted. The "results" step yields the combined results.
+
+        With a measurement pool the small and horizontal steps run in its worker processes
+        and the horizontal step brings B and the projection along (horizontal_summary).
+        """
+        graph = MeasurementGraph(workers=MEASUREMENT_WORKERS if config["use_agg"] else 0, on_error=move_to_safe_position)
+        pool = self.measurement_pool
+        if pool is not None:
+            graph.add("small", lambda small_data: pool.call("smol_calc", small_data), ["small_data"])
+            graph.add("horizontal", lambda horizontal_data, horizontal2_data: pool.call(
+                "horizontal_summary", horizontal_data, horizontal2_data), ["horizontal_data", "horizontal2_data"])
+            graph.add("B", lambda horizontal: horizontal["B"], ["horizontal"])
+            graph.add("projection", lambda horizontal: horizontal["projection"], ["horizontal"])
+        else:
+            graph.add("small", self.smol_calc, ["small_data"])
+            graph.add("horizontal", self.hor_calc, ["horizontal_data", "horizontal2_data"])
+            graph.add("B", lambda horizontal: horizontal["circle_fitter"].get_B(), ["horizontal"])
+            graph.add("projection", self.horizontal_projection, ["horizontal"])
+        graph.add("vertical", self.prepare_vertical, ["vertical_data", "vertical_scan"])
+        graph.add("l_40", lambda vertical: get_40(vertical["origin"]), ["vertical"])
+        graph.add("horn_17_2", lambda vertical: self.vertical_horn(vertical, 60, 100, "vertical_horn_17_2.png"),
+                  ["vertical"])
+        graph.add("horn_23_4", lambda vertical: self.vertical_horn(vertical, 240, 280, "vertical_horn_23_4.png"),
+                  ["vertical"])
+        graph.add("slope_2", lambda vertical: self.vertical_slope(vertical, None, "vertical_slope_2.png", y_divisor=0.11,
+                                                                  crc_l=28), ["vertical"])
+        graph.add("b_vertical", lambda vertical, horizontal, B: B + (vertical["points"].max(1) - horizontal["max_z"]),
+                  ["vertical", "horizontal", "B"])
+        graph.add("slope_1", lambda vertical, b_vertical: self.vertical_slope(vertical, b_vertical, "vertical_slope_1.png"),
+                  ["vertical", "b_vertical"])
+        graph.add("l_248", self.vertical_arm_horn, ["vertical", "b_vertical"])
+        graph.add("results", self.measurement_results,
+                  ["small", "horizontal", "vertical", "b_vertical", "l_40", "horn_17_2", "horn_23_4", "slope_1", "slope_2",
+                   "l_248", "projection"])
+        return graph
+
+    def measurement_results(self, small: dict, horizontal: dict, vertical: dict, b_vertical: float, l_40: float,
+                            horn_17_2: tuple, horn_23_4: tuple, slope_1: tuple, slope_2: tuple, l_248: float,
+                            projection: tuple) -> dict:
+        l_17_2, ok_17_2 = horn_17_2
+        l_23_4, _ = horn_23_4
+        _, _, r1, l_79_73, fit_1 = slope_1
+        _, _, r2, _, fit_2 = slope_2
+        for step in (small, horizontal):
+            self.fit_inliers.update(step["fit_inliers"])
+            self.repaired_fits.update(step["repaired_fits"])
+        self.record_fit_inliers("slope", [fit_1, fit_2])
+        l_81_5, l_7_1 = projection
+
+        measurements = {
             "l_17_2": l_17_2,
             "l_23_4": l_23_4,
-            "l_42": l_42,
+            "l_40": l_40,
+            "l_42": vertical["points"].max(1) - b_vertical,
             "l_79_73": l_79_73,
             "l_248": l_248,
-            "r1": (r1 - self.feature_2/2),
-            "r2": (r2 + self.feature_2/2),
-            "feature_1": self.feature_1,
-            "mean_3mm": mean_3mm,
-            "l_88_6": l_88_6,
+            "r1": (r1 - horizontal["feature_2"]/2),
+            "r2": (r2 + horizontal["feature_2"]/2),
+            "feature_1": horizontal["feature_1"],
+            "feature_2": horizontal["feature_2"],
+            "feature_3": small["feature_3"],
+            "radius_small": small["radius_small"],
+            "mean_3mm": np.mean([horizontal["dist_3mm_h"], small["dist_3mm_s"]]),
+            "l_88_6": l_81_5 + l_7_1,
             "l_81_5": l_81_5,
             "ok_17_2": ok_17_2
         }
 
-        current_results = self.combine_results(vertical_results)
+        current_results = self.combine_results(measurements)
         logger.debug("Vertical measurements processed successfully.")
         return current_results
 
@@ -695,7 +854,7 @@ class JaguarScanner:
             else:
                 logger.info("Part drop setting disabled.")
 
-    def combine_results(self, vertical_results: dict) -> dict:
+    def combine_results(self, measurements: dict) -> dict:
         # Helper function to safely get values
         def safe_get(dict_obj, key, default=None):
             value = dict_obj.get(key, default)
@@ -706,27 +865,30 @@ class JaguarScanner:
             return value
         
         results = {
-            "Feature1 (102.1)": safe_get(vertical_results, "feature_1", self.feature_1),
-            "Feature2 (25mm/2)": self.feature_2,
-            "Feature3 (23.1)": self.feature_3,
-            "Feature4 (25mm/2)": self.radius_small,
-            "Feature5 (L40)": self.l_40,
-            "Feature6 (L248)": safe_get(vertical_results, "l_248"),
-            "Feature7 (L42)": safe_get(vertical_results, "l_42"),
-            "Feature8 (L79.73)": safe_get(vertical_results, "l_79_73"),
-            "Feature9 (R1-50)": safe_get(vertical_results, "r1"),
-            "Feature10 (R2-35)": safe_get(vertical_results, "r2"),
-            "Feature11 (3mm)": safe_get(vertical_results, "mean_3mm"),
-            "Feature12 (88.6)": safe_get(vertical_results, "l_88_6"),
-            "Feature13 (10.6)": self.feature_3 - self.radius_small/2,
-            "Feature14 (81.5)": safe_get(vertical_results, "l_81_5"),
-            "Feature15 (L23.4)": safe_get(vertical_results, "l_23_4"),
-            "Feature16 (L17.2)": safe_get(vertical_results, "l_17_2"),
-            "Feature17 (2C)": safe_get(vertical_results, "ok_17_2")
+            "Feature1 (102.1)": safe_get(measurements, "feature_1"),
+            "Feature2 (25mm/2)": safe_get(measurements, "feature_2"),
+            "Feature3 (23.1)": safe_get(measurements, "feature_3"),
+            "Feature4 (25mm/2)": safe_get(measurements, "radius_small"),
+            "Feature5 (L40)": safe_get(measurements, "l_40"),
+            "Feature6 (L248)": safe_get(measurements, "l_248"),
+            "Feature7 (L42)": safe_get(measurements, "l_42"),
+            "Feature8 (L79.73)": safe_get(measurements, "l_79_73"),
+            "Feature9 (R1-50)": safe_get(measurements, "r1"),
+            "Feature10 (R2-35)": safe_get(measurements, "r2"),
+            "Feature11 (3mm)": safe_get(measurements, "mean_3mm"),
+            "Feature12 (88.6)": safe_get(measurements, "l_88_6"),
+            "Feature13 (10.6)": measurements["feature_3"] - measurements["radius_small"]/2,
+            "Feature14 (81.5)": safe_get(measurements, "l_81_5"),
+            "Feature15 (L23.4)": safe_get(measurements, "l_23_4"),
+            "Feature16 (L17.2)": safe_get(measurements, "l_17_2"),
+            "Feature17 (2C)": safe_get(measurements, "ok_17_2")
         }
         
         # Ensure all values are serializable
         for key, value in results.items():
+            # Measurements on the float32 clouds are np.float32, which json cannot encode
+            if isinstance(value, np.floating):
+                value = results[key] = float(value)
             try:
                 # For testing, json.dumps
                 json.dumps(value)
@@ -756,25 +918,29 @@ class JaguarScanner:
                 self.robot.MoveCart(p90, 0, 0, vel=config["vel_mul"] * 60)
         
         self.cycle = 0
+        # Her cycle için deneme verilerini saklamak için liste; bir parçanın tüm taramaları boyunca tutulur
+        attempt_results = []
         while self.cycle < config["range_"]:
             start_time = time.time()
             current_results = {}
             selected_results = {}  # Initialize selected_results
             
-            # Her cycle için deneme verilerini saklamak için liste
-            attempt_results = []
+            if self.figure_worker is not None:
+                for report in self.figure_worker.new_cycle():
+                    logger.info(f"Figure worker cycle: {report}")
             
             current_index = read_current_point_index()
             if current_index in config["ignored_points"]:
                 current_index = self.get_next_valid_index(current_index, len(self.points))
                 write_current_point_index(current_index)
-            if self.cycle != 0 and self.rescan == 0:
+            # The held part is scanned again, so neither a new index nor a new pick
+            if self.cycle != 0 and self.rescan == 0 and not self.part_held:
                 self.old_point = self.points[current_index]
                 current_index = self.get_next_valid_index(current_index, len(self.points))
                 write_current_point_index(current_index)
             
             try:
-                if config["pick"] and self.rescan == 0:
+                if config["pick"] and not self.part_held:
                     if current_index < len(left_of_robot_points + left_small):
                         soft_point = p90
                     else:
@@ -789,39 +955,54 @@ class JaguarScanner:
                     self.pick_soft_point = soft_point
                     self.pick_left_transit_point = left_transit_point
                     self.pick_object(point, soft_point)
+                    self.part_held = True
                 
                 self.robot.MoveCart(ROBOT_POSITIONS['scrc'], 0, 0, vel=config["vel_mul"] * 100)
+                self.mech_eye.set_tray_index(read_current_point_index())
+                self.fit_inliers = {}
+                self.repaired_fits = {}
                 
-                small_data = self.mech_eye.main(lua_name="small.lua", scan_line_count=1500)
-                if config["use_agg"]:
-                    thread_small = threading.Thread(target=self.smol_calc, args=(small_data,))
-                    thread_small.start()
+                # Each measurement step starts as soon as the views it needs are acquired
+                graph = self.measurement_graph()
+                try:
+                    graph.provide("small_data", self.mech_eye.main(lua_name="small.lua", scan_line_count=1500))
+                    graph.provide("horizontal_data", self.mech_eye.main(lua_name="horizontal.lua", scan_line_count=1500))
+                    graph.provide("horizontal2_data", self.mech_eye.main(lua_name="horizontal2.lua", scan_line_count=1500))
+
+                    vertical_data = self.mech_eye.main(lua_name="vertical.lua", scan_line_count=4000)
+                    graph.provide("vertical_scan", self.mech_eye.depth_scan() if isinstance(vertical_data, np.ndarray) else None)
+                    graph.provide("vertical_data", vertical_data)
+                finally:
+                    # Also when an acquisition fails: running steps write fit_inliers and read converter
+                    # buffers, so none may outlive this attempt
+                    values = graph.wait()
+                    graph.close()
+                    self.mech_eye.release_points()
+                    logger.info(f"Measurement graph: {graph.report()}")
+
+                failed_steps = graph.failed
+                if failed_steps:
+                    # on_error has moved the robot to a safe position; the dependent steps, results among them, were skipped
+                    logger.error(f"Measurement steps failed: {sorted(failed_steps)}")
+                    current_results = {"Error": f"Measurement steps failed: {', '.join(sorted(failed_steps))}"}
+                    # Rescanned like an invalid measurement, up to max_rescan
+                    quality_check_result = None
                 else:
-                    self.smol_calc(small_data)
-                    plt.show()
-
-                horizontal_data = self.mech_eye.main(lua_name="horizontal.lua", scan_line_count=1500)
-                horizontal2_data = self.mech_eye.main(lua_name="horizontal2.lua", scan_line_count=1500)
-                if config["use_agg"]:
-                    thread_horizontal = threading.Thread(target=self.hor_calc, args=(horizontal_data, horizontal2_data))
-                    thread_horizontal.start()
-                else:
-                    self.hor_calc(horizontal_data, horizontal2_data)
-                    plt.show()
-
-                vertical_data = self.mech_eye.main(lua_name="vertical.lua", scan_line_count=4000)
-                plt.show()
-
-                if config["use_agg"]:
-                    thread_small.join()
-                    thread_horizontal.join()
-
-                current_results = self.process_vertical_measurement(vertical_data)
-                
-                # Bu deneme sonucunu sakla
-                attempt_results.append(current_results.copy())
-                
-                quality_check_result = self.check_part_quality(current_results)
+                    current_results = values["results"]
+                    # Bu deneme sonucunu sakla
+                    attempt_results.append(current_results.copy())
+                    quality_check_result = self.check_part_quality(current_results)
+                if self.fit_inliers:
+                    logger.info(f"Fit inlier ratios: {self.fit_inliers}")
+                if self.repaired_fits:
+                    # Diagnostics only: the results go to the database and the exports
+                    logger.warning(f"{len(self.repaired_fits)} fits repaired from the scanned cloud instead of rescanning, "
+                                   f"inlier ratio before repair: {self.repaired_fits}")
+                rejected_fits = self.rejected_fits()
+                if rejected_fits:
+                    # Noisy fit that repair could not fix: handled like a noise-triggered deviation
+                    logger.error(f"Fits rejected, inlier ratio below {MIN_INLIER_RATIO} after repair: {rejected_fits}")
+                    quality_check_result = None
                 
                 # Geçerli ölçüm kontrolü (True veya False dışında değer dönerse geçersiz)
                 is_valid_measurement = quality_check_result in [True, False]
@@ -830,7 +1011,11 @@ class JaguarScanner:
                 if not is_valid_measurement:
                     if self.rescan < config["max_rescan"]:
                         self.rescan += 1
-                        logger.error("Invalid measurement detected (noise). Restarting scan.")
+                        if failed_steps:
+                            selected_results = current_results
+                            logger.error("Measurement steps failed. Restarting scan.")
+                        else:
+                            logger.error("Invalid measurement detected (noise). Restarting scan.")
                         continue
                     else:
                         logger.error("Max rescan attempts reached. Using last measurement...")
@@ -855,11 +1040,13 @@ class JaguarScanner:
                     final_quality_check = self.check_part_quality(selected_results) == True
                     logger.info("Using last valid measurement from attempts.")
                 else:
-                    selected_results = attempt_results[-1]  # Son ölçüm (geçersiz olsa da)
+                    # Son ölçüm (geçersiz olsa da); hiçbir deneme ölçülemediyse hata
+                    selected_results = attempt_results[-1] if attempt_results else current_results
                     final_quality_check = False
                     logger.warning("No valid measurements found. Using last measurement.")
 
                 self.after_scan(final_quality_check) # After scan operations
+                self.part_held = False
 
                 self.rescan = 0  # Reset rescan counter after successful scan
                 self.cycle += 1  # Increment cycle count
@@ -878,7 +1065,7 @@ class JaguarScanner:
                         self.current_group += 1
                         self.group_indices = {current_index}  # Yeni grup için sadece bu index
                 
-                if config["save_to_db"]:
+                if config["save_to_db"] and "Error" not in selected_results:
                     try:
                         logger.error("Writing results to database...")
                         self.write_to_db(selected_results, iteration=read_current_point_index(), group_number=self.current_group)
@@ -887,6 +1074,8 @@ class JaguarScanner:
                         logger.error(f"Database write error: {e}")
                 
                 selected_results["Processing Time (s)"] = time.time() - start_time
+                session_report = self.mech_eye.cycle_report()
+                logger.info(f"Profiler session saved {session_report['saved_ms']} ms this cycle: {session_report}")
                 
                 # Bellekteki deneme verilerini temizle
                 attempt_results.clear()
@@ -898,9 +1087,43 @@ class JaguarScanner:
                 if config["use_agg"] == True:
                     plt.close("all")
                 if "Error" in selected_results or "Index" in selected_results:
+                    selected_results["Timings"] = self.mech_eye.pop_timings()
                     with open('jsons/scan_output.json', 'a') as f:
                         f.write(json.dumps(selected_results) + '\n')
 
+        self.mech_eye.close()
+        if self.measurement_pool is not None:
+            self.measurement_pool.close()
+        if self.figure_worker is not None:
+            self.figure_worker.close()
+
+
+def main():
+    """
+    Starts the worker processes, then the scanner. The workers are forked before the
+    scanner starts its threads and the trigger connects to the robot and the profiler: a
+    fork copies only the calling thread, so a lock another thread holds at that moment
+    would stay locked in the child, and the child would inherit the open connections.
+    """
+    figure_worker = None
+    if config["use_agg"] and config["save_figures"]:
+        figure_worker = FigureWorker.from_config(config, FIGURES_DIR)
+    # Forked after the figure worker, so the measurement workers can queue figures too; their
+    # target is a ViewMeasurements, not the scanner
+    measurement_pool = None
+    if MEASUREMENT_MODE == "processes":
+        if config["use_agg"]:
+            measurement_pool = MeasurementPool(ViewMeasurements(figure_worker), MEASUREMENT_PROCESSES)
+        else:
+            logger.warning("measurement_mode 'processes' needs Agg mode, measuring in threads.")
+
+    scanner = JaguarScanner(mech_eye, figure_worker=figure_worker, measurement_pool=measurement_pool)
+    scanner.run_scan_cycle()
+
+
+# The one trigger of the process, shared by the scanner and move_to_safe_position; it connects
+# to the robot and the profiler on first use, not at import
+mech_eye = create_trigger(vel_mul=config["vel_mul"])
+
 if __name__ == "__main__":
-    scanner = JaguarScanner(vel_mul=config["vel_mul"])
-    scanner.run_scan_cycle()
\ No newline at end of file
+    main()
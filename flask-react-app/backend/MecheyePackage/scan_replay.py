@@ -0,0 +1,138 @@
+import os
+import glob
+import time
+import threading
+import logging
+import numpy as np
+
+from depth_conversion import DepthToPointsConverter
+from depth_scan import DepthScan
+from pointcloud_io import write_npz
+from scan_timing import PhaseTimer
+
+logger = logging.getLogger(__name__)
+
+
+class AcquisitionRecorder(object):
+    """
+    Stores raw acquisitions so scans can be replayed without the profiler.
+
+    Each acquisition becomes one compressed .npz with the organized depth map, the
+    encoder array and the user_set values needed to convert it, named after the tray
+    index and the lua_name of the view (e.g. tray07_vertical_1718291234567.npz).
+    Files are written on a background thread so recording does not slow the cycle.
+    """
+    def __init__(self, record_dir: str):
+        self.record_dir = record_dir
+        self.tray_index = None
+        os.makedirs(record_dir, exist_ok=True)
+
+    def record(self, lua_name: str, depth: np.ndarray, encoder: np.ndarray, x_unit: float, y_unit: float,
+               trigger_source: int, scan_line_count: int) -> str:
+        tray = -1 if self.tray_index is None else self.tray_index
+        view = os.path.splitext(lua_name)[0]
+        path = os.path.join(self.record_dir, f"tray{tray:02d}_{view}_{int(time.time() * 1000)}.npz")
+        arrays = dict(
+            depth=depth, encoder=encoder, lua_name=lua_name, tray_index=tray,
+            x_unit=x_unit, y_unit=y_unit, trigger_source=trigger_source, scan_line_count=scan_line_count,
+        )
+        threading.Thread(target=self._write, args=(path, arrays)).start()
+        return path
+
+    @staticmethod
+    def _write(path: str, arrays: dict):
+        try:
+            write_npz(path, **arrays)
+            logger.info(f"Acquisition recorded to {path}")
+        except Exception as e:
+            logger.error(f"Acquisition recording failed for {path}: {e}")
+
+
+class NullRobot(object):
+    """Robot stand-in for offline runs; every command is accepted and ignored."""
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            logger.debug(f"NullRobot.{name}{args}")
+            return 0
+        return command
+
+
+class ReplayTrigger(object):
+    """
+    Drop-in replacement of TriggerWithExternalDeviceAndFixedRate serving recorded acquisitions.
+
+    main() returns the same N x 3 float32 points the profiler path returns, so the
+    JaguarScanner measurement pipeline runs offline at full speed. Recordings are served
+    tray by tray: set_tray_index() selects a tray explicitly, otherwise the next recorded
+    tray starts whenever a view of the current tray is requested a second time.
+    """
+    def __init__(self, record_dir: str, vel_mul=1, robot=None):
+        self.vel_mul = vel_mul
+        self.robot = robot if robot is not None else NullRobot()
+        self.recordings = {}
+        for path in sorted(glob.glob(os.path.join(record_dir, "tray*_*.npz"))):
+            tray, view = os.path.basename(path).split("_")[:2]
+            self.recordings.setdefault(int(tray[4:]), {})[view] = path
+        if not self.recordings:
+            raise FileNotFoundError(f"No recorded acquisitions found in {record_dir}")
+        self.trays = sorted(self.recordings)
+        self.tray_index = None
+        self._cursor = -1
+        self._served = set()
+        self.converters = {}
+        self.timers = []
+        self._last_scan = None
+
+    def set_tray_index(self, index: int):
+        if index in self.recordings:
+            self.tray_index = index
+            self._served = set()
+        else:
+            self.tray_index = None
+
+    def _next_tray(self) -> int:
+        self._cursor = (self._cursor + 1) % len(self.trays)
+        self._served = set()
+        return self.trays[self._cursor]
+
+    def main(self, lua_name, scan_line_count=4000):
+        timer = PhaseTimer(lua_name)
+        self.timers.append(timer)
+        view = os.path.splitext(lua_name)[0]
+        tray = self.tray_index
+        if tray is None or view in self._served:
+            tray = self.tray_index = self._next_tray()
+        self._served.add(view)
+
+        path = self.recordings[tray].get(view)
+        if path is None:
+            logger.error(f"No recording of {lua_name} for tray {tray}")
+            return -1
+
+        with timer.phase("load"), np.load(path) as recording:
+            depth = recording["depth"][:scan_line_count]
+            x_unit, y_unit = float(recording["x_unit"]), float(recording["y_unit"])
+        self._last_scan = DepthScan(depth, x_unit, y_unit)
+        converter = self.converters.setdefault(lua_name, DepthToPointsConverter())
+        with timer.phase("conversion"):
+            points = converter.convert(depth, x_unit, y_unit)
+        timer.stop()
+        return points
+
+    def depth_scan(self) -> DepthScan:
+        """Organized depth map of the last served acquisition."""
+        return self._last_scan
+
+    def pop_timings(self) -> list:
+        timers, self.timers = self.timers, []
+        return [timer.record() for timer in timers]
+
+    def release_points(self):
+        for converter in self.converters.values():
+            converter.release()
+
+    def cycle_report(self) -> dict:
+        return {"saved_ms": 0.0}
+
+    def close(self):
+        pass
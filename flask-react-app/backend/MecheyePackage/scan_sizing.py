@@ -0,0 +1,67 @@
+import math
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+ScanPlan = namedtuple("ScanPlan", ["trigger_rate", "line_count", "sweep_length", "speed"])
+
+
+def sweep_length(start: list, end: list) -> float:
+    """Straight-line TCP distance (mm) between two Cartesian poses [x, y, z, rx, ry, rz]."""
+    return math.dist(start[:3], end[:3])
+
+
+class MotionScanSizing(object):
+    """
+    Sizes a fixed-rate scan from the robot sweep that carries the part under the profiler.
+
+    The trigger rate is chosen so that consecutive profiles are YResolution apart at the
+    commanded linear speed, which is the spacing the depth-to-points conversion assumes.
+    The line count covers the sweep time plus the acceleration/deceleration ramp, with a
+    safety margin, instead of a fixed count that keeps capturing after the sweep ended.
+
+    Args:
+        max_linear_speed (float): TCP speed (mm/s) of a MoveL at vel=100; the speed calibration.
+        margin (float): Extra fraction of lines captured on top of the planned sweep.
+        ramp_time (float): Seconds added to the constant-speed sweep time for acceleration and deceleration.
+        max_trigger_rate (float): Highest trigger rate (Hz) the profiler sustains with the scan settings.
+    """
+    def __init__(self, max_linear_speed: float = 1000.0, margin: float = 0.1, ramp_time: float = 0.3,
+                 max_trigger_rate: float = 5000.0):
+        self.max_linear_speed = max_linear_speed
+        self.margin = margin
+        self.ramp_time = ramp_time
+        self.max_trigger_rate = max_trigger_rate
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """Builds the sizing from the "scan_sizing" section of config.json, or None for fixed sizing."""
+        sizing = config.get("scan_sizing")
+        if not sizing or sizing.get("mode", "fixed") != "motion":
+            return None
+        return cls(**{key: value for key, value in sizing.items() if key != "mode"})
+
+    def plan(self, length: float, vel: float, y_resolution: float) -> ScanPlan:
+        """
+        Args:
+            length (float): Sweep length in mm.
+            vel (float): Commanded MoveL velocity in percent.
+            y_resolution (float): Profiler YResolution in um.
+
+        Returns:
+            ScanPlan: Trigger rate (Hz) and line count of the scan.
+        """
+        speed = self.max_linear_speed * vel / 100
+        if speed <= 0 or y_resolution <= 0:
+            raise ValueError(f"Cannot size a scan for speed {speed} mm/s and YResolution {y_resolution} um")
+
+        trigger_rate = speed / (y_resolution * 1e-3)
+        if trigger_rate > self.max_trigger_rate:
+            logger.warning(f"Trigger rate {trigger_rate:.0f} Hz for {speed:.0f} mm/s exceeds {self.max_trigger_rate:.0f} Hz; "
+                           f"profiles will be {speed / self.max_trigger_rate * 1e3:.0f} um apart instead of {y_resolution:.0f} um.")
+            trigger_rate = self.max_trigger_rate
+
+        sweep_time = length / speed + self.ramp_time
+        line_count = math.ceil(trigger_rate * sweep_time * (1 + self.margin))
+        return ScanPlan(round(trigger_rate, 1), line_count, length, speed)
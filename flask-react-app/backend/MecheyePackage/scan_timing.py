@@ -0,0 +1,41 @@
+import time
+import threading
+from contextlib import contextmanager
+
+
+class PhaseTimer(object):
+    """
+    Collects the phase durations of one scan view as a structured record.
+
+    Phases may be added from several threads (e.g. the pre-move robot thread); repeated
+    phases accumulate. Durations are in milliseconds.
+    """
+    def __init__(self, view: str):
+        self.view = view
+        self.phases = {}
+        self._start = time.perf_counter()
+        self._end = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def add(self, name: str, ms: float):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + ms
+
+    def stop(self):
+        self._end = time.perf_counter()
+
+    def record(self) -> dict:
+        end = self._end if self._end is not None else time.perf_counter()
+        with self._lock:
+            record = {"view": self.view}
+            record.update({name: round(ms, 1) for name, ms in self.phases.items()})
+        record["wall"] = round((end - self._start) * 1000, 1)
+        return record
@@ -0,0 +1,254 @@
+"""
+Stand-ins for the Mech-Eye SDK and the FAIR robot API.
+
+mecheye_trigger imports both, so it cannot be imported without them. install() registers
+these modules in sys.modules instead and imports mecheye_trigger against them. Only the
+calls mecheye_trigger makes are modelled.
+"""
+import importlib
+import sys
+import threading
+import time
+import types
+
+import numpy as np
+
+
+class Status(object):
+    def __init__(self, ok=True):
+        self.ok = ok
+
+    def is_ok(self):
+        return self.ok
+
+    def description(self):
+        return "ok" if self.ok else "error"
+
+
+def _parameter(name, *values):
+    return type(name, (object,), {"name": name, **{f"Value_{value}": value for value in values}})
+
+
+PARAMETERS = [
+    _parameter("DataPointsPerProfile"),
+    _parameter("ExposureMode", "Timed", "HDR"),
+    _parameter("ExposureTime"),
+    _parameter("HdrExposureTimeProportion1"),
+    _parameter("HdrExposureTimeProportion2"),
+    _parameter("HdrFirstThreshold"),
+    _parameter("HdrSecondThreshold"),
+    _parameter("DataAcquisitionTriggerSource", "Software", "External"),
+    _parameter("LineScanTriggerSource", "FixedRate", "Encoder"),
+    _parameter("SoftwareTriggerRate"),
+    _parameter("ScanLineCount"),
+    _parameter("CallbackRetrievalTimeout"),
+    _parameter("LaserPower"),
+    _parameter("MinLaserLineWidth"),
+    _parameter("MaxLaserLineWidth"),
+    _parameter("AnalogGain", "Gain_2"),
+    _parameter("DigitalGain"),
+    _parameter("MinGrayscaleValue"),
+    _parameter("SpotSelection", "Strongest"),
+    _parameter("MinSpotIntensity"),
+    _parameter("MaxSpotIntensity"),
+    _parameter("Filter", "Mean"),
+    _parameter("MeanFilterWindowSize", "WindowSize_2"),
+    _parameter("EnableBlindSpotFiltering"),
+    _parameter("EnableXAxisAlignment"),
+    _parameter("XAxisResolution"),
+    _parameter("YResolution"),
+]
+
+
+class _Data(object):
+    def __init__(self, array):
+        self.array = array
+
+    def data(self):
+        return self.array
+
+
+class ProfileBatch(object):
+    BatchFlag_Incomplete = 1
+
+    def __init__(self, width, depth=None, flags=0):
+        self.depth = np.empty((0, width), dtype=np.float32) if depth is None else depth
+        self.flags = flags
+
+    def append(self, batch):
+        self.depth = np.vstack([self.depth, batch.depth])
+        self.flags |= batch.flags
+
+    def is_empty(self):
+        return len(self.depth) == 0
+
+    def check_flag(self, flag):
+        return bool(self.flags & flag)
+
+    def valid_height(self):
+        return len(self.depth)
+
+    def get_depth_map(self):
+        return _Data(self.depth)
+
+    def get_intensity_image(self):
+        return _Data(np.zeros(self.depth.shape, dtype=np.uint8))
+
+    def get_encoder_array(self):
+        return _Data(np.arange(len(self.depth), dtype=np.uint32))
+
+
+class AcquisitionCallbackBase(object):
+    def __init__(self):
+        pass
+
+    def __disown__(self):
+        return self
+
+
+class UserSet(object):
+    def __init__(self, width):
+        self.values = {"DataPointsPerProfile": width, "XAxisResolution": 20.0, "YResolution": 20.0}
+        self.sets = []
+        self.failing = set()
+
+    def _get(self, name):
+        return Status(), self.values.get(name)
+
+    def _set(self, name, value):
+        self.sets.append(name)
+        if name in self.failing:
+            return Status(False)
+        self.values[name] = value
+        return Status()
+
+    get_int_value = get_float_value = get_enum_value = get_bool_value = _get
+    set_int_value = set_float_value = set_enum_value = set_bool_value = _set
+
+
+class Profiler(object):
+    """
+    Delivers the depth maps queued in batches to the registered callback from a thread
+    once triggered, like the SDK does. The last batch carries incomplete_flags.
+    """
+    def __init__(self, width=64):
+        self.user_set = UserSet(width)
+        self.batches = []
+        self.incomplete_flags = 0
+        self.delivery_delay = 0.0
+        self.callback = None
+        self.connects = 0
+        self.disconnects = 0
+        self.acquisitions = 0
+        self.connectable = True
+        self._delivery = None
+
+    def current_user_set(self):
+        return self.user_set
+
+    def register_acquisition_callback(self, callback):
+        self.callback = callback
+        return Status()
+
+    def start_acquisition(self):
+        self.acquisitions += 1
+        return Status()
+
+    def trigger_software(self):
+        self._delivery = threading.Thread(target=self._deliver)
+        self._delivery.start()
+        return Status()
+
+    def _deliver(self):
+        width = self.user_set.values["DataPointsPerProfile"]
+        for i, depth in enumerate(self.batches):
+            time.sleep(self.delivery_delay)
+            flags = self.incomplete_flags if i == len(self.batches) - 1 else 0
+            self.callback.run(ProfileBatch(width, depth, flags))
+
+    def stop_acquisition(self):
+        if self._delivery is not None:
+            self._delivery.join()
+        return Status()
+
+    def disconnect(self):
+        self.disconnects += 1
+
+
+def find_and_connect(profiler):
+    profiler.connects += 1
+    return profiler.connectable
+
+
+def show_error(status):
+    pass
+
+
+class RobotRPC(object):
+    """Records the moves; a move type in failing raises. GetRobotMotionDone answers (motion_done_error, motion_done)."""
+    def __init__(self, ip=None):
+        self.ip = ip
+        self.moves = []
+        self.move_delay = 0.0
+        self.failing = set()
+        self.motion_done_error = 0
+        self.motion_done = 1
+        self.lock = threading.Lock()
+
+    def _move(self, move_type, coordinates, *args, **kwargs):
+        time.sleep(self.move_delay)
+        if move_type in self.failing:
+            raise RuntimeError(f"{move_type} rejected")
+        with self.lock:
+            self.moves.append((move_type, list(coordinates)))
+        return 0
+
+    def MoveCart(self, coordinates, *args, **kwargs):
+        return self._move("MoveCart", coordinates)
+
+    def MoveL(self, coordinates, *args, **kwargs):
+        return self._move("MoveL", coordinates)
+
+    def MoveJ(self, coordinates, *args, **kwargs):
+        return self._move("MoveJ", coordinates)
+
+    def GetRobotMotionDone(self):
+        return self.motion_done_error, self.motion_done
+
+
+def _modules():
+    shared = types.ModuleType("mecheye.shared")
+    shared.Status = Status
+    shared.show_error = show_error
+    for parameter in PARAMETERS:
+        setattr(shared, parameter.__name__, parameter)
+
+    profiler = types.ModuleType("mecheye.profiler")
+    profiler.Profiler = Profiler
+    profiler.ProfileBatch = ProfileBatch
+    profiler.AcquisitionCallbackBase = AcquisitionCallbackBase
+
+    profiler_utils = types.ModuleType("mecheye.profiler_utils")
+    profiler_utils.find_and_connect = find_and_connect
+
+    mecheye = types.ModuleType("mecheye")
+    mecheye.shared, mecheye.profiler, mecheye.profiler_utils = shared, profiler, profiler_utils
+
+    fair_api = types.ModuleType("fair_api")
+    fair_api.Robot = types.SimpleNamespace(RPC=RobotRPC)
+    return {
+        "mecheye": mecheye,
+        "mecheye.shared": shared,
+        "mecheye.profiler": profiler,
+        "mecheye.profiler_utils": profiler_utils,
+        "fair_api": fair_api,
+    }
+
+
+def install(monkeypatch):
+    """Imports a fresh mecheye_trigger against the stand-ins; monkeypatch restores sys.modules."""
+    for name, module in _modules().items():
+        monkeypatch.setitem(sys.modules, name, module)
+    monkeypatch.setitem(sys.modules, "mecheye_trigger", None)
+    del sys.modules["mecheye_trigger"]
+    return importlib.import_module("mecheye_trigger")
@@ -0,0 +1,112 @@
+import os
+
+import numpy as np
+import pytest
+
+from calibration import ViewCalibration, load_calibration
+from depth_scan import DepthScan
+
+CALIBRATION_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "calibration.json")
+
+
+def rotate_point_cloud(points, angle_degrees):
+    """JaguarScanner.rotate_point_cloud about Z, as the views were transformed before calibration.json."""
+    angle = np.radians(angle_degrees)
+    rotation = np.array([[np.cos(angle), -np.sin(angle), 0], [np.sin(angle), np.cos(angle), 0], [0, 0, 1]])
+    return points @ rotation.T
+
+
+def to_origin(points):
+    points[:, 0] -= np.min(points[:, 0])
+    points[:, 1] -= np.min(points[:, 1])
+    return points
+
+
+def horizontal2(points):
+    points = points.copy()
+    points[:, 2] -= 70
+    points[:, 0] -= 50.21
+    return points
+
+
+BASELINE = {
+    "small": lambda points: rotate_point_cloud(points, -90),
+    "horizontal": lambda points: to_origin(rotate_point_cloud(points, 90)),
+    "horizontal2": horizontal2,
+    "vertical": lambda points: rotate_point_cloud(points, 180),
+}
+
+
+def view_points(count=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(10, 80, count), rng.uniform(5, 300, count), rng.uniform(20, 90, count)]).astype(np.float32)
+
+
+@pytest.mark.parametrize("view", sorted(BASELINE))
+def test_calibration_file_matches_baseline_transforms(view):
+    calibration = load_calibration(CALIBRATION_FILE)[view]
+    points = view_points()
+    expected = BASELINE[view](points.astype(np.float64))
+    np.testing.assert_allclose(calibration.apply(points, chunk_rows=4096), expected, atol=1e-4)
+
+
+@pytest.mark.parametrize("angle", [0, 90, -90, 180, 30])
+@pytest.mark.parametrize("to_origin_flag", [False, True])
+def test_rotation_z_matches_rotate_point_cloud(angle, to_origin_flag):
+    points = view_points()
+    expected = rotate_point_cloud(points.astype(np.float64), angle) + [1.5, -2.0, 3.0]
+    if to_origin_flag:
+        expected = to_origin(expected)
+    calibration = ViewCalibration.rotation_z(angle, offset=(1.5, -2.0, 3.0), to_origin=to_origin_flag)
+    np.testing.assert_allclose(calibration.apply(points), expected, atol=1e-4)
+
+
+def test_apply_leaves_the_input_untouched():
+    calibration = ViewCalibration.rotation_z(90, to_origin=True)
+    points = view_points()
+    expected = points.copy()
+    result = calibration.apply(points)
+    assert not np.shares_memory(result, points)
+    np.testing.assert_array_equal(points, expected)
+    assert calibration.apply(expected.astype(np.float64)).dtype == np.float32
+    np.testing.assert_array_equal(ViewCalibration().apply(points), points)
+
+
+def test_apply_in_place_transforms_the_callers_array():
+    calibration = ViewCalibration.rotation_z(90, to_origin=True)
+    points = view_points()
+    expected = calibration.apply(points)
+    assert calibration.apply(points, inplace=True) is points
+    np.testing.assert_array_equal(points, expected)
+
+
+@pytest.mark.parametrize("points", [view_points().astype(np.float64), view_points()[::2], view_points().T.copy().T])
+def test_apply_in_place_rejects_other_arrays(points):
+    with pytest.raises(ValueError):
+        ViewCalibration.rotation_z(90).apply(points, inplace=True)
+
+
+def test_apply_in_place_rejects_read_only_arrays():
+    points = view_points()
+    points.flags.writeable = False
+    with pytest.raises(ValueError):
+        ViewCalibration.rotation_z(90).apply(points, inplace=True)
+
+
+@pytest.mark.parametrize("view", sorted(BASELINE))
+def test_apply_scan_matches_apply(view):
+    calibration = load_calibration(CALIBRATION_FILE)[view]
+    depth = np.random.default_rng(1).uniform(20, 90, (120, 80))
+    depth[np.random.default_rng(2).random(depth.shape) < 0.2] = np.nan
+    scan = DepthScan(depth, 40.0, 75.0)
+    np.testing.assert_allclose(calibration.apply_scan(scan).points(), calibration.apply(scan.points()), atol=1e-4)
+
+
+def test_apply_scan_rejects_other_rotations():
+    with pytest.raises(ValueError):
+        ViewCalibration.rotation_z(30).apply_scan(DepthScan(np.zeros((4, 4)), 40.0, 75.0))
+
+
+def test_rejects_matrix_of_wrong_shape():
+    with pytest.raises(ValueError):
+        ViewCalibration(np.eye(3))
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+# Scripts/__init__ imports the measurement modules, which need open3d
+pytest.importorskip("open3d")
+from Scripts import circle_fit
+
+
+def arc(xc, yc, r, count=1500, start=0.0, stop=np.pi / 2, noise=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    t = rng.uniform(start, stop, count)
+    return xc + r * np.cos(t) + rng.normal(0, noise, count), yc + r * np.sin(t) + rng.normal(0, noise, count)
+
+
+@pytest.mark.parametrize("method", circle_fit.ALGEBRAIC_METHODS)
+def test_fit_circle_recovers_exact_circle(method):
+    x, y = arc(12.0, -4.0, 25.0)
+    fit = circle_fit.fit_circle(x, y, method=method)
+    assert fit.xc == pytest.approx(12.0, abs=1e-6)
+    assert fit.yc == pytest.approx(-4.0, abs=1e-6)
+    assert fit.r == pytest.approx(25.0, abs=1e-6)
+    assert fit.rms < 1e-6
+
+
+def test_fit_circle_on_noisy_short_arc():
+    x, y = arc(60.0, 60.0, 20.0, start=0.2, stop=1.0, noise=0.02)
+    fit = circle_fit.fit_circle(x, y)
+    assert fit.r == pytest.approx(20.0, abs=0.05)
+    assert fit.rms == pytest.approx(0.02, rel=0.2)
+
+
+def test_fit_circles_batch_matches_single_fits():
+    circles = [(0.0, 0.0, 5.0), (10.0, 3.0, 20.0), (-7.0, 2.0, 60.0)]
+    points = [arc(*circle, count=400, seed=i) for i, circle in enumerate(circles)]
+    x = np.stack([p[0] for p in points])
+    y = np.stack([p[1] for p in points])
+    mask = np.ones_like(x, dtype=bool)
+    mask[1, :100] = False
+    x[1, :100] += 50  # masked out
+    batch = circle_fit.fit_circles(x, y, mask=mask)
+    for i, (xc, yc, r) in enumerate(circles):
+        assert batch.xc[i] == pytest.approx(xc, abs=1e-6)
+        assert batch.yc[i] == pytest.approx(yc, abs=1e-6)
+        assert batch.r[i] == pytest.approx(r, abs=1e-6)
+
+
+def test_fit_circle_robust_ignores_stray_points():
+    x, y = arc(10.0, 5.0, 25.0, noise=0.03)
+    rng = np.random.default_rng(1)
+    x = np.r_[x, rng.uniform(10, 40, 500)]
+    y = np.r_[y, rng.uniform(5, 35, 500)]
+    plain = circle_fit.fit_circle(x, y)
+    robust = circle_fit.fit_circle_robust(x, y)
+    assert abs(robust.r - 25.0) < 0.02 < abs(plain.r - 25.0)
+    assert robust.inlier_ratio == pytest.approx(1500 / 2000, abs=0.05)
+
+
+def test_repair_circle_fit_repairs_stray_points():
+    x, y = arc(10.0, 5.0, 25.0, count=1200, noise=0.03)
+    rng = np.random.default_rng(2)
+    x = np.r_[x, rng.uniform(10, 40, 500)]
+    y = np.r_[y, rng.uniform(5, 35, 500)]
+    fit = circle_fit.fit_circle_robust(x, y)
+    assert fit.inlier_ratio < 0.8
+
+    repaired = circle_fit.repair_circle_fit(x, y, fit, 0.8)
+    assert repaired.repaired_from == fit.inlier_ratio
+    assert repaired.inlier_ratio >= 0.8
+    assert repaired.r == pytest.approx(25.0, abs=0.02)
+
+
+def test_repair_circle_fit_keeps_noisy_edge_rejected():
+    x, y = arc(10.0, 5.0, 25.0, count=1200, noise=0.4)
+    fit = circle_fit.fit_circle_robust(x, y)
+    repaired = circle_fit.repair_circle_fit(x, y, fit, 0.8)
+    assert repaired is fit
+    assert repaired.inlier_ratio < 0.8
+
+
+def test_repair_circle_fit_leaves_good_and_least_squares_fits():
+    x, y = arc(0.0, 0.0, 10.0)
+    robust = circle_fit.fit_circle_robust(x, y)
+    assert circle_fit.repair_circle_fit(x, y, robust, 0.9) is robust
+    plain = circle_fit.fit_circle(x, y)
+    assert circle_fit.repair_circle_fit(x, y, plain, 0.9) is plain
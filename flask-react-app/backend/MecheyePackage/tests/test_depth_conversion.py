@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from depth_conversion import DepthToPointsConverter, StreamingCloudAssembler
+
+
+def depth_map(rows=300, cols=200, seed=0):
+    rng = np.random.default_rng(seed)
+    depth = rng.uniform(20, 90, (rows, cols)).astype(np.float32)
+    depth[rng.random(depth.shape) < 0.3] = np.nan
+    return depth
+
+
+def reference_points(depth, x_unit, y_unit):
+    """Valid cells of the depth map as x, y, z (mm), row by row like save_data_to_np()."""
+    rows, cols = np.nonzero(~np.isnan(depth))
+    return np.column_stack([cols * x_unit * 1e-3, rows * y_unit * 1e-3, depth[rows, cols]]).astype(np.float32)
+
+
+def test_convert_matches_reference_points():
+    depth = depth_map()
+    points = DepthToPointsConverter().convert(depth, 40.0, 75.0)
+    assert points.dtype == np.float32
+    np.testing.assert_array_equal(points, reference_points(depth, 40.0, 75.0))
+
+
+def test_held_results_are_never_overwritten():
+    converter = DepthToPointsConverter()
+    results = [converter.convert(depth_map(seed=seed), 40.0, 75.0) for seed in range(4)]
+    for seed, points in enumerate(results):
+        np.testing.assert_array_equal(points, reference_points(depth_map(seed=seed), 40.0, 75.0))
+    # Two pooled buffers, the other two results needed new ones
+    assert converter.held_buffers == 2
+
+
+def test_released_buffers_are_reused():
+    converter = DepthToPointsConverter()
+    address = converter.convert(depth_map(seed=1), 40.0, 75.0).ctypes.data
+    converter.release()
+    for seed in range(2, 6):
+        points = converter.convert(depth_map(seed=seed), 40.0, 75.0)
+        assert points.ctypes.data == address
+        converter.release(points)
+    assert converter.held_buffers == 0
+
+
+def test_release_of_one_result_keeps_the_others():
+    converter = DepthToPointsConverter()
+    first = converter.convert(depth_map(seed=1), 40.0, 75.0)
+    second = converter.convert(depth_map(seed=2), 40.0, 75.0)
+    converter.release(first)
+    third = converter.convert(depth_map(seed=3), 40.0, 75.0)
+    assert np.shares_memory(first, third)
+    np.testing.assert_array_equal(second, reference_points(depth_map(seed=2), 40.0, 75.0))
+    assert converter.held_buffers == 0
+
+
+def test_unpooled_results_are_owned_and_grids_cached():
+    converter = DepthToPointsConverter(buffers=0)
+    first = converter.convert(depth_map(seed=1), 40.0, 75.0)
+    second = converter.convert(depth_map(seed=2), 40.0, 75.0)
+    assert not np.shares_memory(first, second)
+    np.testing.assert_array_equal(first, reference_points(depth_map(seed=1), 40.0, 75.0))
+    assert len(converter._grids) == 1
+    assert converter.held_buffers == 0
+
+
+@pytest.mark.parametrize("batch_lines", [1, 64, 300, 1000])
+def test_streaming_assembler_matches_whole_conversion(batch_lines):
+    depth = depth_map()
+    assembler = StreamingCloudAssembler(depth.shape[1], depth.shape[0], 40.0, 75.0, chunk_lines=50)
+    for start in range(0, depth.shape[0], batch_lines):
+        assert not assembler.complete
+        assembler.add(depth[start:start + batch_lines])
+    assert assembler.complete
+    points = assembler.finish()
+    assert points.dtype == np.float32
+    np.testing.assert_array_equal(points, reference_points(depth, 40.0, 75.0))
+
+
+def test_streaming_assembler_ignores_rows_beyond_line_count():
+    depth = depth_map()
+    assembler = StreamingCloudAssembler(depth.shape[1], 200, 40.0, 75.0)
+    assembler.add(depth)
+    assert assembler.height == 200
+    np.testing.assert_array_equal(assembler.finish(), reference_points(depth[:200], 40.0, 75.0))
+
+
+def test_empty_assembler_returns_no_points():
+    assembler = StreamingCloudAssembler(200, 300, 40.0, 75.0)
+    assert assembler.finish().shape == (0, 3)
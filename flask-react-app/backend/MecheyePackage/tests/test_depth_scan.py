@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from depth_conversion import DepthToPointsConverter
+from depth_scan import DepthScan
+from test_depth_conversion import depth_map
+
+
+def rotate_z(points, angle_degrees):
+    """JaguarScanner.rotate_point_cloud about Z."""
+    angle = np.radians(angle_degrees)
+    rotation = np.array([[np.cos(angle), -np.sin(angle), 0], [np.sin(angle), np.cos(angle), 0], [0, 0, 1]])
+    return points @ rotation.T
+
+
+@pytest.fixture
+def scan():
+    return DepthScan(depth_map(rows=120, cols=90), 40.0, 75.0)
+
+
+def test_points_match_converter(scan):
+    points = scan.points()
+    assert points.dtype == np.float32
+    np.testing.assert_array_equal(points, DepthToPointsConverter().convert(scan.depth, 40.0, 75.0))
+    assert scan.count() == len(points)
+
+
+@pytest.mark.parametrize("x, y, closed", [((1.0, 2.5), None, False), (None, (2.0, 5.0), True), ((0.5, 3.0), (1.0, 8.0), False)])
+def test_roi_matches_filtered_points(scan, x, y, closed):
+    points = scan.points()
+    inside = np.ones(len(points), dtype=bool)
+    for axis, limits in ((0, x), (1, y)):
+        if limits is not None:
+            values = points[:, axis]
+            inside &= (values >= limits[0]) & (values <= limits[1]) if closed else (values > limits[0]) & (values < limits[1])
+    region = scan.roi(x, y, closed)
+    assert np.shares_memory(region.depth, scan.depth)
+    np.testing.assert_array_equal(region.points(), points[inside])
+
+
+def test_without_clears_the_roi_in_a_copy(scan):
+    rest = scan.without(x=(1.0, 2.5))
+    assert not np.shares_memory(rest.depth, scan.depth)
+    assert rest.roi(x=(1.0, 2.5)).count() == 0
+    assert rest.count() == scan.count() - scan.roi(x=(1.0, 2.5)).count()
+
+
+@pytest.mark.parametrize("angle", [90, 180, 270, -90])
+def test_rotated_and_translated_match_transformed_points(scan, angle):
+    moved = scan.rotated(angle).translated(3.0, -2.0, 1.5)
+    expected = rotate_z(scan.points().astype(np.float64), angle) + [3.0, -2.0, 1.5]
+    np.testing.assert_allclose(moved.points(), expected, atol=1e-4)
+    x_min, x_max, y_min, y_max = moved.bounds()
+    np.testing.assert_allclose([x_min, x_max, y_min, y_max],
+                               [expected[:, 0].min(), expected[:, 0].max(), expected[:, 1].min(), expected[:, 1].max()],
+                               atol=1e-4)
+
+
+def test_rotation_must_be_a_quarter_turn(scan):
+    with pytest.raises(ValueError):
+        scan.rotated(45)
+
+
+def test_to_origin_and_median_match_points(scan):
+    moved = scan.rotated(90).to_origin()
+    points = moved.points()
+    np.testing.assert_allclose(points[:, :2].min(axis=0), [0.0, 0.0], atol=1e-4)
+    for axis in (0, 1):
+        assert moved.median(axis) == pytest.approx(np.median(points[:, axis]), abs=1e-4)
+
+
+def test_z_band_of_points(scan):
+    points = scan.points()
+    np.testing.assert_array_equal(scan.points(z=(40, 60)), points[(points[:, 2] > 40) & (points[:, 2] < 60)])
@@ -0,0 +1,100 @@
+import cv2
+import numpy as np
+import pytest
+
+# Scripts/__init__ imports the measurement modules, which need open3d
+pytest.importorskip("open3d")
+from scipy.spatial import cKDTree
+from Scripts import edges
+
+
+def ring(center=(60.0, 60.0), radius=20.0, count=5000, seed=0):
+    t = np.random.default_rng(seed).uniform(0, 2 * np.pi, count)
+    return np.column_stack([center[0] + radius * np.cos(t), center[1] + radius * np.sin(t)])
+
+
+def drawn_points(points, scale, image_size=(300, 300)):
+    """The former rasterizer: one cv2.circle per point."""
+    image = np.zeros((image_size[0] * scale, image_size[1] * scale), dtype=np.uint8)
+    for x, y in points:
+        x, y = int(x * scale), int(y * scale)
+        if 0 <= x < image.shape[1] and 0 <= y < image.shape[0]:
+            cv2.circle(image, (x, y), radius=0, color=255, thickness=3)
+    return image
+
+
+def crop(image, origin, shape):
+    return image[origin[0]:origin[0] + shape[0], origin[1]:origin[1] + shape[1]]
+
+
+@pytest.mark.parametrize("scale", [2, 13])
+def test_upscale_points_matches_drawn_points(scale):
+    # Points beyond the canvas are dropped
+    points = np.vstack([ring(count=500), [[-1.0, 5.0], [400.0, 10.0]]])
+    assert np.array_equal(edges.upscale_points(points, scale), drawn_points(points, scale))
+
+
+@pytest.mark.parametrize("scale", [2, 13])
+def test_rasterize_points_matches_upscale_points(scale):
+    points = ring()
+    image, origin = edges.rasterize_points(points, scale)
+    fixed = edges.upscale_points(points, scale)
+    assert np.array_equal(crop(fixed, origin, image.shape), image)
+    # Nothing drawn outside the fitted canvas
+    assert fixed.sum() == image.sum()
+
+
+def test_rasterize_points_caps_canvas_of_stray_point():
+    points = ring()
+    image, _ = edges.rasterize_points(points, 13)
+    stray, origin = edges.rasterize_points(np.vstack([points, [[5000.0, -3000.0]]]), 13)
+    # The canvas follows the ring, not the bounding box the stray point stretches
+    assert stray.size <= image.size
+    assert stray.sum() >= 0.99 * image.sum()
+    assert np.all(stray <= crop(edges.upscale_points(points, 13), origin, stray.shape))
+
+
+def test_rasterize_points_never_exceeds_max_cells():
+    points = np.random.default_rng(0).uniform(-2000, 2000, (20000, 2))
+    image, _ = edges.rasterize_points(points, 13, max_cells=1_000_000)
+    assert image.size <= 1_000_000
+
+
+def test_detect_edges_binary_is_mask_boundary():
+    image = np.zeros((20, 20), dtype=np.uint8)
+    image[5:15, 5:15] = 255
+    edge = edges.detect_edges(image)
+    expected = image.copy()
+    expected[6:14, 6:14] = 0
+    assert np.array_equal(edge, expected)
+
+
+def test_envelope_points_keep_the_silhouette():
+    rng = np.random.default_rng(0)
+    disc = rng.uniform(-20, 20, (20000, 2))
+    disc = disc[np.hypot(disc[:, 0], disc[:, 1]) <= 20] + 60
+    outline = edges.envelope_points(disc, 0.5)
+    # Input points at native precision, only from the rim of the disc
+    assert len(outline) < len(disc) / 10
+    assert (outline[:, None] == disc[None]).all(axis=2).any(axis=1).all()
+    assert np.hypot(outline[:, 0] - 60, outline[:, 1] - 60).min() > 18
+    # Every column and row of the disc keeps its extreme points
+    for axis in (0, 1):
+        bins = ((disc[:, axis] - disc[:, axis].min()) / 0.5).astype(int)
+        for b in np.unique(bins)[::10]:
+            column = disc[bins == b, 1 - axis]
+            assert column.max() in outline[:, 1 - axis] and column.min() in outline[:, 1 - axis]
+
+
+def test_neighbor_counts_grid_matches_kdtree():
+    points = np.random.default_rng(0).integers(0, 200, (3000, 2))
+    expected = cKDTree(points).query_ball_point(points, r=5, return_length=True)
+    assert np.array_equal(edges.neighbor_counts(points, 5), expected)
+    assert np.array_equal(edges.neighbor_counts(points, 5, max_grid_cells=10), expected)
+
+
+def test_radius_outlier_removal_drops_isolated_points():
+    cluster = np.argwhere(np.ones((10, 10), dtype=bool)) + 50
+    stray = np.array([[0, 0], [150, 20]])
+    kept = edges.radius_outlier_removal(np.vstack([cluster, stray]), radius=5, min_neighbors=3)
+    assert np.array_equal(kept, cluster)
@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from measurement_graph import MeasurementGraph
+
+
+def fail(*args):
+    raise RuntimeError("fit failed")
+
+
+@pytest.fixture(params=[0, 4], ids=["inline", "threads"])
+def workers(request):
+    return request.param
+
+
+def test_steps_run_when_their_inputs_are_provided(workers):
+    graph = MeasurementGraph(workers)
+    graph.add("sum", lambda a, b: a + b, ["a", "b"]).add("double", lambda s: 2 * s, ["sum"])
+    graph.provide("a", 1)
+    values = graph.wait()
+    assert "sum" not in values
+    graph.provide("b", 2)
+    values = graph.wait()
+    graph.close()
+    assert values == {"a": 1, "b": 2, "sum": 3, "double": 6}
+    assert graph.failed == set()
+
+
+def test_failure_skips_dependent_steps_only(workers):
+    errors = []
+    graph = MeasurementGraph(workers, on_error=lambda name, e: errors.append((name, str(e))))
+    graph.add("small", fail, ["scan"])
+    graph.add("feature", lambda small: small, ["small"])
+    graph.add("summary", lambda feature: feature, ["feature"])
+    graph.add("horizontal", lambda scan: scan * 2, ["scan"])
+    graph.provide("scan", 21)
+    values = graph.wait()
+    graph.close()
+
+    assert graph.failed == {"small", "feature", "summary"}
+    assert values["horizontal"] == 42
+    assert not {"small", "feature", "summary"} & set(values)
+    # Only the step that raised is reported; skipped steps are not
+    assert errors == [("small", "fit failed")]
+    assert graph.report()["failed"] == ["feature", "small", "summary"]
+
+
+def test_inline_steps_run_in_calling_thread_in_declaration_order():
+    order = []
+    graph = MeasurementGraph(0)
+    for name in ("first", "second", "third"):
+        graph.add(name, lambda value, name=name: order.append((name, threading.current_thread())), ["scan"])
+    graph.provide("scan", None)
+    assert order == [(name, threading.current_thread()) for name in ("first", "second", "third")]
+
+
+def test_critical_path_follows_last_input():
+    graph = MeasurementGraph(0)
+    graph.add("small", lambda scan: scan, ["small_scan"])
+    graph.add("results", lambda small, horizontal: (small, horizontal), ["small", "horizontal_scan"])
+    graph.provide("small_scan", 1)
+    graph.provide("horizontal_scan", 2)
+    graph.wait()
+    assert [name for name, _, _ in graph.critical_path()] == ["horizontal_scan", "results"]
+    assert [name for name, _, _ in graph.critical_path("small")] == ["small_scan", "small"]
+    report = graph.report()
+    assert report["critical_path"] == ["horizontal_scan", "results"]
+    assert set(report["steps_ms"]) == {"small", "results"}
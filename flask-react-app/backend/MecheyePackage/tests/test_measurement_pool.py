@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+import pytest
+
+from measurement_pool import MeasurementPool
+
+
+class Target(object):
+    def __init__(self):
+        self.calls = 0
+
+    def summary(self, points, offset):
+        self.calls += 1
+        return {"sum": float(points.sum()) + offset, "shape": points.shape, "dtype": str(points.dtype),
+                "pid": os.getpid(), "calls": self.calls}
+
+    def fail(self, points):
+        raise ValueError("step failed")
+
+
+@pytest.fixture
+def pool():
+    pool = MeasurementPool(Target(), processes=2)
+    yield pool
+    pool.close()
+
+
+def test_arrays_reach_the_worker_through_shared_memory(pool):
+    points = np.random.default_rng(0).uniform(0, 100, (5000, 3)).astype(np.float32)
+    result = pool.call("summary", points, 1.5)
+    assert result["sum"] == pytest.approx(float(points.sum()) + 1.5)
+    assert result["shape"] == (5000, 3)
+    assert result["dtype"] == "float32"
+    assert result["pid"] != os.getpid()
+
+
+def test_slot_block_is_reused_and_grown(pool):
+    small = np.ones((1000, 3), dtype=np.float32)
+    pool.call("summary", small, 0)
+    block = pool._slots[("summary", 0)]
+    pool.call("summary", small[:500], 0)
+    assert pool._slots[("summary", 0)] is block
+    large = np.ones((10000, 3), dtype=np.float32)
+    assert pool.call("summary", large, 0)["sum"] == 30000
+    assert pool._slots[("summary", 0)].capacity >= large.nbytes
+
+
+def test_concurrent_calls_of_a_slot_get_their_own_block(pool):
+    arrays = [np.full((2000, 3), i, dtype=np.float32) for i in range(4)]
+    futures = [pool.submit("summary", points, 0) for points in arrays]
+    assert [future.result()["sum"] for future in futures] == [float(points.sum()) for points in arrays]
+
+
+def test_changes_to_the_target_stay_in_the_worker():
+    target = Target()
+    pool = MeasurementPool(target, processes=1)
+    try:
+        calls = [pool.call("summary", np.zeros((10, 3), dtype=np.float32), 0)["calls"] for _ in range(3)]
+    finally:
+        pool.close()
+    assert calls == [1, 2, 3]
+    assert target.calls == 0
+
+
+def test_exceptions_are_raised_by_call(pool):
+    with pytest.raises(ValueError, match="step failed"):
+        pool.call("fail", np.zeros((10, 3), dtype=np.float32))
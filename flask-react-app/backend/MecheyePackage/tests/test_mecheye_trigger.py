@@ -0,0 +1,267 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import sdk_stubs
+from test_depth_conversion import reference_points
+
+
+@pytest.fixture
+def trigger_module(monkeypatch):
+    return sdk_stubs.install(monkeypatch)
+
+
+@pytest.fixture
+def trigger(trigger_module):
+    return trigger_module.TriggerWithExternalDeviceAndFixedRate()
+
+
+def test_session_connects_once_across_views(trigger):
+    for lua_name in ("small.lua", "horizontal.lua", "horizontal2.lua", "vertical.lua"):
+        assert trigger.prepare(4000, lua_name)
+    assert trigger.profiler.connects == 1
+    report = trigger.cycle_report()
+    assert report["connects"] == 1
+    assert report["skipped_connects"] == 3
+
+
+def test_only_changed_parameters_are_pushed(trigger):
+    assert trigger.prepare(4000, "small.lua")
+    pushed = len(trigger.profiler.user_set.sets)
+    trigger.cycle_report()
+
+    assert trigger.prepare(3000, "horizontal.lua")
+    assert trigger.profiler.user_set.sets[pushed:] == ["ScanLineCount"]
+    assert trigger.set_timed_exposure(1000)
+    report = trigger.cycle_report()
+    assert report["pushed_parameters"] == 1
+    # Everything but the line count, and both exposure values
+    assert report["skipped_parameters"] == len(trigger.scan_parameters(3000)) - 1 + 2
+
+
+def test_cycle_report_starts_a_new_cycle(trigger):
+    assert trigger.prepare(4000, "small.lua")
+    trigger.cycle_report()
+    assert trigger.cycle_report() == {
+        "connects": 0, "skipped_connects": 0, "pushed_parameters": 0, "skipped_parameters": 0, "saved_ms": 0.0,
+    }
+
+
+def test_failed_push_reconnects_and_pushes_everything(trigger):
+    assert trigger.prepare(4000, "small.lua")
+    user_set = trigger.profiler.user_set
+    user_set.failing.add("ScanLineCount")
+    assert not trigger.prepare(3000, "horizontal.lua")
+    # Each failed attempt drops the connection
+    assert trigger.profiler.disconnects == 2
+    assert not trigger.session.connected
+
+    user_set.failing.clear()
+    user_set.sets.clear()
+    assert trigger.prepare(3000, "horizontal.lua")
+    assert len(user_set.sets) == len(trigger.scan_parameters(3000))
+
+
+def test_connection_failure_is_reported(trigger):
+    trigger.profiler.connectable = False
+    assert not trigger.prepare(4000, "small.lua")
+    assert trigger.profiler.connects == 2
+
+
+def depth_rows(rows, width=64, seed=0):
+    depth = np.random.default_rng(seed).uniform(10, 50, (rows, width)).astype(np.float32)
+    depth[::7, ::5] = np.nan
+    return depth
+
+
+def timed_trigger(trigger_module, timeout):
+    return trigger_module.TriggerWithExternalDeviceAndFixedRate(acquisition_timeout=timeout)
+
+
+def test_complete_acquisition_returns_without_waiting_for_the_timeout(trigger_module):
+    trigger = timed_trigger(trigger_module, 30)
+    trigger.profiler.batches = [depth_rows(60), depth_rows(40, seed=1)]
+    start = time.perf_counter()
+    points = trigger.main("small.lua", scan_line_count=100)
+    assert time.perf_counter() - start < 5
+    valid = np.count_nonzero(~np.isnan(np.vstack(trigger.profiler.batches)))
+    assert points.shape == (valid, 3)
+
+
+def test_partial_acquisition_continues_with_the_delivered_profiles(trigger_module):
+    trigger = timed_trigger(trigger_module, 0.2)
+    trigger.profiler.batches = [depth_rows(60)]
+    points = trigger.main("small.lua", scan_line_count=100)
+    assert trigger.assembler.height == 60
+    assert len(points) == np.count_nonzero(~np.isnan(trigger.profiler.batches[0]))
+
+
+def test_incomplete_batch_ends_the_acquisition(trigger_module):
+    trigger = timed_trigger(trigger_module, 30)
+    trigger.profiler.batches = [depth_rows(60)]
+    trigger.profiler.incomplete_flags = sdk_stubs.ProfileBatch.BatchFlag_Incomplete
+    start = time.perf_counter()
+    trigger.main("small.lua", scan_line_count=100)
+    assert time.perf_counter() - start < 5
+    assert trigger.assembler.height == 60
+
+
+def test_empty_acquisition_times_out_and_invalidates_the_session(trigger_module):
+    trigger = timed_trigger(trigger_module, 0.1)
+    with pytest.raises(trigger_module.AcquisitionTimeoutError):
+        trigger.main("small.lua", scan_line_count=100)
+    assert not trigger.session.connected
+    assert trigger.profiler.disconnects == 1
+
+
+def test_default_timeout_covers_the_sweep(trigger):
+    assert trigger.prepare(4000, "small.lua")
+    assert trigger._acquisition_timeout() == pytest.approx(4000 / trigger.SOFTWARE_TRIGGER_RATE + trigger.ACQUISITION_TIMEOUT_MARGIN)
+
+
+def test_profiles_are_converted_as_they_arrive(trigger_module):
+    trigger = timed_trigger(trigger_module, 30)
+    trigger.profiler.batches = [depth_rows(30, seed=seed) for seed in range(4)]
+    points = trigger.main("small.lua", scan_line_count=120)
+    np.testing.assert_array_equal(points, reference_points(np.vstack(trigger.profiler.batches), 20.0, 20.0))
+
+
+def test_depth_scan_holds_the_profiles_of_the_last_acquisition(trigger_module):
+    trigger = timed_trigger(trigger_module, 30)
+    trigger.profiler.batches = [depth_rows(60), depth_rows(60, seed=1)]
+    points = trigger.main("small.lua", scan_line_count=100)
+    scan = trigger.depth_scan()
+    np.testing.assert_array_equal(scan.depth, np.vstack(trigger.profiler.batches)[:100])
+    np.testing.assert_array_equal(scan.points(), points)
+
+
+def test_released_points_are_reused_by_the_next_acquisition(trigger_module):
+    trigger = timed_trigger(trigger_module, 30)
+    trigger.profiler.batches = [depth_rows(100)]
+    first = trigger.main("small.lua", scan_line_count=100)
+    held = trigger.main("small.lua", scan_line_count=100)
+    assert not np.shares_memory(first, held)
+    trigger.release_points()
+    reused = trigger.main("small.lua", scan_line_count=100)
+    assert np.shares_memory(reused, first) or np.shares_memory(reused, held)
+
+
+def test_recorded_acquisition_replays_the_same_points(trigger_module, tmp_path):
+    from scan_replay import AcquisitionRecorder, ReplayTrigger
+
+    trigger = timed_trigger(trigger_module, 30)
+    trigger.recorder = AcquisitionRecorder(str(tmp_path))
+    trigger.set_tray_index(3)
+    trigger.profiler.batches = [depth_rows(100)]
+    points = trigger.main("small.lua", scan_line_count=100)
+
+    # The recording is written on a background thread
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread():
+            thread.join(5)
+    replay = ReplayTrigger(str(tmp_path))
+    np.testing.assert_array_equal(replay.main("small.lua"), points)
+    assert replay.tray_index == 3
+
+
+def test_every_view_records_its_phases(trigger_module):
+    trigger = timed_trigger(trigger_module, 30)
+    trigger.profiler.batches = [depth_rows(100)]
+    for lua_name in ("small.lua", "vertical.lua"):
+        trigger.main(lua_name, scan_line_count=100)
+    timings = trigger.pop_timings()
+    assert [record["view"] for record in timings] == ["small.lua", "vertical.lua"]
+    assert {"connect", "set_parameters", "acquisition", "first_profile", "conversion", "wall"} <= set(timings[0])
+    assert trigger.pop_timings() == []
+
+
+def test_moves_run_in_the_background_in_order(trigger_module):
+    trigger = timed_trigger(trigger_module, 30)
+    trigger.robot.move_delay = 0.05
+    trigger.profiler.batches = [depth_rows(100)]
+    trigger.main("small.lua", scan_line_count=100)
+    trigger.main("horizontal.lua", scan_line_count=100)
+    trigger.wait_for_motion()
+    moves = trigger.robot.moves
+    assert moves == [("MoveL", trigger.scrc2), ("MoveCart", trigger.h2), ("MoveL", trigger.h1), ("MoveCart", trigger.h1_alt)]
+
+
+def test_failed_background_move_is_raised_by_the_next_view(trigger_module):
+    trigger = timed_trigger(trigger_module, 30)
+    trigger.robot.failing.add("MoveCart")
+    trigger.profiler.batches = [depth_rows(100)]
+    trigger.main("small.lua", scan_line_count=100)
+    with pytest.raises(RuntimeError, match="MoveCart rejected"):
+        trigger.main("horizontal.lua", scan_line_count=100)
+    # The error is raised once; the robot was not moved towards the next view
+    trigger.wait_for_motion()
+    assert trigger.robot.moves == [("MoveL", trigger.scrc2)]
+
+
+def test_move_after_a_failed_one_is_skipped(trigger_module):
+    trigger = timed_trigger(trigger_module, 30)
+    trigger.robot.failing.add("MoveL")
+    first = threading.Thread(target=trigger._timed_move, args=(trigger.timer, "pre_move", "MoveL", trigger.scrc2))
+    first.start()
+    trigger.motion = threading.Thread(target=trigger._timed_move, args=(trigger.timer, "post_move", "MoveCart", trigger.h2, first))
+    trigger.motion.start()
+    with pytest.raises(RuntimeError, match="MoveL rejected"):
+        trigger.wait_for_motion()
+    assert trigger.robot.moves == []
+
+
+def test_unreadable_motion_state_raises_motion_error(trigger_module):
+    trigger = timed_trigger(trigger_module, 30)
+    trigger.robot.motion_done_error = 14
+    with pytest.raises(trigger_module.MotionError, match="error code 14"):
+        trigger.wait_for_motion()
+
+
+def test_unfinished_motion_raises_motion_error(trigger_module):
+    trigger = timed_trigger(trigger_module, 30)
+    trigger.robot.motion_done = 0
+    with pytest.raises(trigger_module.MotionError, match="not done"):
+        trigger.wait_for_motion(timeout=0.1)
+
+
+def test_close_waits_for_the_last_move(trigger_module):
+    trigger = timed_trigger(trigger_module, 30)
+    trigger.robot.move_delay = 0.1
+    trigger.profiler.batches = [depth_rows(100)]
+    trigger.main("horizontal2.lua", scan_line_count=100)
+    trigger.close()
+    assert trigger.robot.moves[-1] == ("MoveCart", trigger.p91)
+    assert trigger.profiler.disconnects == 1
+
+
+def test_robot_is_connected_on_first_use(trigger_module):
+    assert trigger_module._robot is None
+    trigger = trigger_module.TriggerWithExternalDeviceAndFixedRate()
+    assert trigger_module._robot is None
+    assert trigger.robot is trigger_module.get_robot()
+    assert trigger.robot.ip == trigger_module.ROBOT_IP
+
+
+def test_given_robot_is_used_without_connecting(trigger_module):
+    robot = sdk_stubs.RobotRPC()
+    trigger = trigger_module.TriggerWithExternalDeviceAndFixedRate(robot=robot)
+    assert trigger.robot is robot
+    assert trigger_module._robot is None
+
+
+def test_scan_sizing_derives_lines_and_rate_from_the_sweep(trigger_module):
+    from scan_sizing import MotionScanSizing, sweep_length
+
+    sizing = MotionScanSizing()
+    trigger = trigger_module.TriggerWithExternalDeviceAndFixedRate(scan_sizing=sizing)
+    assert trigger.prepare(4000, "vertical.lua")
+    plan = sizing.plan(sweep_length(trigger.p91, trigger.p90), trigger.SWEEP_VELOCITY, 20.0)
+    assert (trigger.capture_line_count, trigger.trigger_rate) == (plan.line_count, plan.trigger_rate)
+    assert trigger.profiler.user_set.values["ScanLineCount"] == plan.line_count
+
+
+def test_fixed_line_count_without_scan_sizing(trigger_module):
+    trigger = trigger_module.TriggerWithExternalDeviceAndFixedRate()
+    assert trigger.plan_scan("vertical.lua", 4000) == (4000, trigger.SOFTWARE_TRIGGER_RATE)
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from point_cloud_view import PointCloudView
+
+
+def row_major_cloud(rows=200, cols=150, seed=0):
+    """Cloud as converted from a depth map: Y ascends row by row, X repeats per row."""
+    rng = np.random.default_rng(seed)
+    y, x = np.indices((rows, cols), dtype=np.float32)
+    points = np.column_stack([x.ravel() * 0.04, y.ravel() * 0.075, rng.normal(50, 5, rows * cols)]).astype(np.float32)
+    return points[rng.random(len(points)) > 0.3]
+
+
+def masked(points, x=None, y=None, z=None, closed=False):
+    mask = np.ones(len(points), dtype=bool)
+    for axis, bounds in enumerate((x, y, z)):
+        if bounds is None:
+            continue
+        low = -np.inf if bounds[0] is None else bounds[0]
+        high = np.inf if bounds[1] is None else bounds[1]
+        values = points[:, axis]
+        mask &= (values >= low) & (values <= high) if closed else (values > low) & (values < high)
+    return points[mask]
+
+
+QUERIES = [
+    dict(x=(1.0, 3.0)),
+    dict(y=(2.0, 8.0)),
+    dict(x=(1.0, 3.0), y=(2.0, 8.0)),
+    dict(x=(None, 2.0), z=(45.0, None)),
+    dict(y=(3.0, 3.0)),
+    dict(x=(100.0, 200.0)),
+    dict(x=(0.04, 0.4), y=(0.075, 0.75), closed=True),
+]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+@pytest.mark.parametrize("points", [row_major_cloud(), row_major_cloud()[::-1]],
+                         ids=["ascending", "descending"])
+def test_monotonic_view_queries_equal_masks(points, query):
+    view = PointCloudView(np.ascontiguousarray(points))
+    assert np.array_equal(view.query(**query), masked(view.points, **query))
+
+
+@pytest.mark.parametrize("query", QUERIES)
+@pytest.mark.parametrize("sort", [False, True])
+def test_shuffled_view_queries_equal_masks(query, sort):
+    points = np.random.default_rng(1).permutation(row_major_cloud())
+    view = PointCloudView(points, sort=sort)
+    assert np.array_equal(view.query(**query), masked(points, **query))
+
+
+def test_of_wraps_arrays_without_index_and_keeps_views():
+    points = row_major_cloud()
+    view = PointCloudView.of(points)
+    assert view.index_axes == ()
+    assert PointCloudView.of(view) is view
+    assert np.array_equal(view.query(x=(1.0, 2.0)), masked(points, x=(1.0, 2.0)))
+
+
+def test_statistics_equal_numpy():
+    points = np.random.default_rng(2).permutation(row_major_cloud())
+    for sort in (False, True):
+        view = PointCloudView(points, sort=sort)
+        view.query(x=(0.0, 1.0), y=(0.0, 1.0))
+        for axis in range(3):
+            assert view.min(axis) == points[:, axis].min()
+            assert view.max(axis) == points[:, axis].max()
+            assert view.median(axis) == pytest.approx(np.median(points[:, axis]))
@@ -0,0 +1,54 @@
+import numpy as np
+
+from pointcloud_io import organize_points, read_ply, write_csv, write_npy, write_npz, write_ply
+
+
+def organized(rows=30, cols=20):
+    depth = np.random.default_rng(0).uniform(20, 90, (rows, cols))
+    depth[::3, ::4] = np.nan
+    return organize_points(depth, 40.0, 75.0)
+
+
+def test_organize_points_grid():
+    depth = np.array([[1.0, np.nan], [3.0, 4.0]])
+    points = organize_points(depth, 50.0, 100.0, y_values=np.array([10, 20]))
+    assert points.dtype == np.float32
+    np.testing.assert_allclose(points[1, 0], [0.0, 2.0, 3.0])
+    np.testing.assert_allclose(points[1, 1], [0.05, 2.0, 4.0])
+    assert np.isnan(points[0, 1]).all()
+
+
+def test_write_ply_round_trip(tmp_path):
+    points = organized()
+    write_ply(tmp_path / "organized.ply", points)
+    np.testing.assert_array_equal(read_ply(tmp_path / "organized.ply"), points.reshape(-1, 3))
+
+    write_ply(tmp_path / "valid.ply", points, is_organized=False)
+    valid = points.reshape(-1, 3)
+    np.testing.assert_array_equal(read_ply(tmp_path / "valid.ply"), valid[~np.isnan(valid).any(axis=1)])
+
+
+def test_write_ply_header_is_binary_little_endian(tmp_path):
+    write_ply(tmp_path / "points.ply", np.zeros((5, 3)))
+    header = (tmp_path / "points.ply").read_bytes().split(b"end_header\n")[0].decode("ascii")
+    assert "format binary_little_endian 1.0" in header
+    assert "element vertex 5" in header
+
+
+def test_write_csv_rows(tmp_path):
+    points = organized()
+    write_csv(tmp_path / "points.csv", points, is_organized=False)
+    rows = np.loadtxt(tmp_path / "points.csv", delimiter=",", skiprows=1)
+    valid = points.reshape(-1, 3)
+    np.testing.assert_allclose(rows, valid[~np.isnan(valid).any(axis=1)], atol=1e-6)
+
+
+def test_write_npy_and_npz_keep_shape(tmp_path):
+    points = organized()
+    write_npy(tmp_path / "points.npy", points)
+    np.testing.assert_array_equal(np.load(tmp_path / "points.npy"), points)
+    for compressed in (True, False):
+        write_npz(tmp_path / f"points_{compressed}.npz", compressed=compressed, points=points, x_unit=40.0)
+        with np.load(tmp_path / f"points_{compressed}.npz") as archive:
+            np.testing.assert_array_equal(archive["points"], points)
+            assert float(archive["x_unit"]) == 40.0
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from depth_conversion import DepthToPointsConverter
+from scan_replay import AcquisitionRecorder, NullRobot, ReplayTrigger
+
+
+def depth_map(seed, rows=120, cols=80):
+    rng = np.random.default_rng(seed)
+    depth = rng.uniform(20, 90, (rows, cols)).astype(np.float32)
+    depth[rng.random(depth.shape) < 0.2] = np.nan
+    return depth
+
+
+def record(record_dir, tray, lua_name, depth):
+    recorder = AcquisitionRecorder(str(record_dir))
+    recorder.tray_index = tray
+    # record() writes on a background thread; write the same file synchronously
+    arrays = dict(depth=depth, encoder=np.arange(len(depth)), lua_name=lua_name, tray_index=tray,
+                  x_unit=40.0, y_unit=75.0, trigger_source=0, scan_line_count=len(depth))
+    recorder._write(str(record_dir / f"tray{tray:02d}_{lua_name[:-4]}_0.npz"), arrays)
+
+
+@pytest.fixture
+def record_dir(tmp_path):
+    for tray in (1, 2):
+        for view in ("small", "vertical"):
+            record(tmp_path, tray, f"{view}.lua", depth_map(seed=tray * 10 + len(view)))
+    return tmp_path
+
+
+def test_replay_returns_converted_recordings(record_dir):
+    trigger = ReplayTrigger(str(record_dir))
+    points = trigger.main("small.lua")
+    np.testing.assert_array_equal(points, DepthToPointsConverter().convert(depth_map(seed=15), 40.0, 75.0))
+    np.testing.assert_array_equal(trigger.depth_scan().depth, depth_map(seed=15))
+
+
+def test_replay_advances_tray_when_a_view_repeats(record_dir):
+    trigger = ReplayTrigger(str(record_dir))
+    trigger.main("small.lua")
+    trigger.main("vertical.lua")
+    assert trigger.tray_index == 1
+    points = trigger.main("small.lua")
+    assert trigger.tray_index == 2
+    np.testing.assert_array_equal(points, DepthToPointsConverter().convert(depth_map(seed=25), 40.0, 75.0))
+
+
+def test_replay_set_tray_index_and_missing_view(record_dir):
+    trigger = ReplayTrigger(str(record_dir))
+    trigger.set_tray_index(2)
+    points = trigger.main("vertical.lua", scan_line_count=50)
+    np.testing.assert_array_equal(points, DepthToPointsConverter().convert(depth_map(seed=28)[:50], 40.0, 75.0))
+    assert trigger.depth_scan().shape == (50, 80)
+    assert trigger.main("horizontal.lua") == -1
+
+
+def test_replay_without_recordings(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ReplayTrigger(str(tmp_path))
+
+
+def test_null_robot_accepts_every_command():
+    assert NullRobot().MoveCart([0] * 6, 0, 0, vel=10) == 0
+
+
+def test_replay_records_phase_timings(record_dir):
+    trigger = ReplayTrigger(str(record_dir))
+    trigger.main("small.lua")
+    timings = trigger.pop_timings()
+    assert [record["view"] for record in timings] == ["small.lua"]
+    assert {"load", "conversion", "wall"} <= set(timings[0])
+    assert trigger.pop_timings() == []
@@ -0,0 +1,38 @@
+import math
+
+import pytest
+
+from scan_sizing import MotionScanSizing, sweep_length
+
+
+def test_sweep_length_ignores_orientation():
+    assert sweep_length([0, 0, 0, 90, 0, 0], [30, 40, 0, 0, 0, 180]) == 50
+
+
+def test_plan_spaces_profiles_by_y_resolution():
+    sizing = MotionScanSizing(max_linear_speed=1000.0, margin=0.1, ramp_time=0.3)
+    plan = sizing.plan(length=200.0, vel=10, y_resolution=50.0)
+    assert plan.speed == 100.0
+    assert plan.trigger_rate == 2000.0
+    # 2 s sweep + 0.3 s ramp, 10 % margin
+    assert plan.line_count == math.ceil(2000 * 2.3 * 1.1)
+    assert plan.sweep_length == 200.0
+
+
+def test_plan_clamps_trigger_rate():
+    plan = MotionScanSizing(max_linear_speed=1000.0, max_trigger_rate=5000.0).plan(100.0, 100, 50.0)
+    assert plan.trigger_rate == 5000.0
+    assert plan.line_count == math.ceil(5000 * (0.1 + 0.3) * 1.1)
+
+
+@pytest.mark.parametrize("vel, y_resolution", [(0, 50.0), (10, 0.0)])
+def test_plan_rejects_invalid_motion(vel, y_resolution):
+    with pytest.raises(ValueError):
+        MotionScanSizing().plan(100.0, vel, y_resolution)
+
+
+def test_from_config():
+    assert MotionScanSizing.from_config({}) is None
+    assert MotionScanSizing.from_config({"scan_sizing": {"mode": "fixed"}}) is None
+    sizing = MotionScanSizing.from_config({"scan_sizing": {"mode": "motion", "max_linear_speed": 800.0, "margin": 0.2}})
+    assert (sizing.max_linear_speed, sizing.margin, sizing.ramp_time) == (800.0, 0.2, 0.3)
@@ -0,0 +1,35 @@
+import time
+
+from scan_timing import PhaseTimer
+
+
+def test_repeated_phases_accumulate():
+    timer = PhaseTimer("small.lua")
+    timer.add("move", 12.0)
+    timer.add("move", 3.5)
+    with timer.phase("conversion"):
+        time.sleep(0.01)
+    timer.stop()
+    record = timer.record()
+    assert record["view"] == "small.lua"
+    assert record["move"] == 15.5
+    assert record["conversion"] >= 10
+    assert record["wall"] >= record["conversion"]
+
+
+def test_phase_is_recorded_when_it_raises():
+    timer = PhaseTimer("vertical.lua")
+    try:
+        with timer.phase("acquisition"):
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert "acquisition" in timer.record()
+
+
+def test_wall_time_is_frozen_by_stop():
+    timer = PhaseTimer("horizontal.lua")
+    timer.stop()
+    wall = timer.record()["wall"]
+    time.sleep(0.01)
+    assert timer.record()["wall"] == wall
@@ -139,6 +139,10 @@ def generate_json_data(results, tolerances=config['tolerances']):
         }
         
         for feature, value in result.items():
+            # Per-view acquisition timings are diagnostics, not features
+            if feature == "Timings":
+                continue
+
             # Round numeric values to 3 decimal places
             rounded_value = value
             if isinstance(value, (float, int)):
@@ -251,6 +255,8 @@ def save_to_excel(results, tolerances=config['tolerances']):
     rows = []
     for iteration, result in enumerate(results, start=1):
         for name, value in result.items():
+            if name == "Timings":
+                continue
             rows.append({"Iteration": iteration, "Feature": name, "Value": value})
 
     results_df = pd.DataFrame(rows)